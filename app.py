@@ -1,12 +1,15 @@
-
 import streamlit as st
-import joblib
-import pandas as pd
-import os # (Já vem pronto, para verificar se o arquivo existe)
-import random
-import time
 from pathlib import Path
-from src.gerar_dados import config, get_random_float, get_random_int, get_random_bool, get_valor_ou_limite, calcular_dados_aluno
+from src.cache_previsoes import CachePrevisoes
+from src.versoes_modelo import RecarregadorModelo
+from src.avaliacao import METRICAS_INTERVALO
+from src.explicacao import ExplicadorArvore
+from src.esquema import COLUNAS_INDEPENDENTES
+from src.instrumentacao import contar, medir
+
+# Para o app abrir rápido, as bibliotecas pesadas (pandas, joblib/sklearn) não são importadas aqui:
+# o modelo compilado e as métricas (JSON) são carregados só com numpy, e o pandas é importado
+# dentro das funções, na primeira vez em que uma tabela precisa ser exibida
 
 # Montando o PATH
 BASE_DIR = Path(__file__).resolve()
@@ -34,94 +37,96 @@ OPCOES_TURMA = {
 
 # Caminho de arquivos necessários
 NOME_ARQUIVO_MODELO = BASE_DIR.parent / 'models' / 'modelo_desempenho.pkl'
-NOME_ARQUIVO_METRICAS = BASE_DIR.parent / 'models' / 'model_metrics.pkl'
 
-# Variaveis globais do modelo e suas classes
-MODELO = None
-CLASSES_MODELO = None
+@st.cache_resource # Um único recarregador por servidor: modelo e métricas da versão publicada pelo treino
+def carregar_recarregador():
+  # A árvore compilada (só numpy, mapeada em memória) é mais rápida para carregar e prever.
+  # Quando o treino publica uma nova versão, ela é carregada em segundo plano e trocada de uma vez,
+  # sem reiniciar o app e sem travar as previsões em andamento
+  return RecarregadorModelo()
 
-@st.cache_resource # Cache para carregar o modelo apenas uma vez
-def carregar_modelo(caminho_modelo):
-  if not os.path.exists(caminho_modelo):
-    return None, None
-  try:
-    modelo = joblib.load(caminho_modelo)
-    classes_modelo = modelo.classes_
-    return modelo, classes_modelo
-  except Exception as e:
-    st.error(f"Erro ao carregar o modelo: {e}")
-    return None, None
-    
-@st.cache_data
-def carregar_métricas(caminho_metricas):
-  if not os.path.exists(caminho_metricas):
-    return None
+@st.cache_resource(max_entries=2) # Um cache de previsões por versão do modelo, compartilhado por todas as sessões
+def carregar_cache_previsoes(caminho_modelo):
+  return CachePrevisoes(caminho_modelo)
+
+@st.cache_resource(max_entries=2) # Explicador de cada versão do modelo (regras e contribuições guardadas por folha)
+def carregar_explicador(caminho_modelo, _modelo):
   try:
-    metricas = joblib.load(caminho_metricas)
-    return metricas
-  except Exception as e:
-    st.error(f"Erro ao carregar as métricas: {e}")
+    return ExplicadorArvore(_modelo)
+  except TypeError:
+    # Modelos que não são uma única árvore (ex.: escolhidos pelo 'tunar') não têm explicação
     return None
 
-def sidebar():
+@st.fragment
+def area_previsao():
   """
-    Função auxiliar que constroi o sidebar da página
+    Formulário e resultado da previsão. Por ser um fragmento, enviar o formulário
+    reexecuta só esta área, e não a página inteira (métricas etc.)
   """
-  
-  # --- Interface do Usuário (Entradas) na Sidebar ---
-  st.sidebar.header('Insira os dados do Aluno:', width='stretch')
-
-  tempo_deslocamento = st.sidebar.slider('Tempo de deslocamento até a escola (Minutos)', 15, 150, 60, 5, width='stretch')
-
-  nota_p1 = st.sidebar.slider('Primeira nota do aluno (P1): ', 0.0, 10.0, 5.0, 0.1, width='stretch')
-
-  # input e conversão para valor numérico da cor favorita
-  cor_selecionada = st.sidebar.selectbox(
-      "Selecione a Cor Favorita:",
-      options=list(OPCOES_COR.keys()),
-      width='stretch'
-  )
-  cod_cor_favorita = OPCOES_COR[cor_selecionada]
-
-  # input e conversão para valor numérico da letra da turma
-  turma_selecionada = st.sidebar.selectbox(
-      "Selecione a Letra da Turma:",
-      options=list(OPCOES_TURMA.keys()),
-      width='stretch'
-  )
-  cod_letra_turma = OPCOES_TURMA[turma_selecionada]
-  
-  quant_irmaos = st.sidebar.slider('Quantidade de irmãos', 0, 4, 0, width='stretch')
-
-  # BOTÃO PARA FAZER A PREVISÃO        
-  if st.sidebar.button('Fazer Previsão', width='stretch'):
-      with st.spinner('Processando...'):
-        time.sleep(1)            
-      
-      # Montando dataframe com dados indenpendentes do aluno
-      inputs_usuario = {
-        'ID': 99999,
+
+  # --- Interface do Usuário (Entradas) ---
+  st.header('Insira os dados do Aluno:', width='stretch')
+
+  # Dentro do formulário, mexer nos campos não reexecuta nada: só o botão envia
+  with st.form('form_previsao', border=False):
+    tempo_deslocamento = st.slider('Tempo de deslocamento até a escola (Minutos)', 15, 150, 60, 5, width='stretch')
+
+    nota_p1 = st.slider('Primeira nota do aluno (P1): ', 0.0, 10.0, 5.0, 0.1, width='stretch')
+
+    # input e conversão para valor numérico da cor favorita
+    cor_selecionada = st.selectbox(
+        "Selecione a Cor Favorita:",
+        options=list(OPCOES_COR.keys()),
+        width='stretch'
+    )
+    cod_cor_favorita = OPCOES_COR[cor_selecionada]
+
+    # input e conversão para valor numérico da letra da turma
+    turma_selecionada = st.selectbox(
+        "Selecione a Letra da Turma:",
+        options=list(OPCOES_TURMA.keys()),
+        width='stretch'
+    )
+    cod_letra_turma = OPCOES_TURMA[turma_selecionada]
+
+    quant_irmaos = st.slider('Quantidade de irmãos', 0, 4, 0, width='stretch')
+
+    # Valor esperado: sorteia várias vezes os dados calculados do aluno e mostra a média das probabilidades
+    valor_esperado = st.toggle('Valor esperado (Monte-Carlo)', width='stretch')
+    quant_amostras = st.slider('Sorteios do valor esperado', 10, 1000, 100, 10, width='stretch')
+
+    # BOTÃO PARA FAZER A PREVISÃO
+    enviado = st.form_submit_button('Fazer Previsão', width='stretch')
+
+  if enviado:
+      import pandas as pd
+
+      # Dados indenpendentes do aluno, montados na ordem do esquema (a mesma do gerador e do treino)
+      valores_formulario = {
         'tempo_desloc_minutos': tempo_deslocamento,
         'nota_p1': nota_p1,
         'cod_cor_favorita': cod_cor_favorita,
         'quant_irmaos': quant_irmaos,
         'cod_letra_turma': cod_letra_turma,
       }
+      inputs_usuario = {coluna: valores_formulario[coluna] for coluna in COLUNAS_INDEPENDENTES}
 
-      # Calculando os dados restantes do aluno (dict) e convertendo em dataframe
-      aluno_dict = calcular_dados_aluno(**inputs_usuario)
-      dados_aluno = pd.DataFrame([aluno_dict])
-      dados_aluno.drop(['ID', 'situacao'], axis=1, inplace=True)
+      # Versão em uso agora (o fragmento não reexecuta o main, então pega direto do recarregador)
+      versao = carregar_recarregador().obter()
+      modelo, indices_classes = versao['modelo'], versao['indices_classes']
+
+      # Dados restantes do aluno e previsão (classe + probabilidades): vêm do cache quando a entrada
+      # já foi consultada (ou foi pré-calculada após o treino); senão, calcula e prevê em uma única chamada
+      cache_previsoes = carregar_cache_previsoes(versao['caminho_modelo'])
+      with medir('app.previsao'):
+        dados_aluno, prev, probabilidades = cache_previsoes.prever(modelo, **inputs_usuario)
+      contar('app.previsoes')
 
       # Escrevendo os dados na tela
       st.header('Previsão de Situação do Aluno Informado', width='stretch')
       
       st.subheader('Dados do Aluno', width='stretch')
-      st.dataframe(dados_aluno.T, width='stretch')
-      
-      # Fazendo a previsão
-      prev = MODELO.predict(dados_aluno)
-      probabilidades = MODELO.predict_proba(dados_aluno)
+      st.dataframe(pd.Series(dados_aluno, name='valor'), width='stretch')
       
       if prev == 'reprovado':
           st.error("Aluno Reprovado!")
@@ -130,37 +135,71 @@ def sidebar():
           
       # (Bloco pronto para exibir métricas)
       st.subheader("Análise de Confiança da IA", )
-      prob_aprovado = probabilidades[0][list(CLASSES_MODELO).index('aprovado')]
-      prob_reprovado = probabilidades[0][list(CLASSES_MODELO).index('reprovado')]
+      prob_aprovado = probabilidades[indices_classes['aprovado']]
+      prob_reprovado = probabilidades[indices_classes['reprovado']]
       col1, col2 = st.columns(2)
       col1.metric("Confiança em 'Aprovado'", f"{prob_aprovado*100:.2f}%", width='stretch')
       col2.metric("Confiança em 'Reprovado'", f"{prob_reprovado*100:.2f}%", width='stretch')
+
+      # Explicação: regra da folha e quanto cada dado do aluno somou (ou tirou) da confiança na classe prevista
+      explicador = carregar_explicador(versao['caminho_modelo'], modelo)
+      if explicador is not None:
+          with medir('app.explicacao'):
+            explicacao = explicador.explicar_um(dados_aluno, prev)
+          st.subheader("Por que essa previsão?", width='stretch')
+          st.markdown(f"**Regra:** {explicacao['regra']}")
+          contribuicoes = pd.Series(explicacao['contribuicoes'], name=f"Contribuição para '{prev}'")
+          contribuicoes = contribuicoes[contribuicoes != 0].sort_values(key=abs, ascending=False)
+          st.caption(f"Partindo de {explicacao['base']*100:.2f}% ('{prev}' na base de treino), os dados abaixo "
+                     f"levam a confiança até {explicacao['probabilidade']*100:.2f}%.")
+          st.dataframe((contribuicoes * 100).map('{:+.2f} p.p.'.format), width='stretch')
+
+      if valor_esperado:
+          # Todos os sorteios pontuados em uma única chamada ao modelo (semeados pela entrada, como na
+          # pontuação em lote e no servidor: reprodutível)
+          from src.pontuar_lote import calcular_valor_esperado
+
+          st.subheader(f"Valor Esperado ({quant_amostras} sorteios)", width='stretch')
+          with medir('app.valor_esperado'):
+            media, variancia = calcular_valor_esperado(modelo, pd.DataFrame([inputs_usuario]), quant_amostras)
+          col1, col2 = st.columns(2)
+          for coluna, classe in ((col1, 'aprovado'), (col2, 'reprovado')):
+            indice = indices_classes[classe]
+            coluna.metric(f"Média '{classe.capitalize()}'", f"{media[0, indice]*100:.2f}%",
+                          f"variância {variancia[0, indice]:.4f}", delta_color='off', width='stretch')
       
   else:
       st.info("Informe os dados e Clique para fazer a previsão...")
+
+def sidebar():
+  """
+    Função auxiliar que constroi o sidebar da página
+  """
+  with st.sidebar:
+    area_previsao()
    
 def main():
     """
     Função principal que executa o App Streamlit.
     """
-    global MODELO 
-    global CLASSES_MODELO
-    
-    # --- Carregamento do Modelo e das métricas (variaveis globais) ---
-    MODELO, CLASSES_MODELO = carregar_modelo(NOME_ARQUIVO_MODELO)
-    metricas = carregar_métricas(NOME_ARQUIVO_METRICAS)
+    # --- Carregamento do Modelo e das métricas ---
+    # Modelo e métricas vêm sempre da mesma versão
+    versao = carregar_recarregador().obter()
 
     st.title('Previsão de Desempenho de Alunos usando ML', width='stretch')
     st.subheader('Estudo de Caso da Imersão em IA (Aulas 1-3)', width='stretch')
     
     # Se o modelo não existir, exibe um aviso 
-    if MODELO is None:
+    if versao is None:
         st.error(f"Arquivo do modelo ('{NOME_ARQUIVO_MODELO}') não encontrado.")
-        st.warning("Execute o script 'python train.py' no terminal para treinar e criar o modelo.")
+        st.warning("Execute 'python run_pipeline.py' (ou 'python src/treinar_modelo.py') no terminal para treinar e criar o modelo.")
         st.stop() # Para a execução do app
+    metricas = versao['metricas']
 
     # --- Exibindo as métricas do nosso modelo treinado ---
     if metricas:
+      import pandas as pd
+
       st.markdown("---")
       st.header("📈 Desempenho do Modelo na Base de Testes (20%)")
 
@@ -189,6 +228,27 @@ def main():
           st.metric(label="Suporte Total", 
                     value=f"{metricas['weighted avg']['support']}", 
                     help="Número total de amostras no conjunto de testes (20%).")
+
+      # 1.2 Intervalos de confiança (bootstrap das previsões no conjunto de testes)
+      intervalos = metricas.get('intervalos_confianca')
+      if intervalos:
+        st.caption(
+          f"Intervalos de confiança de {intervalos['confianca']*100:.0f}% (bootstrap, {intervalos['reamostras']} reamostras): "
+          + " · ".join(f"{rotulo} [{intervalos[nome]['inferior']:.4f}, {intervalos[nome]['superior']:.4f}]"
+                       for nome, rotulo in METRICAS_INTERVALO.items())
+        )
+
+      # 1.3 Validação cruzada estratificada (se o treino rodou com --cv)
+      validacao = metricas.get('validacao_cruzada')
+      if validacao:
+        st.subheader(f"Validação Cruzada ({validacao['k_folds']} folds)")
+        df_validacao = pd.DataFrame({
+          'Média': validacao['media'],
+          'Desvio entre folds': validacao['desvio'],
+          'IC inferior': {nome: intervalo['inferior'] for nome, intervalo in validacao['intervalos'].items() if nome in METRICAS_INTERVALO},
+          'IC superior': {nome: intervalo['superior'] for nome, intervalo in validacao['intervalos'].items() if nome in METRICAS_INTERVALO},
+        }).rename(index=METRICAS_INTERVALO)
+        st.dataframe(df_validacao.style.format("{:.4f}"), use_container_width=True)
       
       st.markdown("---")
 
@@ -230,5 +290,4 @@ def main():
 
 # (Bloco pronto)
 if __name__ == "__main__":
-    random.seed(42)
     main()
\ No newline at end of file
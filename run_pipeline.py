@@ -1,54 +1,249 @@
+import argparse
+import ast
+import hashlib
+import json
 import subprocess
 import sys
-import os
-
-# ----------------------------------------------------
-# 1. FUNÇÃO AUXILIAR PARA RODAR SCRIPTS
-# ----------------------------------------------------
-def run_script(script_path, name):
-    """Executa um script Python e trata possíveis erros."""
-    print(f"\n========================================================")
-    print(f"🚀 INICIANDO {name}...")
-    print(f"========================================================")
-    
-    # O comando usa o interpretador Python atual (sys.executable)
-    # e o caminho do script.
-    result = subprocess.run([sys.executable, script_path], check=True)
-    
-    if result.returncode == 0:
-        print(f"✅ {name} CONCLUÍDO com sucesso.")
-    else:
-        # Isso só deve acontecer se 'check=True' falhar (retcode != 0), 
-        # mas é uma boa prática
-        print(f"❌ ERRO ao executar {name}. Código de retorno: {result.returncode}")
-        sys.exit(1)
+import time
+from pathlib import Path
+
+# ----------------------------------------------------
+# 0. ETAPAS DO PIPELINE (DAG) E CACHE
+# ----------------------------------------------------
+#
+# Cada etapa tem uma "impressão digital" (hash) calculada a partir de:
+#   - os parâmetros da etapa (config do gerador, semente, quantidade de linhas...)
+#   - o conteúdo dos arquivos fonte usados por ela: os listados em 'fontes' e todos os módulos
+#     src/ que eles importam (direta ou indiretamente, inclusive dentro de funções)
+#   - as impressões das etapas das quais ela depende
+# Se a impressão for a mesma da última execução e as saídas continuarem no disco (sem terem sido
+# alteradas), a etapa é pulada. As etapas rodam no próprio processo (sem subprocess), então as
+# importações são feitas uma única vez.
+
+RAIZ = Path(__file__).resolve().parent
+ARQUIVO_ESTADO = RAIZ / '.pipeline' / 'estado.json'
+APP_STREAMLIT_SCRIPT = RAIZ / 'app.py'
+
+
+def executar_gerar_dados(args):
+    from src.gerar_dados import URL_SAIDA_DADOS, gravar_registros_em_blocos
+    gravar_registros_em_blocos(args.rows, URL_SAIDA_DADOS, args.chunk_size, args.seed, retomar=False)
+
+
+def parametros_gerar_dados(args):
+    from src.gerar_dados import config
+    return {'config': config, 'semente': args.seed, 'quant_registros': args.rows, 'tamanho_bloco': args.chunk_size}
+
+
+def executar_validar_dados(args):
+    from src.gerar_dados import URL_SAIDA_DADOS
+    from src.validacao_dados import get_falhas, validar_dataset
+    perfil = validar_dataset(URL_SAIDA_DADOS, args.chunk_size)
+    if not perfil['aprovado']:
+        raise RuntimeError('A base não passou na validação: ' + '; '.join(get_falhas(perfil)))
+
+
+def executar_treinar_modelo(args):
+    from src.treinar_modelo import treinar_modelo
+    if not treinar_modelo():
+        raise RuntimeError('O treino do modelo falhou (detalhes acima).')
+
+
+ETAPAS = [
+    {
+        'nome': 'gerar_dados',
+        'titulo': 'Geração de Dados',
+        'dependencias': [],
+        'fontes': ['src/gerar_dados.py', 'src/armazenamento.py'],
+        'saidas': ['data/desempenho_alunos.parquet'],
+        'parametros': parametros_gerar_dados,
+        'executar': executar_gerar_dados,
+    },
+    {
+        'nome': 'validar_dados',
+        'titulo': 'Validação dos Dados',
+        'dependencias': ['gerar_dados'],
+        'fontes': ['src/validacao_dados.py'],
+        'saidas': ['data/desempenho_alunos.parquet.perfil.json'],
+        'parametros': lambda args: {'tamanho_bloco': args.chunk_size},
+        'executar': executar_validar_dados,
+    },
+    {
+        'nome': 'treinar_modelo',
+        'titulo': 'Treinamento do Modelo',
+        'dependencias': ['validar_dados'],
+        'fontes': ['src/treinar_modelo.py'],
+        'saidas': ['models/modelo_desempenho.pkl', 'models/model_metrics.json'],
+        'parametros': lambda args: {'comando': 'treinar'},
+        'executar': executar_treinar_modelo,
+    },
+]
+
+# ----------------------------------------------------
+# 1. FUNÇÕES AUXILIARES (impressões digitais e estado)
+# ----------------------------------------------------
+
+def get_hash_arquivo(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return hashlib.sha256(arquivo.read()).hexdigest()
+
+
+def get_fontes_importadas(fontes):
+    """Os arquivos fonte e todos os módulos 'src.<modulo>' importados por eles, recursivamente (caminhos relativos)."""
+    pendentes, encontradas = list(fontes), set()
+    while pendentes:
+        fonte = pendentes.pop()
+        if fonte in encontradas:
+            continue
+        encontradas.add(fonte)
+        for no in ast.walk(ast.parse((RAIZ / fonte).read_text(encoding='utf-8'))):
+            if isinstance(no, ast.ImportFrom) and no.module:
+                modulos = [no.module]
+            elif isinstance(no, ast.Import):
+                modulos = [alias.name for alias in no.names]
+            else:
+                continue
+            for modulo in modulos:
+                caminho = Path(*modulo.split('.')).with_suffix('.py')
+                if modulo.startswith('src.') and (RAIZ / caminho).exists():
+                    pendentes.append(caminho.as_posix())
+    return sorted(encontradas)
+
+
+def get_assinatura_saida(caminho):
+    """Tamanho e data de modificação da saída (de cada arquivo, se for uma pasta); None se não existir."""
+    caminho = RAIZ / caminho
+    if not caminho.exists():
+        return None
+    arquivos = sorted(caminho.rglob('*')) if caminho.is_dir() else [caminho]
+    return [[str(arquivo.relative_to(RAIZ)), arquivo.stat().st_size, arquivo.stat().st_mtime_ns]
+            for arquivo in arquivos if arquivo.is_file()]
+
+
+def calcular_impressao(etapa, args, impressoes):
+    conteudo = {
+        'etapa': etapa['nome'],
+        'parametros': etapa['parametros'](args),
+        'fontes': {fonte: get_hash_arquivo(RAIZ / fonte) for fonte in get_fontes_importadas(etapa['fontes'])},
+        'dependencias': {dependencia: impressoes[dependencia] for dependencia in etapa['dependencias']},
+    }
+    return hashlib.sha256(json.dumps(conteudo, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def carregar_estado():
+    if not ARQUIVO_ESTADO.exists():
+        return {}
+    with open(ARQUIVO_ESTADO, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def salvar_estado(estado):
+    ARQUIVO_ESTADO.parent.mkdir(parents=True, exist_ok=True)
+    caminho_tmp = ARQUIVO_ESTADO.with_name(ARQUIVO_ESTADO.name + '.tmp')
+    with open(caminho_tmp, 'w', encoding='utf-8') as arquivo:
+        json.dump(estado, arquivo, indent=2)
+    caminho_tmp.replace(ARQUIVO_ESTADO)
+
+# ----------------------------------------------------
+# 2. EXECUÇÃO DAS ETAPAS
+# ----------------------------------------------------
+
+def executar_pipeline(args, forcar=False):
+    """Roda as etapas na ordem do DAG, pulando as que não mudaram
+
+    Returns:
+        list: (nome da etapa, 'cache' ou 'executada', tempo em segundos) de cada etapa.
+    """
+    from src.instrumentacao import medir
+
+    estado = carregar_estado()
+    impressoes = {}
+    resumo = []
+
+    for etapa in ETAPAS:
+        nome = etapa['nome']
+        inicio = time.perf_counter()
+        impressoes[nome] = calcular_impressao(etapa, args, impressoes)
+
+        anterior = estado.get(nome, {})
+        saidas = {saida: get_assinatura_saida(saida) for saida in etapa['saidas']}
+        em_cache = (not forcar and anterior.get('impressao') == impressoes[nome]
+                    and None not in saidas.values() and anterior.get('saidas') == saidas)
+
+        if em_cache:
+            print(f"♻️  {etapa['titulo']}: sem mudanças, usando o resultado anterior (cache).")
+        else:
+            print(f"\n========================================================")
+            print(f"🚀 INICIANDO {etapa['titulo']}...")
+            print(f"========================================================")
+            inicio_execucao = time.time()
+            with medir(f'pipeline.{nome}'):
+                etapa['executar'](args)
+
+            # As funções das etapas tratam os próprios erros (só imprimem), então a falha é
+            # detectada pelas saídas que não foram (re)gravadas
+            for saida in etapa['saidas']:
+                caminho = RAIZ / saida
+                if not caminho.exists() or caminho.stat().st_mtime < inicio_execucao:
+                    raise RuntimeError(f"A etapa '{nome}' não gerou a saída '{saida}'.")
+
+            estado[nome] = {
+                'impressao': impressoes[nome],
+                'saidas': {saida: get_assinatura_saida(saida) for saida in etapa['saidas']},
+            }
+            salvar_estado(estado)
+            print(f"✅ {etapa['titulo']} CONCLUÍDO com sucesso.")
+
+        resumo.append((nome, 'cache' if em_cache else 'executada', time.perf_counter() - inicio))
+
+    return resumo
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description='Gera os dados, treina o modelo (com cache por etapa) e abre o app.')
+    parser.add_argument('--rows', type=int, default=50000, help='Quantidade de alunos a gerar.')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='Alunos por bloco na geração.')
+    parser.add_argument('--seed', type=int, default=42, help='Semente da geração.')
+    parser.add_argument('--force', action='store_true', help='Ignora o cache e roda todas as etapas.')
+    parser.add_argument('--no-app', action='store_true', help='Não inicia o Streamlit no final.')
+    parser.add_argument('--profile', type=Path, default=None,
+                        help='Roda as etapas sob cProfile/tracemalloc e grava <arquivo>.prof/.txt/.json.')
+    return parser
 
 # ----------------------------------------------------
-# 2. FLUXO PRINCIPAL DO PIPELINE
+# 3. FLUXO PRINCIPAL DO PIPELINE
 # ----------------------------------------------------
 if __name__ == "__main__":
-    
-    # Define os caminhos dos scripts (relativos à pasta raiz, onde este script será executado)
-    GERAR_DADOS_SCRIPT = os.path.join('src', 'gerar_dados.py')
-    TREINAR_MODELO_SCRIPT = os.path.join('src', 'treinar_modelo.py')
-    APP_STREAMLIT_SCRIPT = os.path.join('app.py')
+    args = criar_parser().parse_args()
+
+    # Permite importar os módulos do projeto como "src.<modulo>"
+    if str(RAIZ) not in sys.path:
+        sys.path.insert(0, str(RAIZ))
+
+    from src.instrumentacao import perfil_opcional
 
     try:
-        # 1. Geração de Dados (Gerar CSV)
-        run_script(GERAR_DADOS_SCRIPT, "Geração de Dados")
-        
-        # 2. Treinamento do Modelo (Cria os PKLs)
-        run_script(TREINAR_MODELO_SCRIPT, "Treinamento do Modelo")
-        
-        # 3. Inicia o Aplicativo Streamlit
-        print(f"\n========================================================")
-        print(f"🌐 INICIANDO STREAMLIT APP...")
-        print(f"========================================================")
-        
-        # Para Streamlit, use o comando "streamlit run"
-        subprocess.run(['streamlit', 'run', APP_STREAMLIT_SCRIPT], check=True)
-
-    except subprocess.CalledProcessError as e:
+        # 1. Geração de Dados, 2. Validação dos Dados e 3. Treinamento do Modelo (puladas se nada mudou)
+        with perfil_opcional(args.profile):
+            resumo = executar_pipeline(args, forcar=args.force)
+
+        print(f"\n--- Resumo das etapas ---")
+        for nome, situacao, tempo in resumo:
+            print(f"{nome:<16} {situacao:<10} {tempo:8.2f}s")
+        print(f"Etapas em cache: {sum(situacao == 'cache' for _, situacao, _ in resumo)} de {len(resumo)}")
+
+        if not args.no_app:
+            # 4. Inicia o Aplicativo Streamlit
+            print(f"\n========================================================")
+            print(f"🌐 INICIANDO STREAMLIT APP...")
+            print(f"========================================================")
+
+            # Para Streamlit, use o comando "streamlit run"
+            subprocess.run(['streamlit', 'run', str(APP_STREAMLIT_SCRIPT)], check=True)
+
+    except (RuntimeError, subprocess.CalledProcessError) as e:
         print(f"\n❌ PIPELINE INTERROMPIDO. Detalhes: {e}")
-    except FileNotFoundError:
-        print("\n❌ ERRO: Verifique se as pastas 'src' e 'data' existem e se os nomes dos arquivos estão corretos.")
\ No newline at end of file
+        sys.exit(1)
+    except FileNotFoundError as e:
+        print(f"\n❌ ERRO: Verifique se as pastas 'src' e 'data' existem e se os nomes dos arquivos estão corretos. ({e})")
+        sys.exit(1)
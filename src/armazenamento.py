@@ -0,0 +1,198 @@
+import re
+import sys
+import argparse
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Permite rodar "python src/armazenamento.py" e ainda importar os módulos irmãos como "src.<modulo>"
+if str(Path(__file__).resolve().parent.parent) not in sys.path:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.esquema import TIPOS_COLUNAS
+
+"""
+  Camada de leitura/escrita da base de alunos.
+
+  O formato padrão é Parquet (colunar, binário e com os tipos compactos de src/esquema.py).
+  O CSV continua disponível para exportação: o formato é escolhido pela extensão do caminho.
+
+  Uma base Parquet pode ser um único arquivo ou uma pasta com partes "part-00000.parquet",
+  "part-00001.parquet"... (é assim que a geração em blocos grava). As partes são lidas na ordem do número da parte
+  (a numeração passa de 5 dígitos a partir do bloco 100000, então a ordem do nome não serve).
+"""
+
+FORMATO_PARQUET = 'parquet'
+FORMATO_CSV = 'csv'
+
+TAMANHO_BLOCO_LEITURA = 1_000_000
+
+PADRAO_NOME_PARTE = re.compile(r'part-(\d+)\.parquet')
+
+
+def get_formato(caminho):
+    sufixo = Path(caminho).suffix.lower()
+    if sufixo == '.parquet':
+        return FORMATO_PARQUET
+    if sufixo == '.csv':
+        return FORMATO_CSV
+    raise ValueError(f'Formato de arquivo não suportado: "{caminho}". Use .parquet ou .csv')
+
+
+def aplicar_esquema(df, tipos=None):
+    """Converte as colunas conhecidas de um DataFrame para os tipos compactos do esquema (ou para 'tipos')."""
+    tipos = TIPOS_COLUNAS if tipos is None else tipos
+    return df.astype({coluna: tipo for coluna, tipo in tipos.items() if coluna in df.columns})
+
+
+def get_caminho_parte(pasta, indice_parte):
+    return Path(pasta) / f'part-{indice_parte:05d}.parquet'
+
+
+def get_indice_parte(caminho_parte):
+    """O número de uma parte "part-<n>.parquet" (também para o ".tmp" de uma parte), ou None se o nome não for de parte."""
+    correspondencia = PADRAO_NOME_PARTE.match(Path(caminho_parte).name)
+    return int(correspondencia.group(1)) if correspondencia else None
+
+
+def get_arquivos_parquet(caminho):
+    caminho = Path(caminho)
+    if caminho.is_dir():
+        partes = [parte for parte in caminho.glob('part-*.parquet') if get_indice_parte(parte) is not None]
+        return sorted(partes, key=get_indice_parte)
+    return [caminho]
+
+
+def serializar_bloco(df, formato, cabecalho=True):
+    """Converte um bloco de alunos para os bytes do formato escolhido
+
+    Args:
+        df (pd.DataFrame): Bloco de alunos.
+        formato (str): FORMATO_PARQUET ou FORMATO_CSV.
+        cabecalho (bool): Se o CSV deve começar com a linha de cabeçalho.
+
+    Returns:
+        bytes: Conteúdo pronto para ser gravado.
+    """
+    df = aplicar_esquema(df)
+
+    if formato == FORMATO_CSV:
+        # No CSV as flags continuam como 0/1, igual à base original
+        colunas_bool = df.select_dtypes('bool').columns
+        df = df.astype({coluna: 'int8' for coluna in colunas_bool})
+        return df.to_csv(index=False, header=cabecalho).encode('utf-8')
+
+    buffer = pa.BufferOutputStream()
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), buffer)
+    return buffer.getvalue().to_pybytes()
+
+
+def salvar_dataset(df, caminho):
+    """Salva um DataFrame inteiro no formato indicado pela extensão do caminho."""
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(serializar_bloco(df, get_formato(caminho)))
+
+
+def carregar_dataset(caminho, colunas=None, tipos=None):
+    """Carrega a base inteira (Parquet ou CSV) já com os tipos compactos do esquema
+
+    Args:
+        caminho (Path | str): Arquivo .csv/.parquet ou pasta com as partes .parquet.
+        colunas (list | None): Colunas a carregar. Se None, carrega todas.
+        tipos (dict | None): Tipo de cada coluna. Se None, usa os do esquema; {} mantém os tipos do
+            arquivo (ou os inferidos pelo pandas, no CSV).
+
+    Returns:
+        pd.DataFrame: A base de alunos.
+    """
+    tipos = TIPOS_COLUNAS if tipos is None else tipos
+    if get_formato(caminho) == FORMATO_PARQUET:
+        if not Path(caminho).exists():
+            raise FileNotFoundError(caminho)
+        return aplicar_esquema(pd.read_parquet(caminho, columns=colunas), tipos)
+
+    tipos = {coluna: tipo for coluna, tipo in tipos.items() if colunas is None or coluna in colunas}
+    return pd.read_csv(caminho, usecols=colunas, dtype=tipos)
+
+
+def iterar_dataset(caminho, tamanho_bloco=TAMANHO_BLOCO_LEITURA, colunas=None, tipos=None):
+    """Lê a base em blocos de até 'tamanho_bloco' linhas, sem carregá-la inteira na memória
+
+    Args:
+        tipos (dict | None): Mesmo significado de carregar_dataset (None = tipos do esquema).
+
+    Yields:
+        pd.DataFrame: Um bloco de alunos com os tipos compactos do esquema.
+    """
+    tipos = TIPOS_COLUNAS if tipos is None else tipos
+    if get_formato(caminho) == FORMATO_PARQUET:
+        if not Path(caminho).exists():
+            raise FileNotFoundError(caminho)
+        for arquivo in get_arquivos_parquet(caminho):
+            for lote in pq.ParquetFile(arquivo).iter_batches(batch_size=tamanho_bloco, columns=colunas):
+                yield aplicar_esquema(lote.to_pandas(), tipos)
+        return
+
+    tipos = {coluna: tipo for coluna, tipo in tipos.items() if colunas is None or coluna in colunas}
+    yield from pd.read_csv(caminho, usecols=colunas, dtype=tipos, chunksize=tamanho_bloco)
+
+
+class EscritorDataset:
+    """Grava uma base bloco a bloco em um único arquivo (.csv ou .parquet), sem mantê-la inteira na memória
+
+    Uso:
+        with EscritorDataset(caminho) as escritor:
+            for df in blocos:
+                escritor.escrever(df)
+    """
+
+    def __init__(self, caminho):
+        self.caminho = Path(caminho)
+        self.formato = get_formato(caminho)
+        self.arquivo = None
+        self.escritor_parquet = None
+        self.linhas_gravadas = 0
+
+    def escrever(self, df):
+        if self.formato == FORMATO_CSV:
+            primeiro_bloco = self.arquivo is None
+            if primeiro_bloco:
+                self.arquivo = open(self.caminho, 'wb')
+            self.arquivo.write(serializar_bloco(df, FORMATO_CSV, cabecalho=primeiro_bloco))
+        else:
+            tabela = pa.Table.from_pandas(aplicar_esquema(df), preserve_index=False)
+            if self.escritor_parquet is None:
+                self.escritor_parquet = pq.ParquetWriter(self.caminho, tabela.schema)
+            self.escritor_parquet.write_table(tabela)
+        self.linhas_gravadas += len(df)
+
+    def fechar(self):
+        if self.arquivo is not None:
+            self.arquivo.close()
+        if self.escritor_parquet is not None:
+            self.escritor_parquet.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+
+def converter_dataset(caminho_origem, caminho_destino, tamanho_bloco=TAMANHO_BLOCO_LEITURA):
+    """Converte a base entre CSV e Parquet em blocos (ex.: exportar o Parquet para CSV)."""
+    with EscritorDataset(caminho_destino) as escritor:
+        for df in iterar_dataset(caminho_origem, tamanho_bloco):
+            escritor.escrever(df)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Converte a base de alunos entre CSV e Parquet.')
+    parser.add_argument('origem', type=Path, help='Arquivo (ou pasta Parquet) de origem.')
+    parser.add_argument('destino', type=Path, help='Arquivo de destino (.csv ou .parquet).')
+    args = parser.parse_args()
+
+    converter_dataset(args.origem, args.destino)
+    print(f'--- Base convertida com sucesso: "{args.destino}" ---')
@@ -0,0 +1,321 @@
+import itertools
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.esquema import CLASSES_SITUACAO
+
+"""
+  Árvore de decisão treinada "fora da memória" (out-of-core).
+
+  Em vez de carregar a base inteira como o DecisionTreeClassifier, a base é lida uma vez em blocos e
+  guardada em disco. Os limites dos bins saem de uma amostra uniforme de todas as linhas (amostragem
+  de reservatório durante a leitura, e não só do primeiro bloco) e a cópia em disco é então
+  discretizada em bins (1 byte por feature). A árvore é construída nível a nível:
+  a cada nível, uma passada em blocos (via memmap) acumula, para cada nó da fronteira, um histograma
+  (feature x bin x classe) das linhas que chegam nele. O melhor corte de cada nó sai desses
+  histogramas (critério de Gini), então a memória usada depende do tamanho do bloco e da quantidade
+  de nós, não da quantidade de linhas.
+
+  O resultado guarda os mesmos arrays planos da árvore do sklearn (feature, threshold,
+  children_left, children_right, value) e expõe predict/predict_proba/classes_, então o
+  modelo_desempenho.pkl continua sendo usado da mesma forma pelo app.py.
+
+  Como no sklearn, as features são convertidas para float32 no treino e na previsão, e os thresholds
+  são valores float32 exatos: a árvore, o .pkl e a versão compilada (src/inferencia.py) comparam
+  'x <= threshold' da mesma forma.
+"""
+
+FOLHA = -1
+
+# Linhas da amostra usada para definir os bins (a mesma ordem de grandeza do HistGradientBoostingClassifier)
+TAMANHO_AMOSTRA_BINS = 200_000
+
+
+def codificar_classes(classes, y):
+    """Converte os rótulos em índices de 'classes' (com atalho para colunas category, bem mais rápido)."""
+    if isinstance(getattr(y, 'dtype', None), pd.CategoricalDtype):
+        y = pd.Series(y)
+        codigos_categorias = np.searchsorted(classes, np.asarray(y.cat.categories, dtype=object))
+        return codigos_categorias[y.cat.codes.to_numpy()]
+    return np.searchsorted(classes, np.asarray(y))
+
+
+def amostrar_reservatorio(reservatorio, quant_vistas, X, rng):
+    """Amostragem de reservatório (algoritmo R) das linhas de X, vetorizada por bloco
+
+    Depois de todos os blocos, reservatorio[:min(quant_vistas, len(reservatorio))] é uma amostra
+    uniforme de todas as linhas vistas, sem depender de quantos blocos foram nem do tamanho de cada um.
+
+    Returns:
+        int: Quantidade de linhas vistas, incluindo as de X.
+    """
+    capacidade = len(reservatorio)
+    livres = max(0, min(capacidade - quant_vistas, len(X)))
+    reservatorio[quant_vistas:quant_vistas + livres] = X[:livres]
+    # A linha de posição i (contando todos os blocos) entra no lugar j sorteado em [0, i], se j < capacidade
+    posicoes = rng.integers(0, np.arange(quant_vistas + livres, quant_vistas + len(X)) + 1)
+    entram = np.flatnonzero(posicoes < capacidade)
+    reservatorio[posicoes[entram]] = X[livres + entram]
+    return quant_vistas + len(X)
+
+
+class ArvoreHistograma:
+
+    def __init__(self, max_depth=12, min_samples_leaf=20, max_bins=256):
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.max_bins = max_bins
+
+    # __________ Binning __________
+
+    def calcular_bins(self, X_amostra):
+        """Define os limites dos bins de cada feature a partir de uma amostra
+
+        Features com poucos valores distintos usam os pontos médios entre todos os valores vizinhos.
+        As demais usam quantis da amostra, como no HistGradientBoostingClassifier, mas o corte fica no
+        ponto médio entre o valor do quantil e o valor distinto seguinte: um limite nunca é igual a um
+        valor observado, então o bin de cada valor não depende de arredondamentos.
+        """
+        X_amostra = np.asarray(X_amostra, dtype=np.float32)
+        self.limites_bins_ = []
+        for coluna in range(X_amostra.shape[1]):
+            valores = np.unique(X_amostra[:, coluna])
+            if len(valores) <= self.max_bins:
+                esquerda, direita = valores[:-1], valores[1:]
+            else:
+                quantis = np.quantile(X_amostra[:, coluna], np.linspace(0, 1, self.max_bins + 1)[1:-1])
+                indices = np.unique(np.clip(np.searchsorted(valores, quantis, side='right') - 1, 0, len(valores) - 2))
+                esquerda, direita = valores[indices], valores[indices + 1]
+            limites = ((esquerda.astype(np.float64) + direita) / 2).astype(np.float32)
+            # Entre dois float32 vizinhos o ponto médio arredonda para um deles: o corte fica no da esquerda
+            self.limites_bins_.append(np.where(limites >= direita, esquerda, limites))
+
+    def aplicar_bins(self, X):
+        # bin(x) = quantidade de limites < x, então "bin(x) <= b" equivale a "x <= limites[b]"
+        X_bins = np.empty(X.shape, dtype=np.uint8)
+        for coluna, limites in enumerate(self.limites_bins_):
+            X_bins[:, coluna] = np.searchsorted(limites, X[:, coluna], side='left')
+        return X_bins
+
+    # __________ Treino __________
+
+    def fit_blocos(self, blocos, pasta_temporaria=None, classes=None):
+        """Treina a árvore a partir de uma sequência de blocos (X, y), lida uma única vez
+
+        Na leitura, cada bloco é gravado (float32) em um arquivo temporário e entra na amostra de
+        reservatório que define os bins, então os limites representam a base toda (e não um primeiro
+        bloco pequeno ou ordenado). Em seguida o arquivo é convertido em bins (uint8) e os níveis da
+        árvore são construídos percorrendo os bins via memmap (1 byte por feature por linha), sem
+        reler nem reprocessar a base original.
+
+        Args:
+            blocos (iterable): Blocos (X, y), com X um DataFrame de features e
+                y os rótulos (array ou Series, de preferência category).
+            pasta_temporaria (str | None): Onde gravar os arquivos temporários. Se None, usa o padrão do sistema.
+            classes (list | None): Classes possíveis. Se None, usa as do esquema (src/esquema.py), e não
+                só as que aparecem no primeiro bloco.
+
+        Returns:
+            ArvoreHistograma: A própria árvore treinada.
+
+        Raises:
+            ValueError: Se algum bloco tiver uma classe fora de 'classes'.
+        """
+        blocos = iter(blocos)
+        X_primeiro, y_primeiro = next(blocos)
+        self.feature_names_in_ = np.asarray(X_primeiro.columns, dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        self.classes_ = np.unique(np.asarray(CLASSES_SITUACAO if classes is None else classes, dtype=object))
+
+        n_features = self.n_features_in_
+        n_classes = len(self.classes_)
+        n_bins = self.max_bins
+
+        with tempfile.TemporaryDirectory(dir=pasta_temporaria) as pasta:
+            pasta = Path(pasta)
+
+            # _____ Passada única pela base: features + classes em arquivos binários e amostra dos bins _____
+            n_linhas = 0
+            tamanho_bloco = len(X_primeiro)
+            # Semente fixa: a mesma base gera sempre os mesmos bins (e a mesma árvore)
+            rng = np.random.default_rng(0)
+            amostra = np.empty((TAMANHO_AMOSTRA_BINS, n_features), dtype=np.float32)
+            with open(pasta / 'X.bin', 'wb') as arquivo_X, open(pasta / 'y.bin', 'wb') as arquivo_y:
+                for X, y in itertools.chain([(X_primeiro, y_primeiro)], blocos):
+                    X = self.get_array(X)
+                    X.tofile(arquivo_X)
+                    amostrar_reservatorio(amostra, n_linhas, X, rng)
+                    desconhecidas = set(pd.unique(pd.Series(y)).tolist()) - set(self.classes_.tolist())
+                    if desconhecidas:
+                        raise ValueError(f'Classes fora de {self.classes_.tolist()}: {sorted(map(str, desconhecidas))}')
+                    codificar_classes(self.classes_, y).astype(np.uint8).tofile(arquivo_y)
+                    n_linhas += len(X)
+                    tamanho_bloco = max(tamanho_bloco, len(X))
+
+            # _____ Bins definidos pela amostra de toda a base; features convertidas em bins, bloco a bloco _____
+            self.calcular_bins(amostra[:min(n_linhas, len(amostra))])
+            del amostra
+            X_float = np.memmap(pasta / 'X.bin', dtype=np.float32, mode='r', shape=(n_linhas, n_features))
+            with open(pasta / 'X_bins.bin', 'wb') as arquivo_bins:
+                for inicio in range(0, n_linhas, tamanho_bloco):
+                    self.aplicar_bins(np.asarray(X_float[inicio:inicio + tamanho_bloco])).tofile(arquivo_bins)
+            del X_float
+            (pasta / 'X.bin').unlink()
+
+            X_bins = np.memmap(pasta / 'X_bins.bin', dtype=np.uint8, mode='r', shape=(n_linhas, n_features))
+            y_codigos = np.memmap(pasta / 'y.bin', dtype=np.uint8, mode='r', shape=(n_linhas,))
+            nos = np.memmap(pasta / 'nos.bin', dtype=np.int32, mode='w+', shape=(n_linhas,))
+
+            self.feature = [FOLHA]
+            self.threshold = [0.0]
+            self.bin_corte = [0]
+            self.children_left = [FOLHA]
+            self.children_right = [FOLHA]
+            self.value = [np.zeros(n_classes)]
+            fronteira = [0]
+            deslocamento_features = (np.arange(n_features) * n_bins * n_classes)[None, :]
+
+            for profundidade in range(self.max_depth + 1):
+                if not fronteira:
+                    break
+
+                feature = np.asarray(self.feature, dtype=np.int64)
+                bin_corte = np.asarray(self.bin_corte, dtype=np.int64)
+                children_left = np.asarray(self.children_left, dtype=np.int64)
+                children_right = np.asarray(self.children_right, dtype=np.int64)
+                posicao_na_fronteira = np.full(len(feature), -1, dtype=np.int64)
+                posicao_na_fronteira[fronteira] = np.arange(len(fronteira))
+
+                histograma = np.zeros(len(fronteira) * n_features * n_bins * n_classes, dtype=np.int64)
+
+                for inicio in range(0, n_linhas, tamanho_bloco):
+                    fatia = slice(inicio, inicio + tamanho_bloco)
+                    X_bloco = np.asarray(X_bins[fatia])
+                    nos_bloco = np.asarray(nos[fatia])
+
+                    # Desce um nível as linhas que estão em nós divididos no nível anterior
+                    divididos = np.flatnonzero(feature[nos_bloco] != FOLHA)
+                    if len(divididos):
+                        no = nos_bloco[divididos]
+                        vai_para_esquerda = X_bloco[divididos, feature[no]] <= bin_corte[no]
+                        nos_bloco[divididos] = np.where(vai_para_esquerda, children_left[no], children_right[no])
+                        nos[fatia] = nos_bloco
+
+                    posicao = posicao_na_fronteira[nos_bloco]
+                    na_fronteira = np.flatnonzero(posicao >= 0)
+                    indices = (
+                        posicao[na_fronteira, None] * (n_features * n_bins * n_classes)
+                        + deslocamento_features
+                        + X_bloco[na_fronteira].astype(np.int64) * n_classes
+                        + y_codigos[fatia][na_fronteira, None]
+                    )
+                    histograma += np.bincount(indices.ravel(), minlength=len(histograma))
+
+                histograma = histograma.reshape(len(fronteira), n_features, n_bins, n_classes)
+                fronteira = self.dividir_fronteira(fronteira, histograma, profundidade)
+
+            # Fecha os memmaps antes de apagar a pasta temporária
+            del X_bins, y_codigos, nos
+
+        self.feature = np.asarray(self.feature, dtype=np.int64)
+        self.threshold = np.asarray(self.threshold, dtype=np.float64)
+        self.children_left = np.asarray(self.children_left, dtype=np.int64)
+        self.children_right = np.asarray(self.children_right, dtype=np.int64)
+        self.value = np.asarray(self.value, dtype=np.float64)
+        del self.bin_corte
+        return self
+
+    def dividir_fronteira(self, fronteira, histograma, profundidade):
+        """Escolhe o melhor corte (Gini) de cada nó da fronteira e cria os filhos dos que forem divididos."""
+        nova_fronteira = []
+
+        # As contagens por classe do nó são as mesmas em qualquer feature
+        contagens_nos = histograma[:, 0].sum(axis=1)
+
+        # Processa os nós em lotes para limitar a memória dos arrays temporários
+        for inicio in range(0, len(fronteira), 256):
+            hist = histograma[inicio:inicio + 256].astype(np.float64)
+            esquerda = np.cumsum(hist, axis=2)
+            total = esquerda[:, :, -1:, :]
+            direita = total - esquerda
+
+            n_esquerda = esquerda.sum(axis=3)
+            n_direita = direita.sum(axis=3)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # Minimizar o Gini ponderado equivale a maximizar sum(c^2)/n dos dois lados
+                pontuacao = (esquerda ** 2).sum(axis=3) / n_esquerda + (direita ** 2).sum(axis=3) / n_direita
+            pontuacao[(n_esquerda < self.min_samples_leaf) | (n_direita < self.min_samples_leaf)] = -np.inf
+
+            for i in range(hist.shape[0]):
+                no = fronteira[inicio + i]
+                contagem = contagens_nos[inicio + i]
+                self.value[no] = contagem.astype(np.float64)
+
+                n_amostras = contagem.sum()
+                if (profundidade >= self.max_depth or n_amostras < 2 * self.min_samples_leaf
+                        or np.count_nonzero(contagem) <= 1):
+                    continue
+
+                feature, bin_corte = np.unravel_index(np.argmax(pontuacao[i]), pontuacao[i].shape)
+                melhor = pontuacao[i, feature, bin_corte]
+                if not np.isfinite(melhor) or melhor <= (contagem.astype(np.float64) ** 2).sum() / n_amostras + 1e-12:
+                    continue
+
+                limites = self.limites_bins_[feature]
+                if bin_corte >= len(limites):
+                    continue
+
+                self.feature[no] = int(feature)
+                self.threshold[no] = float(limites[bin_corte])
+                self.bin_corte[no] = int(bin_corte)
+                for lado in (self.children_left, self.children_right):
+                    lado[no] = len(self.feature)
+                    self.feature.append(FOLHA)
+                    self.threshold.append(0.0)
+                    self.bin_corte.append(0)
+                    self.children_left.append(FOLHA)
+                    self.children_right.append(FOLHA)
+                    self.value.append(np.zeros(len(self.classes_)))
+                    nova_fronteira.append(lado[no])
+
+        return nova_fronteira
+
+    # __________ Previsão __________
+
+    def get_arrays_arvore(self):
+        return (np.asarray(self.feature, dtype=np.int64),
+                np.asarray(self.threshold, dtype=np.float64),
+                np.asarray(self.children_left, dtype=np.int64),
+                np.asarray(self.children_right, dtype=np.int64))
+
+    def get_array(self, X):
+        if isinstance(X, pd.DataFrame) and hasattr(self, 'feature_names_in_'):
+            X = X[list(self.feature_names_in_)]
+        # Mesma precisão do treino (aplicar_bins) e da árvore compilada
+        return np.asarray(X, dtype=np.float32)
+
+    @staticmethod
+    def aplicar_arvore(X, arrays):
+        """Devolve o índice da folha (ou do nó atual da fronteira) de cada linha, percorrendo a árvore em lote."""
+        feature, threshold, children_left, children_right = arrays
+        nos = np.zeros(len(X), dtype=np.int64)
+        ativos = np.flatnonzero(feature[nos] != FOLHA)
+        while len(ativos):
+            no = nos[ativos]
+            vai_para_esquerda = X[ativos, feature[no]] <= threshold[no]
+            nos[ativos] = np.where(vai_para_esquerda, children_left[no], children_right[no])
+            ativos = ativos[feature[nos[ativos]] != FOLHA]
+        return nos
+
+    def apply(self, X):
+        return self.aplicar_arvore(self.get_array(X), self.get_arrays_arvore())
+
+    def predict_proba(self, X):
+        contagens = self.value[self.apply(X)]
+        return contagens / contagens.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.value[self.apply(X)], axis=1)]
@@ -0,0 +1,147 @@
+import numpy as np
+
+# O joblib e o sklearn só são importados na validação cruzada: o app.py importa este módulo
+# (nomes das métricas) sem pagar por essas importações
+
+"""
+  Avaliação do modelo além do split 80/20: validação cruzada estratificada e intervalos de confiança.
+
+  - Validação cruzada: os k folds são treinados em paralelo (joblib, um processo por fold). X e y vão
+    para os processos como arrays numpy (float32 e códigos das classes), que o joblib compartilha por
+    memória mapeada em vez de copiar para cada fold. As tarefas já começam a rodar assim que são
+    criadas, então o treino do modelo final pode acontecer ao mesmo tempo no processo principal.
+  - Intervalos de confiança (bootstrap): reamostrar as linhas de um conjunto de previsões com
+    reposição equivale a sortear a matriz de confusão de uma multinomial com as proporções de cada
+    célula. Então as B reamostras são B matrizes sorteadas de uma vez (B x classes x classes), e as
+    métricas saem vetorizadas, sem reajustar o modelo e sem depender da quantidade de linhas.
+"""
+
+K_FOLDS_PADRAO = 5
+QUANT_REAMOSTRAS_PADRAO = 2000
+CONFIANCA_PADRAO = 0.95
+
+# Métricas com intervalo de confiança: nome no JSON -> nome exibido
+METRICAS_INTERVALO = {
+    'acuracia': 'Acurácia',
+    'f1_ponderado': 'F1-Score (Ponderado)',
+    'precisao_ponderada': 'Precisão (Ponderada)',
+}
+
+
+def calcular_matriz_confusao(real, previsto, n_classes):
+    """Matriz de confusão (linhas = classe real, colunas = classe prevista) a partir dos códigos das classes."""
+    real = np.asarray(real, dtype=np.int64)
+    previsto = np.asarray(previsto, dtype=np.int64)
+    return np.bincount(real * n_classes + previsto, minlength=n_classes * n_classes).reshape(n_classes, n_classes)
+
+
+def calcular_metricas_matrizes(matrizes):
+    """Acurácia, F1 ponderado e precisão ponderada (como no classification_report) de várias matrizes de uma vez
+
+    Args:
+        matrizes (np.ndarray): Matrizes de confusão empilhadas, formato (B, classes, classes).
+
+    Returns:
+        dict: Um array de B valores por métrica.
+    """
+    matrizes = np.asarray(matrizes, dtype=np.float64)
+    acertos = np.diagonal(matrizes, axis1=1, axis2=2)
+    suporte = matrizes.sum(axis=2)
+    previstos = matrizes.sum(axis=1)
+    total = suporte.sum(axis=1)
+
+    # Mesma convenção do sklearn (zero_division): divisões por zero contam como 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precisao = np.where(previstos > 0, acertos / previstos, 0.0)
+        recall = np.where(suporte > 0, acertos / suporte, 0.0)
+        f1 = np.where(precisao + recall > 0, 2 * precisao * recall / (precisao + recall), 0.0)
+    peso = suporte / total[:, None]
+
+    return {
+        'acuracia': acertos.sum(axis=1) / total,
+        'f1_ponderado': (f1 * peso).sum(axis=1),
+        'precisao_ponderada': (precisao * peso).sum(axis=1),
+    }
+
+
+def calcular_intervalos_bootstrap(matriz_confusao, quant_reamostras=QUANT_REAMOSTRAS_PADRAO,
+                                  confianca=CONFIANCA_PADRAO, semente=42):
+    """Intervalos de confiança (percentis do bootstrap) da acurácia, F1 e precisão de um conjunto de previsões
+
+    Returns:
+        dict: Por métrica, {'estimativa', 'inferior', 'superior'}, mais 'confianca' e 'reamostras'.
+    """
+    matriz_confusao = np.asarray(matriz_confusao)
+    quant_linhas = int(matriz_confusao.sum())
+    proporcoes = matriz_confusao.ravel() / quant_linhas
+
+    rng = np.random.default_rng(semente)
+    reamostras = rng.multinomial(quant_linhas, proporcoes, size=quant_reamostras).reshape(
+        quant_reamostras, *matriz_confusao.shape)
+
+    estimativas = calcular_metricas_matrizes(matriz_confusao[None])
+    metricas = calcular_metricas_matrizes(reamostras)
+    alfa = (1 - confianca) / 2
+    intervalos = {
+        nome: {
+            'estimativa': float(estimativas[nome][0]),
+            'inferior': float(np.quantile(valores, alfa)),
+            'superior': float(np.quantile(valores, 1 - alfa)),
+        }
+        for nome, valores in metricas.items()
+    }
+    intervalos.update({'confianca': confianca, 'reamostras': quant_reamostras})
+    return intervalos
+
+
+def ajustar_fold(X, y, indices_treino, indices_teste, parametros):
+    """Treina um fold e devolve os índices e as classes previstas (códigos) das linhas de teste."""
+    from sklearn.tree import DecisionTreeClassifier
+
+    modelo = DecisionTreeClassifier(**parametros).fit(X[indices_treino], y[indices_treino])
+    return indices_teste, modelo.predict(X[indices_teste])
+
+
+def iniciar_validacao_cruzada(X, y, k_folds=K_FOLDS_PADRAO, parametros=None, n_jobs=-1, semente=42):
+    """Dispara os k folds em paralelo e devolve um gerador com o resultado de cada fold (na ordem em que terminam)
+
+    Args:
+        X (np.ndarray): Features (float32).
+        y (np.ndarray): Classe de cada linha, como código inteiro.
+
+    Os folds começam a rodar na hora: quem chamou pode fazer outra coisa (ex.: treinar o modelo
+    final) e consumir o gerador depois, com resumir_validacao_cruzada().
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+
+    parametros = {'random_state': 42} if parametros is None else parametros
+    folds = StratifiedKFold(n_splits=k_folds, shuffle=True, random_state=semente).split(np.zeros(len(y)), y)
+    return Parallel(n_jobs=n_jobs, return_as='generator_unordered')(
+        delayed(ajustar_fold)(X, y, indices_treino, indices_teste, parametros)
+        for indices_treino, indices_teste in folds
+    )
+
+
+def resumir_validacao_cruzada(resultados_folds, y, n_classes, quant_reamostras=QUANT_REAMOSTRAS_PADRAO,
+                              confianca=CONFIANCA_PADRAO, semente=42):
+    """Métricas de cada fold, média e desvio entre os folds e intervalos de confiança das previsões fora do fold
+
+    Returns:
+        dict: 'k_folds', 'folds' (métricas de cada fold), 'media', 'desvio' e 'intervalos'.
+    """
+    previsto = np.empty(len(y), dtype=np.int64)
+    matrizes_folds = []
+    for indices_teste, previsto_fold in resultados_folds:
+        previsto[indices_teste] = previsto_fold
+        matrizes_folds.append(calcular_matriz_confusao(y[indices_teste], previsto_fold, n_classes))
+
+    metricas_folds = calcular_metricas_matrizes(np.stack(matrizes_folds))
+    return {
+        'k_folds': len(matrizes_folds),
+        'folds': [{nome: float(valores[i]) for nome, valores in metricas_folds.items()} for i in range(len(matrizes_folds))],
+        'media': {nome: float(valores.mean()) for nome, valores in metricas_folds.items()},
+        'desvio': {nome: float(valores.std(ddof=1)) if len(valores) > 1 else 0.0 for nome, valores in metricas_folds.items()},
+        'intervalos': calcular_intervalos_bootstrap(calcular_matriz_confusao(y, previsto, n_classes),
+                                                    quant_reamostras, confianca, semente),
+    }
@@ -0,0 +1,320 @@
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage, o pico de memória não é medido
+    resource = None
+
+# Permite rodar "python src/benchmark.py" e ainda importar os módulos irmãos como "src.<modulo>"
+if str(Path(__file__).resolve().parent.parent) not in sys.path:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+"""
+  Suíte de benchmarks de ponta a ponta (local, sem rede):
+    - geração: linhas/s de gerar_registros (escalar, até o DataFrame) e da geração vetorizada em blocos
+    - leitura: tempo e pico de memória (RSS) para carregar a base em CSV e em Parquet
+    - treino: tempo e pico de memória do DecisionTreeClassifier e da ArvoreHistograma por quantidade de linhas
+    - previsão: latências p50/p95/p99 de uma linha (árvore compilada, sklearn e o caminho do app.py) e de lotes
+      (incluindo a explicação do lote: regra + contribuições)
+
+  Cada medição de tempo/memória pesada roda em um processo novo, para o pico de RSS de uma não
+  contaminar a outra. O resultado é um JSON com uma entrada por métrica ({valor, unidade, maior_melhor}).
+
+  Com --baseline, compara o resultado com um JSON salvo antes e aponta as métricas que pioraram
+  mais que o --threshold (o processo termina com código 1 se houver alguma regressão).
+
+  Uso:
+    python src/benchmark.py --out benchmark.json
+    python src/benchmark.py --quick --baseline benchmark.json
+    python src/benchmark.py --compare atual.json --baseline benchmark.json
+"""
+
+TAMANHOS_GERACAO = [10_000, 1_000_000, 10_000_000]
+TAMANHO_GERACAO_ESCALAR = 10_000
+TAMANHO_LEITURA = 1_000_000
+TAMANHOS_TREINO = [10_000, 100_000, 1_000_000]
+REPETICOES_PREVISAO = 2000
+TAMANHO_LOTE_PREVISAO = 1000
+
+# Versão reduzida da suíte (para rodar a cada mudança)
+TAMANHOS_GERACAO_RAPIDO = [10_000, 1_000_000]
+TAMANHO_LEITURA_RAPIDO = 200_000
+TAMANHOS_TREINO_RAPIDO = [10_000, 100_000]
+
+LIMITE_REGRESSAO_PADRAO = 0.10
+
+
+def get_pico_rss_mb():
+    """Pico de memória residente (RSS) do processo atual, em MB (None se não houver getrusage)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS em bytes
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def executar_em_processo_novo(funcao, *args):
+    """Roda a função em um processo novo (spawn) e devolve o resultado."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(funcao, *args).result()
+
+
+def metrica(valor, unidade, maior_melhor=False):
+    return {'valor': valor, 'unidade': unidade, 'maior_melhor': maior_melhor}
+
+
+def get_percentis_ms(tempos):
+    return {f'p{percentil}': float(np.percentile(tempos, percentil) * 1000) for percentil in (50, 95, 99)}
+
+
+# __________ Medições (cada uma roda em um processo novo) __________
+
+def medir_geracao_escalar(quant_registros):
+    import random
+    from src.gerar_dados import gerar_registros, registros_para_dataframe
+
+    registros_para_dataframe(gerar_registros(10, random.Random(42)))  # aquecimento (importa o pandas)
+    inicio = time.perf_counter()
+    registros_para_dataframe(gerar_registros(quant_registros, random.Random(42)))
+    tempo = time.perf_counter() - inicio
+    return {'tempo_s': tempo, 'linhas_por_s': quant_registros / tempo, 'pico_rss_mb': get_pico_rss_mb()}
+
+
+def medir_geracao_vetorizada(quant_registros):
+    from src.gerar_dados import SEMENTE_PADRAO, TAMANHO_BLOCO_PADRAO, gerar_bloco
+
+    # Aquecimento: a primeira chamada importa o pandas, o que não faz parte da geração
+    gerar_bloco(0, 1000, 1000, SEMENTE_PADRAO)
+    inicio = time.perf_counter()
+    for indice_bloco in range(-(-quant_registros // TAMANHO_BLOCO_PADRAO)):
+        gerar_bloco(indice_bloco, TAMANHO_BLOCO_PADRAO, quant_registros, SEMENTE_PADRAO)
+    tempo = time.perf_counter() - inicio
+    return {'tempo_s': tempo, 'linhas_por_s': quant_registros / tempo, 'pico_rss_mb': get_pico_rss_mb()}
+
+
+def medir_leitura(caminho):
+    from src.armazenamento import carregar_dataset
+
+    rss_antes = get_pico_rss_mb()
+    inicio = time.perf_counter()
+    dados = carregar_dataset(caminho)
+    tempo = time.perf_counter() - inicio
+    pico = get_pico_rss_mb()
+    return {
+        'tempo_s': tempo,
+        'pico_rss_mb': pico,
+        'pico_rss_acima_base_mb': None if pico is None else pico - rss_antes,
+        'memoria_dataframe_mb': dados.memory_usage(deep=True).sum() / (1024 * 1024),
+    }
+
+
+def medir_treino(caminho, modelo_incremental):
+    from sklearn.tree import DecisionTreeClassifier
+    from src.armazenamento import carregar_dataset
+    from src.arvore_histograma import ArvoreHistograma
+    from src.esquema import COLUNA_ALVO, COLUNAS_FEATURES
+    from src.treinar_modelo import TAMANHO_BLOCO_TREINO, iterar_blocos_treino
+
+    rss_antes = get_pico_rss_mb()
+    inicio = time.perf_counter()
+    if modelo_incremental:
+        ArvoreHistograma(max_depth=12).fit_blocos(iterar_blocos_treino(caminho, TAMANHO_BLOCO_TREINO))
+    else:
+        dados = carregar_dataset(caminho)
+        DecisionTreeClassifier(random_state=42).fit(dados[COLUNAS_FEATURES], dados[COLUNA_ALVO])
+    tempo = time.perf_counter() - inicio
+    pico = get_pico_rss_mb()
+    return {'tempo_s': tempo, 'pico_rss_mb': pico, 'pico_rss_acima_base_mb': None if pico is None else pico - rss_antes}
+
+
+def medir_previsao(repeticoes, tamanho_lote):
+    """Latências de uma linha e de um lote para a árvore compilada, o .pkl (sklearn) e o caminho do app."""
+    import joblib
+    import pandas as pd
+    from src.cache_previsoes import CachePrevisoes
+    from src.gerar_dados import gerar_registros_vetorizado
+    from src.inferencia import NOME_ARQUIVO_MODELO, NOME_ARQUIVO_MODELO_COMPILADO, PreditorArvore
+
+    modelos = {'sklearn': joblib.load(NOME_ARQUIVO_MODELO)}
+    if Path(NOME_ARQUIVO_MODELO_COMPILADO).is_dir():
+        modelos['compilado'] = PreditorArvore.carregar(NOME_ARQUIVO_MODELO_COMPILADO)
+
+    dados = gerar_registros_vetorizado(max(repeticoes, tamanho_lote), rng=42)
+    X = dados[list(modelos['sklearn'].feature_names_in_)]
+    linhas = X.to_dict('records')
+
+    resultado = {}
+    for nome, modelo in modelos.items():
+        tempos = []
+        for i in range(repeticoes):
+            inicio = time.perf_counter()
+            if nome == 'compilado':
+                modelo.prever_um(linhas[i])
+            else:
+                modelo.predict_proba(pd.DataFrame([linhas[i]]))
+            tempos.append(time.perf_counter() - inicio)
+        resultado[f'uma_linha.{nome}'] = get_percentis_ms(tempos)
+
+        lote = X.iloc[:tamanho_lote]
+        tempos = []
+        for _ in range(max(repeticoes // 20, 10)):
+            inicio = time.perf_counter()
+            modelo.predict_proba(lote)
+            tempos.append(time.perf_counter() - inicio)
+        resultado[f'lote_{tamanho_lote}.{nome}'] = get_percentis_ms(tempos)
+
+    # Explicação do lote (regra + contribuições), para comparar com o predict_proba do mesmo lote
+    from src.explicacao import ExplicadorArvore
+    explicador = ExplicadorArvore(modelos.get('compilado', modelos['sklearn']))
+    lote = X.iloc[:tamanho_lote]
+    tempos = []
+    for _ in range(max(repeticoes // 20, 10)):
+        inicio = time.perf_counter()
+        explicador.explicar_lote(lote)
+        tempos.append(time.perf_counter() - inicio)
+    resultado[f'lote_{tamanho_lote}.explicacao'] = get_percentis_ms(tempos)
+
+    # Caminho do formulário do app.py: cálculo das colunas dependentes + previsão, sem acertos no cache
+    modelo_app = modelos.get('compilado', modelos['sklearn'])
+    cache = CachePrevisoes(NOME_ARQUIVO_MODELO, caminho_tabela=Path(tempfile.gettempdir()) / 'sem_tabela.npz')
+    independentes = dados[['tempo_desloc_minutos', 'nota_p1', 'cod_cor_favorita', 'quant_irmaos', 'cod_letra_turma']]
+    tempos = []
+    for entrada in independentes.iloc[:repeticoes].itertuples(index=False):
+        inicio = time.perf_counter()
+        cache.prever(modelo_app, *entrada)
+        tempos.append(time.perf_counter() - inicio)
+    resultado['app_sem_cache'] = get_percentis_ms(tempos)
+    return resultado
+
+
+# __________ Suíte __________
+
+def executar_benchmarks(tamanhos_geracao=TAMANHOS_GERACAO, tamanho_leitura=TAMANHO_LEITURA,
+                        tamanhos_treino=TAMANHOS_TREINO, repeticoes=REPETICOES_PREVISAO,
+                        tamanho_lote=TAMANHO_LOTE_PREVISAO):
+    """Roda todas as medições e devolve o JSON de resultados (metadados + métricas)."""
+    from src.armazenamento import converter_dataset
+    from src.gerar_dados import SEMENTE_PADRAO, TAMANHO_BLOCO_PADRAO, gravar_registros_em_blocos
+
+    metricas = {}
+
+    print('--- Geração ---')
+    resultado = executar_em_processo_novo(medir_geracao_escalar, TAMANHO_GERACAO_ESCALAR)
+    metricas[f'geracao.escalar.{TAMANHO_GERACAO_ESCALAR}.linhas_por_s'] = metrica(resultado['linhas_por_s'], 'linhas/s', True)
+    for quant_registros in tamanhos_geracao:
+        resultado = executar_em_processo_novo(medir_geracao_vetorizada, quant_registros)
+        metricas[f'geracao.vetorizada.{quant_registros}.linhas_por_s'] = metrica(resultado['linhas_por_s'], 'linhas/s', True)
+        metricas[f'geracao.vetorizada.{quant_registros}.pico_rss_mb'] = metrica(resultado['pico_rss_mb'], 'MB')
+        print(f'{quant_registros:>12,} linhas: {resultado["linhas_por_s"]:,.0f} linhas/s')
+
+    with tempfile.TemporaryDirectory() as pasta:
+        pasta = Path(pasta)
+
+        def get_base(quant_registros):
+            caminho = pasta / f'alunos_{quant_registros}.parquet'
+            if not caminho.exists():
+                gravar_registros_em_blocos(quant_registros, caminho, min(TAMANHO_BLOCO_PADRAO * 10, quant_registros),
+                                           SEMENTE_PADRAO, retomar=False)
+            return caminho
+
+        print('--- Leitura (CSV x Parquet) ---')
+        caminho_parquet = get_base(tamanho_leitura)
+        caminho_csv = pasta / f'alunos_{tamanho_leitura}.csv'
+        converter_dataset(caminho_parquet, caminho_csv)
+        for formato, caminho in (('csv', caminho_csv), ('parquet', caminho_parquet)):
+            resultado = executar_em_processo_novo(medir_leitura, caminho)
+            prefixo = f'leitura.{formato}.{tamanho_leitura}'
+            metricas[f'{prefixo}.tempo_s'] = metrica(resultado['tempo_s'], 's')
+            metricas[f'{prefixo}.pico_rss_mb'] = metrica(resultado['pico_rss_mb'], 'MB')
+            metricas[f'{prefixo}.pico_rss_acima_base_mb'] = metrica(resultado['pico_rss_acima_base_mb'], 'MB')
+            print(f'{formato:>8}: {resultado["tempo_s"]:.2f}s, pico {resultado["pico_rss_mb"]} MB')
+
+        print('--- Treino ---')
+        for quant_registros in tamanhos_treino:
+            caminho = get_base(quant_registros)
+            for nome, incremental in (('arvore', False), ('incremental', True)):
+                resultado = executar_em_processo_novo(medir_treino, caminho, incremental)
+                prefixo = f'treino.{nome}.{quant_registros}'
+                metricas[f'{prefixo}.tempo_s'] = metrica(resultado['tempo_s'], 's')
+                metricas[f'{prefixo}.pico_rss_mb'] = metrica(resultado['pico_rss_mb'], 'MB')
+                metricas[f'{prefixo}.pico_rss_acima_base_mb'] = metrica(resultado['pico_rss_acima_base_mb'], 'MB')
+                print(f'{nome:>12} {quant_registros:>10,} linhas: {resultado["tempo_s"]:.2f}s')
+
+    print('--- Previsão ---')
+    for nome, percentis in executar_em_processo_novo(medir_previsao, repeticoes, tamanho_lote).items():
+        for percentil, valor in percentis.items():
+            metricas[f'previsao.{nome}.{percentil}_ms'] = metrica(valor, 'ms')
+        print(f'{nome:>24}: p50 {percentis["p50"]:.4f} ms | p99 {percentis["p99"]:.4f} ms')
+
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'metricas': metricas,
+    }
+
+
+def comparar_resultados(atual, base, limite=LIMITE_REGRESSAO_PADRAO):
+    """Compara as métricas em comum com as da base
+
+    Returns:
+        list: Regressões (dicts com a métrica, os dois valores e a variação relativa), piores primeiro.
+    """
+    regressoes = []
+    for nome, medida in atual['metricas'].items():
+        medida_base = base['metricas'].get(nome)
+        if medida_base is None or medida['valor'] is None or not medida_base['valor']:
+            continue
+        variacao = (medida['valor'] - medida_base['valor']) / medida_base['valor']
+        piora = -variacao if medida['maior_melhor'] else variacao
+        if piora > limite:
+            regressoes.append({'metrica': nome, 'base': medida_base['valor'], 'atual': medida['valor'],
+                               'unidade': medida['unidade'], 'piora': piora})
+    return sorted(regressoes, key=lambda regressao: regressao['piora'], reverse=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmarks de geração, leitura, treino e previsão.')
+    parser.add_argument('--out', type=Path, default=Path('benchmark.json'), help='Onde salvar o resultado (JSON).')
+    parser.add_argument('--quick', action='store_true', help='Versão reduzida (bases menores).')
+    parser.add_argument('--baseline', type=Path, help='Resultado salvo antes, para comparar e apontar regressões.')
+    parser.add_argument('--threshold', type=float, default=LIMITE_REGRESSAO_PADRAO,
+                        help='Piora relativa a partir da qual uma métrica é regressão (0.10 = 10%%).')
+    parser.add_argument('--compare', type=Path,
+                        help='Só compara este resultado já salvo com o --baseline (não roda os benchmarks).')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as arquivo:
+            resultado = json.load(arquivo)
+    else:
+        if args.quick:
+            resultado = executar_benchmarks(TAMANHOS_GERACAO_RAPIDO, TAMANHO_LEITURA_RAPIDO, TAMANHOS_TREINO_RAPIDO)
+        else:
+            resultado = executar_benchmarks()
+        with open(args.out, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+        print(f'\n--- Resultado salvo em "{args.out}" ---')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            base = json.load(arquivo)
+        regressoes = comparar_resultados(resultado, base, args.threshold)
+        print(f'\n--- Comparação com "{args.baseline}" ({base["data"]}), limite {args.threshold:.0%} ---')
+        for regressao in regressoes:
+            print(f'REGRESSÃO {regressao["metrica"]}: {regressao["base"]:.4g} -> {regressao["atual"]:.4g} '
+                  f'{regressao["unidade"]} ({regressao["piora"]:+.1%})')
+        if regressoes:
+            sys.exit(1)
+        print('--- Nenhuma regressão ---')
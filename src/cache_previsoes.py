@@ -0,0 +1,252 @@
+import argparse
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+# Permite rodar "python src/cache_previsoes.py" e ainda importar os módulos irmãos como "src.<modulo>"
+if str(Path(__file__).resolve().parent.parent) not in sys.path:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.esquema import COLUNAS_FEATURES, COLUNAS_INDEPENDENTES
+from src.gerar_dados import SEMENTE_PADRAO, calcular_dados_aluno_semeado, calcular_dados_alunos_vetorizado, sortear_base_por_aluno
+from src.inferencia import (NOME_ARQUIVO_MODELO, NOME_ARQUIVO_MODELO_COMPILADO, carregar_preditor,
+                            get_hash_arvore_compilada, get_hash_modelo, prever_uma_linha)
+from src.instrumentacao import contar, medir
+
+"""
+  Cache das previsões do formulário do app.py.
+
+  O formulário só aceita valores discretos (a "grade"): tempo de 15 a 150 de 5 em 5, nota_p1 de 0 a 10
+  de 0.1 em 0.1, 8 cores, 0 a 4 irmãos e 4 turmas, ou seja, 452.480 combinações possíveis.
+
+  Duas camadas, consultadas nessa ordem:
+    - LRU em memória (limitado), com a chave sendo a tupla normalizada dos dados independentes
+    - tabela pré-calculada (opcional) com a previsão de toda a grade, gerada após o treino
+      ("python src/treinar_modelo.py --precompute-grid") e salva ao lado do modelo
+
+  A tabela guarda o hash do modelo_desempenho.pkl que a gerou (o mesmo gravado na árvore compilada,
+  usado quando a versão só tem a árvore compilada). Quando o modelo muda, o LRU é esvaziado e a
+  tabela só volta a ser usada depois de gerada de novo para o novo modelo.
+"""
+
+NOME_ARQUIVO_TABELA = NOME_ARQUIVO_MODELO.parent / 'tabela_previsoes.npz'
+
+TAMANHO_MAXIMO_LRU = 4096
+
+# Valores aceitos pelo formulário: (inicio, passo, quantidade)
+VALORES_GRADE = {
+    'tempo_desloc_minutos': (15, 5, 28),
+    'nota_p1': (0.0, 0.1, 101),
+    'cod_cor_favorita': (0, 1, 8),
+    'quant_irmaos': (0, 1, 5),
+    'cod_letra_turma': (0, 1, 4),
+}
+# Sempre na ordem das colunas independentes do esquema (a mesma da chave do cache)
+GRADE = {coluna: VALORES_GRADE[coluna] for coluna in COLUNAS_INDEPENDENTES}
+
+
+
+def normalizar_entrada(tempo_desloc_minutos, nota_p1, cod_cor_favorita, quant_irmaos, cod_letra_turma):
+    """Tupla usada como chave do cache (a nota é arredondada nas 2 casas usadas pela base)."""
+    return (int(tempo_desloc_minutos), round(float(nota_p1), 2), int(cod_cor_favorita), int(quant_irmaos),
+            int(cod_letra_turma))
+
+
+def get_indice_grade(chave):
+    """Posição da entrada na tabela da grade, ou None se algum valor estiver fora da grade."""
+    indices = []
+    for valor, (inicio, passo, quantidade) in zip(chave, GRADE.values()):
+        posicao = (valor - inicio) / passo
+        indice = round(posicao)
+        if abs(posicao - indice) > 1e-6 or not 0 <= indice < quantidade:
+            return None
+        indices.append(indice)
+    return int(np.ravel_multi_index(indices, [quantidade for _, _, quantidade in GRADE.values()]))
+
+
+def gerar_grade():
+    """Todas as combinações da grade, na mesma ordem dos índices de get_indice_grade()."""
+    eixos = [inicio + passo * np.arange(quantidade) for inicio, passo, quantidade in GRADE.values()]
+    eixos[1] = np.round(eixos[1], 1)
+    malha = np.meshgrid(*eixos, indexing='ij')
+    return {coluna: eixo.ravel() for coluna, eixo in zip(GRADE, malha)}
+
+
+def get_caminho_modelo_compilado(caminho_modelo):
+    """Árvore compilada que acompanha o .pkl (fica na mesma pasta, tanto em models/ quanto em uma versão)."""
+    return Path(caminho_modelo).parent / NOME_ARQUIVO_MODELO_COMPILADO.name
+
+
+def get_hash_modelo_publicado(caminho_modelo, caminho_modelo_compilado):
+    """Hash do .pkl ou, se a versão só tiver a árvore compilada, o hash do .pkl de origem gravado nela."""
+    if Path(caminho_modelo).exists():
+        return get_hash_modelo(caminho_modelo)
+    return get_hash_arvore_compilada(caminho_modelo_compilado)
+
+
+def calcular_tabela_previsoes(modelo, semente=SEMENTE_PADRAO):
+    """Calcula os dados e a previsão de todas as combinações da grade
+
+    Os dados de todas as combinações são calculados em lote, com os mesmos sorteios semeados pela
+    própria entrada que o cache usaria na hora (sortear_base_por_aluno), e todas são pontuadas em
+    uma única chamada ao modelo.
+
+    Returns:
+        dict: Arrays 'classe' (índice em 'classes'), 'proba', 'classes', 'colunas' (ordem das colunas
+            do aluno) e uma entrada por coluna calculada, com os tipos compactos do esquema.
+    """
+    # Só usado ao gerar a tabela (o app consulta a tabela sem importar o pandas)
+    from src.esquema import TIPOS_COLUNAS
+
+    grade = gerar_grade()
+    independentes = [grade[coluna] for coluna in GRADE]
+    alunos = calcular_dados_alunos_vetorizado(np.full(len(independentes[0]), 99999), *independentes,
+                                              sorteios=sortear_base_por_aluno(*independentes, semente=semente))
+    probabilidades = np.asarray(modelo.predict_proba(alunos[list(modelo.feature_names_in_)]))
+
+    tabela = {
+        'classes': np.asarray(modelo.classes_).astype(str),
+        'classe': np.argmax(probabilidades, axis=1).astype(np.uint8),
+        'proba': probabilidades.astype(np.float32),
+        'colunas': np.asarray(COLUNAS_FEATURES),
+    }
+    for coluna in tabela['colunas'].tolist():
+        if coluna in GRADE:
+            continue
+        tabela[coluna] = alunos[coluna].to_numpy().astype(TIPOS_COLUNAS[coluna])
+    return tabela
+
+
+def salvar_tabela_previsoes(caminho_modelo=NOME_ARQUIVO_MODELO, caminho_tabela=NOME_ARQUIVO_TABELA,
+                            caminho_modelo_compilado=NOME_ARQUIVO_MODELO_COMPILADO, semente=SEMENTE_PADRAO):
+    """Pontua a grade inteira com o modelo salvo e grava a tabela (com o hash do modelo) ao lado dele."""
+    hash_modelo = get_hash_modelo_publicado(caminho_modelo, caminho_modelo_compilado)
+    modelo = carregar_preditor(caminho_modelo, caminho_modelo_compilado)
+    tabela = calcular_tabela_previsoes(modelo, semente)
+    caminho_tabela = Path(caminho_tabela)
+    # Grava em um temporário e renomeia, para o app nunca ler uma tabela pela metade
+    caminho_temporario = caminho_tabela.with_name(caminho_tabela.stem + '.tmp.npz')
+    np.savez(caminho_temporario, hash_modelo=np.str_(hash_modelo), **tabela)
+    caminho_temporario.replace(caminho_tabela)
+    return len(tabela['classe'])
+
+
+def carregar_tabela_previsoes(caminho_tabela, hash_modelo):
+    """Carrega a tabela da grade, ou devolve None se ela não existir ou for de outro modelo."""
+    if not Path(caminho_tabela).exists():
+        return None
+    with np.load(caminho_tabela) as arquivo:
+        if str(arquivo['hash_modelo']) != hash_modelo:
+            return None
+        return {nome: arquivo[nome] for nome in arquivo.files}
+
+
+class CachePrevisoes:
+    """Cache (LRU + tabela da grade) das previsões de um aluno, invalidado quando o modelo muda."""
+
+    def __init__(self, caminho_modelo=NOME_ARQUIVO_MODELO, caminho_tabela=NOME_ARQUIVO_TABELA,
+                 tamanho_maximo=TAMANHO_MAXIMO_LRU, caminho_modelo_compilado=None):
+        self.caminho_modelo = Path(caminho_modelo)
+        self.caminho_modelo_compilado = Path(caminho_modelo_compilado or get_caminho_modelo_compilado(caminho_modelo))
+        self.caminho_tabela = Path(caminho_tabela)
+        self.tamanho_maximo = tamanho_maximo
+        self.lru = OrderedDict()
+        self.lock = threading.Lock()
+        self.assinatura_modelo = None
+        self.tabela = None
+        self.acertos_lru = 0
+        self.acertos_tabela = 0
+        self.falhas = 0
+
+    def get_assinatura(self):
+        """os.stat do .pkl, do hash gravado na árvore compilada e da tabela (None para o que não existir)."""
+        assinatura = []
+        for caminho in (self.caminho_modelo, self.caminho_modelo_compilado / 'hash_modelo.npy', self.caminho_tabela):
+            try:
+                estado = caminho.stat()
+            except FileNotFoundError:
+                assinatura.append(None)
+            else:
+                assinatura.append((estado.st_mtime_ns, estado.st_size))
+        return tuple(assinatura)
+
+    def verificar_modelo(self):
+        """Esvazia o cache e recarrega a tabela se o modelo (ou a tabela) mudou desde a última consulta
+
+        Funciona também para versões publicadas só com a árvore compilada (sem o .pkl).
+        """
+        assinatura = self.get_assinatura()
+        if assinatura != self.assinatura_modelo:
+            self.lru.clear()
+            hash_modelo = get_hash_modelo_publicado(self.caminho_modelo, self.caminho_modelo_compilado)
+            self.tabela = carregar_tabela_previsoes(self.caminho_tabela, hash_modelo) if hash_modelo else None
+            self.assinatura_modelo = assinatura
+
+    def consultar_tabela(self, chave):
+        indice = get_indice_grade(chave) if self.tabela is not None else None
+        if indice is None:
+            return None
+        entrada = dict(zip(GRADE, chave))
+        dados_aluno = {}
+        for coluna in self.tabela['colunas'].tolist():
+            if coluna in entrada:
+                dados_aluno[coluna] = entrada[coluna]
+                continue
+            valor = self.tabela[coluna][indice].item()
+            # Mesmos tipos do calcular_dados_aluno_semeado: flags 0/1 e notas com 2 casas
+            dados_aluno[coluna] = round(valor, 2) if isinstance(valor, float) else int(valor)
+        classe = str(self.tabela['classes'][self.tabela['classe'][indice]])
+        return dados_aluno, classe, tuple(self.tabela['proba'][indice].tolist())
+
+    def prever(self, modelo, tempo_desloc_minutos, nota_p1, cod_cor_favorita, quant_irmaos, cod_letra_turma):
+        """Dados calculados e previsão de um aluno, vindos do cache sempre que possível
+
+        Returns:
+            tuple: (dict com os dados do aluno, sem ID e situacao, classe prevista, probabilidades na ordem de classes_).
+        """
+        chave = normalizar_entrada(tempo_desloc_minutos, nota_p1, cod_cor_favorita, quant_irmaos, cod_letra_turma)
+        with self.lock:
+            self.verificar_modelo()
+            if chave in self.lru:
+                self.lru.move_to_end(chave)
+                self.acertos_lru += 1
+                contar('cache_previsoes.acertos_lru')
+                return self.lru[chave]
+            resultado = self.consultar_tabela(chave)
+            if resultado is not None:
+                self.acertos_tabela += 1
+                contar('cache_previsoes.acertos_tabela')
+
+        if resultado is None:
+            # Sorteios semeados pela própria entrada (os mesmos da pontuação em lote e do servidor):
+            # recalcular depois de sair do LRU dá o mesmo aluno
+            with medir('cache_previsoes.calcular_e_prever'):
+                aluno_dict = calcular_dados_aluno_semeado(99999, *chave)
+                classe, probabilidades = prever_uma_linha(modelo, aluno_dict)
+            dados_aluno = {coluna: aluno_dict[coluna] for coluna in COLUNAS_FEATURES}
+            resultado = (dados_aluno, str(classe), tuple(probabilidades))
+            with self.lock:
+                self.falhas += 1
+            contar('cache_previsoes.falhas')
+
+        with self.lock:
+            self.lru[chave] = resultado
+            self.lru.move_to_end(chave)
+            if len(self.lru) > self.tamanho_maximo:
+                self.lru.popitem(last=False)
+        return resultado
+
+
+if __name__ == "__main__":
+    # Gera a tabela para o modelo já treinado (o treino também gera com --precompute-grid)
+    parser = argparse.ArgumentParser(description='Pré-calcula a previsão de todas as entradas do formulário.')
+    parser.add_argument('--modelo', type=Path, default=NOME_ARQUIVO_MODELO)
+    parser.add_argument('--out', type=Path, default=NOME_ARQUIVO_TABELA)
+    parser.add_argument('--seed', type=int, default=SEMENTE_PADRAO)
+    args = parser.parse_args()
+
+    quant_linhas = salvar_tabela_previsoes(args.modelo, args.out, semente=args.seed)
+    print(f'--- Tabela com {quant_linhas} previsões salva em "{args.out}" ---')
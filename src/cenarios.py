@@ -0,0 +1,231 @@
+import argparse
+import itertools
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+# Permite rodar "python src/cenarios.py" e ainda importar os módulos irmãos como "src.<modulo>"
+if str(Path(__file__).resolve().parent.parent) not in sys.path:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.gerar_dados import (SEMENTE_PADRAO, aplicar_regras_vetorizado, config, sortear_base_vetorizado,
+                             sortear_independentes_vetorizado)
+from src.instrumentacao import contar, medir, perfil_opcional
+
+"""
+  Cenários "e se": taxas de aprovação e de recuperação para várias variantes da config de
+  src/gerar_dados.py (ex.: outra média de corte ou outro limite de faltas).
+
+  Cada variante é a config atual com algumas chaves sobrescritas, em uma cópia: o dict global
+  'config' nunca é alterado. Todas as variantes usam a mesma população de alunos:
+    - os dados independentes e os sorteios (uniformes em [0, 1)) são feitos uma única vez, com a
+      semente, e são os mesmos de gerar_registros_vetorizado(quant_alunos, rng=semente)
+    - por variante, só as colunas dependentes são recalculadas (aplicar_regras_vetorizado)
+  Então a diferença entre duas variantes vem só da regra, e não de outro sorteio.
+
+  TOTAL_MAX_FALTAS e MEDIA_CORTE só entram no último passo (a situação). As variantes que só
+  diferem nessas duas chaves formam um grupo: as regras são aplicadas uma vez por grupo, as faltas e
+  as médias viram uma tabela de contagens acumuladas (faltas x média) e a taxa de aprovação de cada
+  variante do grupo é uma consulta nessa tabela, vetorizada para todas elas de uma vez.
+
+  Os grupos são avaliados em paralelo (um pool de processos, cada um sorteia a mesma população uma vez).
+
+  Uso:
+    python src/cenarios.py --grid '{"MEDIA_CORTE": [5, 5.5, 6, 6.5, 7], "TOTAL_MAX_FALTAS": [15, 20, 25]}'
+    python src/cenarios.py --grid grade.json --rows 1000000 --workers 4 --out cenarios.csv
+"""
+
+QUANT_ALUNOS_PADRAO = 1_000_000
+
+# Chaves usadas só no cálculo da situação (não mudam as colunas dependentes)
+CHAVES_SITUACAO = ('TOTAL_MAX_FALTAS', 'MEDIA_CORTE')
+
+COLUNAS_TAXAS = ['taxa_aprovacao', 'taxa_recuperacao', 'taxa_reprovacao_faltas', 'taxa_reprovacao_media']
+
+# População base sorteada uma vez por processo (no processo principal ou em cada worker do pool)
+POPULACAO = None
+
+
+def sortear_populacao(quant_alunos=QUANT_ALUNOS_PADRAO, semente=SEMENTE_PADRAO):
+    """Dados independentes e sorteios dos alunos, na mesma sequência de gerar_registros_vetorizado."""
+    rng = np.random.default_rng(semente)
+    independentes = sortear_independentes_vetorizado(quant_alunos, rng)
+    return {
+        'tempo_desloc_minutos': independentes['tempo_desloc_minutos'],
+        'nota_p1': independentes['nota_p1'],
+        'sorteios': sortear_base_vetorizado(rng, quant_alunos),
+    }
+
+
+def inicializar_populacao(quant_alunos, semente):
+    global POPULACAO
+    POPULACAO = sortear_populacao(quant_alunos, semente)
+
+
+def montar_variantes(grade):
+    """Lista de sobrescritas da config, uma por variante
+
+    Args:
+        grade (dict | list): {chave: [valores]} (todas as combinações) ou uma lista de dicts de sobrescritas.
+
+    Raises:
+        ValueError: Se alguma chave não existir na config.
+    """
+    if isinstance(grade, dict):
+        chaves = list(grade)
+        variantes = [dict(zip(chaves, valores)) for valores in itertools.product(*(grade[chave] for chave in chaves))]
+    else:
+        variantes = [dict(variante) for variante in grade]
+
+    desconhecidas = sorted({chave for variante in variantes for chave in variante} - set(config))
+    if desconhecidas:
+        raise ValueError(f'Chaves que não existem na config de src/gerar_dados.py: {desconhecidas}')
+    return variantes
+
+
+def agrupar_variantes(variantes):
+    """Agrupa as variantes pela parte da config que muda as colunas dependentes
+
+    Returns:
+        list: (config das regras, [(índice da variante, TOTAL_MAX_FALTAS, MEDIA_CORTE), ...]) de cada grupo.
+    """
+    grupos = {}
+    for indice, variante in enumerate(variantes):
+        cfg = {**config, **variante}
+        cfg_regras = {chave: valor for chave, valor in cfg.items() if chave not in CHAVES_SITUACAO}
+        chave_grupo = json.dumps(cfg_regras, sort_keys=True)
+        grupos.setdefault(chave_grupo, (cfg_regras, []))[1].append(
+            (indice, cfg['TOTAL_MAX_FALTAS'], cfg['MEDIA_CORTE']))
+    return list(grupos.values())
+
+
+def avaliar_grupo(cfg_regras, limites):
+    """Aplica as regras uma vez e calcula as taxas de todas as variantes do grupo
+
+    Args:
+        cfg_regras (dict): Config (sem as chaves da situação) comum ao grupo.
+        limites (list): (índice da variante, TOTAL_MAX_FALTAS, MEDIA_CORTE) de cada variante.
+
+    Returns:
+        list: (índice da variante, dict com as taxas) de cada variante.
+    """
+    with medir('cenarios.aplicar_regras'):
+        dependentes = aplicar_regras_vetorizado(POPULACAO['tempo_desloc_minutos'], POPULACAO['nota_p1'],
+                                                POPULACAO['sorteios'], cfg_regras)
+
+    with medir('cenarios.avaliar_limites'):
+        # Contagem de alunos por (faltas, média em centésimos). A média já vem arredondada em 2 casas,
+        # então cada valor distinto é uma coluna e a comparação com o corte continua exata
+        faltas = dependentes['faltas']
+        media_centesimos = np.rint(dependentes['media'] * 100).astype(np.int64)
+        faltas_min, media_min = int(faltas.min()), int(media_centesimos.min())
+        quant_faltas = int(faltas.max()) - faltas_min + 1
+        quant_medias = int(media_centesimos.max()) - media_min + 1
+        contagens = np.bincount((faltas - faltas_min) * quant_medias + (media_centesimos - media_min),
+                                minlength=quant_faltas * quant_medias).reshape(quant_faltas, quant_medias)
+
+        # acumulado[i, j] = alunos com faltas <= faltas_min + i - 1 e média >= (media_min + j) / 100
+        # (linha 0 e última coluna zeradas: nenhuma falta permitida / corte acima de todas as médias)
+        acumulado = np.zeros((quant_faltas + 1, quant_medias + 1), dtype=np.int64)
+        acumulado[1:, :-1] = contagens.cumsum(axis=0)[:, ::-1].cumsum(axis=1)[:, ::-1]
+
+        indices, max_faltas, medias_corte = (np.asarray(valores) for valores in zip(*limites))
+        linhas = np.searchsorted(np.arange(faltas_min, faltas_min + quant_faltas), max_faltas, side='right')
+        colunas = np.searchsorted(np.arange(media_min, media_min + quant_medias) / 100, medias_corte, side='left')
+
+        quant_alunos = len(faltas)
+        aprovados = acumulado[linhas, colunas]
+        dentro_limite_faltas = acumulado[linhas, 0]
+        acima_corte = acumulado[-1, colunas]
+        taxa_recuperacao = float(dependentes['recuperacao'].mean())
+
+    contar('cenarios.variantes_avaliadas', len(limites))
+    return [
+        (int(indice), {
+            'taxa_aprovacao': aprovados[posicao] / quant_alunos,
+            'taxa_recuperacao': taxa_recuperacao,
+            'taxa_reprovacao_faltas': (quant_alunos - dentro_limite_faltas[posicao]) / quant_alunos,
+            'taxa_reprovacao_media': (quant_alunos - acima_corte[posicao]) / quant_alunos,
+        })
+        for posicao, indice in enumerate(indices.tolist())
+    ]
+
+
+def iterar_grupos_avaliados(grupos, quant_alunos, semente, workers):
+    if workers <= 1:
+        inicializar_populacao(quant_alunos, semente)
+        for cfg_regras, limites in grupos:
+            yield from avaliar_grupo(cfg_regras, limites)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=inicializar_populacao,
+                             initargs=(quant_alunos, semente)) as executor:
+        for resultados in executor.map(avaliar_grupo, *zip(*grupos)):
+            yield from resultados
+
+
+def varrer_cenarios(grade, quant_alunos=QUANT_ALUNOS_PADRAO, semente=SEMENTE_PADRAO, workers=1):
+    """Taxas de aprovação/recuperação de cada variante da config, na mesma população de alunos
+
+    Args:
+        grade (dict | list): {chave: [valores]} ou lista de dicts de sobrescritas (ver montar_variantes).
+        quant_alunos (int): Tamanho da população usada em todas as variantes.
+        semente (int): Semente da população.
+        workers (int): Processos avaliando grupos de variantes em paralelo.
+
+    Returns:
+        pd.DataFrame: Uma linha por variante: o valor de cada chave sobrescrita, as taxas e a
+            diferença da taxa de aprovação para a config atual ('delta_aprovacao').
+    """
+    import pandas as pd
+
+    variantes = montar_variantes(grade)
+    # A config atual entra como uma variante a mais (a última), só para calcular o delta
+    taxas = dict(iterar_grupos_avaliados(agrupar_variantes(variantes + [{}]), quant_alunos, semente, workers))
+    taxa_aprovacao_atual = taxas.pop(len(variantes))['taxa_aprovacao']
+
+    chaves = list(dict.fromkeys(chave for variante in variantes for chave in variante))
+    cenarios = pd.DataFrame([{**{chave: {**config, **variante}[chave] for chave in chaves}, **taxas[indice]}
+                             for indice, variante in enumerate(variantes)],
+                            columns=chaves + COLUNAS_TAXAS)
+    cenarios['delta_aprovacao'] = cenarios['taxa_aprovacao'] - taxa_aprovacao_atual
+    cenarios.index.name = 'variante'
+    return cenarios
+
+
+def ler_grade(texto_ou_caminho):
+    """Grade em JSON, direto no argumento ou em um arquivo .json"""
+    caminho = Path(texto_ou_caminho)
+    if caminho.suffix == '.json' and caminho.exists():
+        texto_ou_caminho = caminho.read_text(encoding='utf-8')
+    return json.loads(texto_ou_caminho)
+
+
+if __name__ == "__main__":
+    from src.armazenamento import salvar_dataset
+
+    parser = argparse.ArgumentParser(description='Taxas de aprovação/recuperação para variantes da config do gerador.')
+    parser.add_argument('--grid', required=True,
+                        help='JSON (ou arquivo .json) com {chave: [valores]} ou uma lista de sobrescritas.')
+    parser.add_argument('--rows', type=int, default=QUANT_ALUNOS_PADRAO, help='Alunos na população simulada.')
+    parser.add_argument('--seed', type=int, default=SEMENTE_PADRAO, help='Semente da população.')
+    parser.add_argument('--workers', type=int, default=1, help='Processos avaliando as variantes em paralelo.')
+    parser.add_argument('--out', type=Path, default=None, help='Salva a tabela (.csv ou .parquet).')
+    parser.add_argument('--profile', type=Path, default=None,
+                        help='Roda sob cProfile/tracemalloc e grava <arquivo>.prof/.txt/.json.')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    with perfil_opcional(args.profile):
+        cenarios = varrer_cenarios(ler_grade(args.grid), args.rows, args.seed, args.workers)
+    tempo_total = time.perf_counter() - inicio
+
+    print(cenarios.to_string(float_format='{:.4f}'.format, max_rows=40))
+    print(f'\n--- {len(cenarios)} variantes avaliadas em {tempo_total:.2f}s ({args.rows} alunos cada) ---')
+    if args.out:
+        salvar_dataset(cenarios.reset_index(), args.out)
+        print(f'--- Tabela salva em "{args.out}" ---')
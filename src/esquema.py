@@ -0,0 +1,68 @@
+import numpy as np
+
+"""
+  Esquema da base de desempenho dos alunos: ordem das colunas e tipos compactos de cada uma.
+
+  É a única definição das colunas, usada pelo gerador (registro de cada aluno), pelo treino
+  (features e alvo) e pelo app.py/servidor (entradas do formulário), para a ordem nunca divergir.
+
+  Os tipos são escolhidos pelo intervalo de valores que as regras de src/gerar_dados.py produzem:
+    - códigos, contagens e faltas cabem em int8/int16
+    - as notas têm 2 casas decimais e cabem em float32
+    - fez_atividade_extra e recuperacao são flags (bool)
+    - situacao tem só duas classes (category no DataFrame, código uint8 no registro)
+
+  TIPOS_COLUNAS (tipos do DataFrame) precisa do pandas, que só é importado na primeira vez em que
+  alguém usa esses tipos: o app.py importa o esquema sem pagar pela importação do pandas.
+"""
+
+CLASSES_SITUACAO = ['aprovado', 'reprovado']
+CODIGOS_SITUACAO = {classe: codigo for codigo, classe in enumerate(CLASSES_SITUACAO)}
+
+COLUNA_ID = 'ID'
+COLUNA_ALVO = 'situacao'
+
+# Tipo numpy de cada coluna, na ordem da base (situacao = código em CLASSES_SITUACAO)
+TIPOS_NUMPY = {
+    'ID': np.uint32,
+    'tempo_desloc_minutos': np.int16,
+    'faltas': np.int8,
+    'cod_cor_favorita': np.int8,
+    'quant_irmaos': np.int8,
+    'horas_estudo': np.int16,
+    'fez_atividade_extra': np.bool_,
+    'cod_letra_turma': np.int8,
+    'nota_p1': np.float32,
+    'nota_p2': np.float32,
+    'nota_p3': np.float32,
+    'recuperacao': np.bool_,
+    'situacao': np.uint8,
+}
+
+COLUNAS = list(TIPOS_NUMPY)
+
+# Colunas usadas pelo modelo (tudo menos o ID e o alvo), na ordem da base
+COLUNAS_FEATURES = [coluna for coluna in COLUNAS if coluna not in (COLUNA_ID, COLUNA_ALVO)]
+
+# Dados informados no formulário do app.py (e no servidor), na ordem dos argumentos de calcular_dados_aluno
+COLUNAS_INDEPENDENTES = ['tempo_desloc_minutos', 'nota_p1', 'cod_cor_favorita', 'quant_irmaos', 'cod_letra_turma']
+
+# Registro compacto de um aluno (array estruturado): 27 bytes, contra centenas de bytes de um dict
+DTYPE_ALUNO = np.dtype(list(TIPOS_NUMPY.items()))
+
+
+def get_tipos_colunas():
+    """Tipos de cada coluna no DataFrame (os mesmos de TIPOS_NUMPY, com a situacao como category)."""
+    import pandas as pd
+
+    tipos = {coluna: np.dtype(tipo).name for coluna, tipo in TIPOS_NUMPY.items()}
+    tipos[COLUNA_ALVO] = pd.CategoricalDtype(CLASSES_SITUACAO)
+    return tipos
+
+
+def __getattr__(nome):
+    # "from src.esquema import TIPOS_COLUNAS" continua funcionando, montando os tipos só no primeiro uso
+    if nome == 'TIPOS_COLUNAS':
+        globals()['TIPOS_COLUNAS'] = get_tipos_colunas()
+        return globals()['TIPOS_COLUNAS']
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
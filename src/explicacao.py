@@ -0,0 +1,178 @@
+import numpy as np
+
+from src.inferencia import FOLHA, PreditorArvore, compilar_arvore
+
+"""
+  Explicação das previsões da árvore de decisão: a regra (condições do caminho até a folha) e a
+  contribuição de cada feature para a probabilidade de cada classe.
+
+  Contribuições: ao descer da raiz até a folha, cada divisão troca as probabilidades do nó pai pelas
+  do nó filho, e essa diferença é atribuída à feature usada na divisão. Assim:
+    probabilidade na folha = probabilidade na raiz (base) + soma das contribuições das features
+
+  Tudo é calculado uma única vez, por folha, quando o explicador é criado:
+    - a matriz esparsa (CSR) dos ancestrais de cada nó, a mesma do decision_path do sklearn
+    - as contribuições de todas as folhas, com um único produto esparso (caminhos das folhas x
+      diferença de probabilidade de cada aresta)
+    - os limites de cada feature no caminho de cada folha (para montar a regra)
+  Muitos alunos caem na mesma folha, então explicar um lote é só o apply() da árvore (a mesma
+  travessia do predict_proba) e indexar esses arrays pela folha de cada linha, sem laço por linha.
+  O texto da regra é montado só para as folhas que aparecem, e fica guardado.
+
+  O scipy (matrizes esparsas) só é importado quando um explicador é criado.
+"""
+
+
+def formatar_limite(valor):
+    return f'{round(float(valor), 3):g}'
+
+
+class ExplicadorArvore:
+    """Regras e contribuições das features para as previsões de uma árvore de decisão."""
+
+    def __init__(self, modelo):
+        """
+        Args:
+            modelo: PreditorArvore, DecisionTreeClassifier ou ArvoreHistograma já treinados.
+
+        Raises:
+            TypeError: Se o modelo não for uma única árvore de decisão.
+        """
+        import scipy.sparse as sp
+
+        self.preditor = modelo if isinstance(modelo, PreditorArvore) else PreditorArvore(compilar_arvore(modelo))
+        self.classes_ = self.preditor.classes_
+        self.feature_names_in_ = self.preditor.feature_names_in_
+        self.indices_classes = {str(classe): indice for indice, classe in enumerate(self.classes_)}
+        self._nomes = [str(nome) for nome in self.feature_names_in_]
+
+        feature = np.asarray(self.preditor.feature)
+        threshold = np.asarray(self.preditor.threshold)
+        proba = np.asarray(self.preditor.proba, dtype=np.float64)
+        quant_nos, quant_features, quant_classes = len(feature), len(self._nomes), proba.shape[1]
+
+        # Pai de cada nó (-1 na raiz) e o lado da divisão pelo qual se chega nele
+        internos = np.flatnonzero(feature != FOLHA)
+        filhos_esquerda = np.asarray(self.preditor.children_left)[internos]
+        filhos_direita = np.asarray(self.preditor.children_right)[internos]
+        pai = np.full(quant_nos, -1, dtype=np.int64)
+        pai[filhos_esquerda] = internos
+        pai[filhos_direita] = internos
+        pela_esquerda = np.zeros(quant_nos, dtype=bool)
+        pela_esquerda[filhos_esquerda] = True
+        nao_raiz = np.flatnonzero(pai >= 0)
+
+        # Ancestrais de cada nó (incluindo ele mesmo): soma das potências da matriz "pai de",
+        # uma multiplicação esparsa por nível da árvore
+        matriz_pai = sp.csr_matrix((np.ones(len(nao_raiz), dtype=np.int8), (nao_raiz, pai[nao_raiz])),
+                                   shape=(quant_nos, quant_nos))
+        ancestrais = potencia = sp.identity(quant_nos, dtype=np.int8, format='csr')
+        while True:
+            potencia = potencia @ matriz_pai
+            if potencia.nnz == 0:
+                break
+            ancestrais = ancestrais + potencia
+        self.ancestrais = ancestrais.tocsr()
+
+        # Mudança de probabilidade de cada aresta (pai -> nó), na coluna da feature usada pelo pai
+        delta = np.zeros((quant_nos, quant_features, quant_classes))
+        delta[nao_raiz, feature[pai[nao_raiz]]] = proba[nao_raiz] - proba[pai[nao_raiz]]
+
+        # Cache por folha: contribuições (folhas x features x classes), somando as arestas do caminho
+        self.folhas = np.flatnonzero(feature == FOLHA)
+        self.posicao_folha = np.full(quant_nos, -1, dtype=np.int64)
+        self.posicao_folha[self.folhas] = np.arange(len(self.folhas))
+        caminhos_folhas = self.ancestrais[self.folhas]
+        self.contribuicoes = np.asarray(caminhos_folhas @ delta.reshape(quant_nos, -1)).reshape(
+            len(self.folhas), quant_features, quant_classes)
+        self.base = proba[0]
+
+        # Limites de cada feature no caminho de cada folha: inferior < x <= superior
+        self.inferior = np.full((len(self.folhas), quant_features), -np.inf)
+        self.superior = np.full((len(self.folhas), quant_features), np.inf)
+        caminhos = caminhos_folhas.tocoo()
+        arestas = pai[caminhos.col] >= 0
+        linhas, nos = caminhos.row[arestas], caminhos.col[arestas]
+        features_arestas, thresholds_arestas = feature[pai[nos]], threshold[pai[nos]]
+        esquerda = pela_esquerda[nos]
+        np.minimum.at(self.superior, (linhas[esquerda], features_arestas[esquerda]), thresholds_arestas[esquerda])
+        np.maximum.at(self.inferior, (linhas[~esquerda], features_arestas[~esquerda]), thresholds_arestas[~esquerda])
+
+        # Texto da regra de cada folha, montado na primeira vez em que ela aparece
+        self.regras = np.full(quant_nos, None, dtype=object)
+        self.regra_montada = np.zeros(quant_nos, dtype=bool)
+
+    def get_regra(self, folha):
+        """Condições do caminho até a folha, uma por feature (ex.: 'nota_p2 <= 5.945 e faltas > 12.5')."""
+        if not self.regra_montada[folha]:
+            posicao = self.posicao_folha[folha]
+            condicoes = []
+            for indice, nome in enumerate(self._nomes):
+                inferior, superior = self.inferior[posicao, indice], self.superior[posicao, indice]
+                if np.isfinite(inferior) and np.isfinite(superior):
+                    condicoes.append(f'{formatar_limite(inferior)} < {nome} <= {formatar_limite(superior)}')
+                elif np.isfinite(superior):
+                    condicoes.append(f'{nome} <= {formatar_limite(superior)}')
+                elif np.isfinite(inferior):
+                    condicoes.append(f'{nome} > {formatar_limite(inferior)}')
+            self.regras[folha] = ' e '.join(condicoes) or '(todos os alunos)'
+            self.regra_montada[folha] = True
+        return self.regras[folha]
+
+    def caminho_decisao(self, X):
+        """Matriz esparsa (linhas x nós) com os nós visitados por cada linha, como o decision_path do sklearn."""
+        return self.ancestrais[self.preditor.apply(X)]
+
+    def explicar_lote(self, X, classe=None):
+        """Explica todas as linhas de um lote com uma única travessia da árvore
+
+        Args:
+            X: Features (DataFrame ou array na ordem de feature_names_in_).
+            classe (str | None): Classe explicada em todas as linhas; None = a classe prevista de cada linha.
+
+        Returns:
+            dict: 'folhas', 'probabilidades' (n_linhas x n_classes), 'classes' (explicada em cada linha),
+                'base' (probabilidade dessa classe na raiz), 'contribuicoes' (n_linhas x n_features,
+                para a classe explicada) e 'regras' (texto de cada linha).
+        """
+        folhas = self.preditor.apply(X)
+        probabilidades = self.preditor.proba[folhas]
+        if classe is None:
+            indices_classe = np.argmax(probabilidades, axis=1)
+        else:
+            indices_classe = np.full(len(folhas), self.indices_classes[classe])
+
+        # Monta o texto só das folhas que ainda não tinham aparecido (bincount: sem ordenar o lote)
+        presentes = np.flatnonzero(np.bincount(folhas, minlength=len(self.regras)))
+        for folha in presentes[~self.regra_montada[presentes]].tolist():
+            self.get_regra(folha)
+
+        return {
+            'folhas': folhas,
+            'probabilidades': probabilidades,
+            'classes': self.classes_[indices_classe],
+            'base': self.base[indices_classe],
+            'contribuicoes': self.contribuicoes[self.posicao_folha[folhas], :, indices_classe],
+            'regras': self.regras[folhas],
+        }
+
+    def explicar_um(self, linha, classe=None):
+        """Explica um único aluno
+
+        Args:
+            linha (dict | sequence): Valores das features, por nome (dict) ou na ordem de feature_names_in_.
+
+        Returns:
+            dict: 'classe', 'probabilidade' e 'base' dessa classe, 'contribuicoes' ({feature: valor}) e 'regra'.
+        """
+        if isinstance(linha, dict):
+            linha = [linha[nome] for nome in self._nomes]
+        explicacao = self.explicar_lote([linha], classe)
+        indice_classe = self.indices_classes[str(explicacao['classes'][0])]
+        return {
+            'classe': str(explicacao['classes'][0]),
+            'probabilidade': float(explicacao['probabilidades'][0, indice_classe]),
+            'base': float(explicacao['base'][0]),
+            'contribuicoes': dict(zip(self._nomes, explicacao['contribuicoes'][0].tolist())),
+            'regra': str(explicacao['regras'][0]),
+        }
@@ -1,10 +1,24 @@
-import pandas as pd
 import numpy as np
 import random
-import joblib
 import heapq
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+# Permite rodar "python src/gerar_dados.py" e ainda importar os módulos irmãos como "src.<modulo>"
+if str(Path(__file__).resolve().parent.parent) not in sys.path:
+  sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.esquema import CLASSES_SITUACAO, CODIGOS_SITUACAO, COLUNAS, DTYPE_ALUNO
+from src.instrumentacao import contar, medir, perfil_opcional
+
+# O pandas e a camada de armazenamento (pyarrow) só são importados dentro das funções que os usam:
+# quem só precisa de calcular_dados_aluno_semeado (ex.: o app.py) não paga o custo dessas importações
+
 """
   1. COLUNAS DE REGRAS REAIS QUE VAMOS CRIAR
     - ID                          (INT) valor de identificação do aluno
@@ -27,7 +41,7 @@ from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent
 
-URL_SAIDA_DADOS = BASE_DIR.parent / 'data' / 'desempenho_alunos.csv'
+URL_SAIDA_DADOS = BASE_DIR.parent / 'data' / 'desempenho_alunos.parquet'
 
 # __________ VARIAVEIS DE ALEATORIEDADE E LIMITES __________
 
@@ -52,25 +66,27 @@ config = {
 
 # __________ FUNÇÕES _____________________________
 
-def get_random_float(start, end):
-  return round(random.uniform(start, end+0.01), 2)
+# Os sorteios usam o módulo random (estado global) ou, se informado, um random.Random próprio
+def get_random_float(start, end, rng=None):
+  return round((rng or random).uniform(start, end+0.01), 2)
 
-def get_random_int(start, end):
-  return random.randint(start, end)
+def get_random_int(start, end, rng=None):
+  return (rng or random).randint(start, end)
 
-def get_random_bool():
-   return random.randint(0, 1)
+def get_random_bool(rng=None):
+   return (rng or random).randint(0, 1)
 
 def get_valor_ou_limite(valor, limite):
    return min(valor, limite)
 
-def calcular_dados_aluno(ID,
-                         tempo_desloc_minutos, 
-                         nota_p1,
-                         cod_cor_favorita, 
-                         quant_irmaos,
-                         cod_letra_turma):
-  """Recebe alguns dados independentes sobre um aluno e calcula outros dados dependentes, retornando um dict que representa o aluno
+def calcular_registro_aluno(ID,
+                            tempo_desloc_minutos, 
+                            nota_p1,
+                            cod_cor_favorita, 
+                            quant_irmaos,
+                            cod_letra_turma,
+                            rng=None):
+  """Recebe alguns dados independentes sobre um aluno e calcula outros dados dependentes, retornando uma tupla que representa o aluno
 
   Args:
     ID (int): Numero de identificacao do aluno.
@@ -80,16 +96,19 @@ def calcular_dados_aluno(ID,
     quant_irmaos (int): Quantidade de irmãos que o aluno possui.
     fez_atividade_extra (int): Numero que indica se o aluno fez ou não a atividade extra.
     cod_letra_turma (int): Numero que representa a letra da turma a qual o aluno faz parte.
+    rng (random.Random | None): Gerador usado nos sorteios. Se None, usa o módulo random (estado global).
 
   Returns:
-    dict: Um dicionário contendo todos os dados (independentes e calculados) de um aluno.
+    tuple: Todos os dados (independentes e calculados) de um aluno, na ordem de esquema.COLUNAS,
+      com a situacao como código (índice em esquema.CLASSES_SITUACAO). Cabe direto em um registro DTYPE_ALUNO.
   """
+  rng = rng or random
 
   # Com base no deslocamento, adicionamos algumas faltas a mais:
   # _ 0 a 10 faltas aleatórias
   # + um décimo arredondado para cima do tempo de deslocamento 
   faltas = (
-    get_random_int(config['RND_MIN_FALTAS'], config['RND_MAX_FALTAS'])
+    get_random_int(config['RND_MIN_FALTAS'], config['RND_MAX_FALTAS'], rng)
     + round(tempo_desloc_minutos / 10)
   )
 
@@ -98,10 +117,10 @@ def calcular_dados_aluno(ID,
 
   # horas de estudo será um valor aleatório o qual sofrerá uma subtração baseado no numero de faltas do aluno
   horas_estudo = (
-    get_random_int(config['RND_MIN_HORAS_ESTUDO'], config['RND_MAX_HORAS_ESTUDO']) 
+    get_random_int(config['RND_MIN_HORAS_ESTUDO'], config['RND_MAX_HORAS_ESTUDO'], rng) 
     - round(faltas / 2)
   )
-  horas_estudo = np.clip(horas_estudo, 0, None) # Limita o valor mínimo em 0.
+  horas_estudo = max(horas_estudo, 0) # Limita o valor mínimo em 0.
 
   # Se a Nota_P1 não for alta, o aluno ganha + 25% de horas de estudo
   if not nota_p1_alta:
@@ -109,14 +128,14 @@ def calcular_dados_aluno(ID,
   
   # Se a Nota_P1 não for alta, o aluno tem mais chance de fazer a atividade extra
   if nota_p1_alta:
-    fez_atividade_extra = random.choices([0, 1], weights=config['PROB_BAIXA_FAZER_ATV'], k=1)[0]
+    fez_atividade_extra = rng.choices([0, 1], weights=config['PROB_BAIXA_FAZER_ATV'], k=1)[0]
   else:
-    fez_atividade_extra = random.choices([0, 1], weights=config['PROB_ALTA_FAZER_ATV'], k=1)[0]
+    fez_atividade_extra = rng.choices([0, 1], weights=config['PROB_ALTA_FAZER_ATV'], k=1)[0]
 
   
   # Definindo notas p1 e p2 pelas notas base + horas_estudo + trabalho ou atividade
   nota_p2 = (
-    get_random_float(config['RND_MIN_NOTA_P2'], config['RND_MAX_NOTA_P2']) 
+    get_random_float(config['RND_MIN_NOTA_P2'], config['RND_MAX_NOTA_P2'], rng) 
     + (horas_estudo / config['P2_DIVISOR_HORAS_ESTUDO']) 
     + fez_atividade_extra * config['PONTOS_ATIVIDADE']
   )
@@ -133,7 +152,7 @@ def calcular_dados_aluno(ID,
       recuperacao = 1
       horas_estudo += 20
       nota_p3 = (
-        get_random_float(config['RND_MIN_NOTA_P3'], config['RND_MAX_NOTA_P3']) 
+        get_random_float(config['RND_MIN_NOTA_P3'], config['RND_MAX_NOTA_P3'], rng) 
         + (horas_estudo / config['P3_DIVISOR_HORAS_ESTUDO'])
       )
       nota_p3 = round(nota_p3, 2)
@@ -153,71 +172,583 @@ def calcular_dados_aluno(ID,
   else:
     situacao = 'aprovado' 
 
-  # _____________ Montando o dict do aluno _______________________________
+  # _____________ Montando o registro do aluno (ordem de esquema.COLUNAS) _
 
-  aluno = {
-    'ID': ID,
-    'tempo_desloc_minutos': tempo_desloc_minutos,
+  return (ID, tempo_desloc_minutos, faltas, cod_cor_favorita, quant_irmaos, horas_estudo, fez_atividade_extra,
+          cod_letra_turma, nota_p1, nota_p2, nota_p3, recuperacao, CODIGOS_SITUACAO[situacao])
+
+def calcular_dados_aluno(ID,
+                         tempo_desloc_minutos, 
+                         nota_p1,
+                         cod_cor_favorita, 
+                         quant_irmaos,
+                         cod_letra_turma,
+                         rng=None):
+  """Mesmo cálculo de calcular_registro_aluno, retornando um dict que representa o aluno
+
+  Returns:
+    dict: Um dicionário contendo todos os dados (independentes e calculados) de um aluno, nas chaves de esquema.COLUNAS.
+  """
+  aluno = dict(zip(COLUNAS, calcular_registro_aluno(ID, tempo_desloc_minutos, nota_p1, cod_cor_favorita,
+                                                    quant_irmaos, cod_letra_turma, rng)))
+  aluno['situacao'] = CLASSES_SITUACAO[aluno['situacao']]
+  return aluno
+
+def gerar_registros(quant_registros, rng=None):
+  """Gera N registros de alunos e retorna um array estruturado compacto
+
+  O array (DTYPE_ALUNO, 27 bytes por aluno) é alocado uma única vez e cada aluno é gravado direto
+  na sua posição, sem criar um dict por aluno. registros_para_dataframe() monta o DataFrame sem copiar as colunas.
+
+  Args:
+      quant_registros (int): Quantidade de alunos a gerar.
+      rng (random.Random | None): Gerador usado nos sorteios. Se None, usa o módulo random (estado global).
+
+  Returns:
+      np.ndarray: Array estruturado (DTYPE_ALUNO) contendo a quantidade de alunos especificada.
+  """
+  
+  registros = np.empty(quant_registros, dtype=DTYPE_ALUNO)
+  
+  # Um único span para o laço todo: medir cada aluno custaria mais que o próprio cálculo
+  with medir('gerar_dados.gerar_registros'):
+    for i in range(0, quant_registros):
+      # Definindo um tempo de deslocamento aleatorio
+      tempo_desloc_minutos = get_random_int(15, 150, rng)
+
+      # Definindo a nota_p1 do aluno
+      nota_p1 = get_random_float(0, 10, rng)
+      
+      # _____________ Adicionando colunas de "barulho" _______________________
+      
+      cod_cor_favorita = get_random_int(0, 7, rng)
+
+      cod_letra_turma = get_random_int(0, 3, rng)
+
+      quant_irmaos = get_random_int(0, 4, rng)
+
+      registros[i] = calcular_registro_aluno(i, tempo_desloc_minutos, nota_p1, cod_cor_favorita, quant_irmaos,
+                                             cod_letra_turma, rng)
+
+  contar('gerar_dados.alunos_gerados', quant_registros)
+  return registros
+
+def registros_para_dataframe(registros):
+  """DataFrame com as colunas do esquema apontando para os campos do array estruturado (sem cópia)
+
+  Só a situacao é convertida (códigos -> category com as classes do esquema).
+  """
+  import pandas as pd
+
+  colunas = {coluna: registros[coluna] for coluna in COLUNAS}
+  colunas['situacao'] = pd.Categorical.from_codes(registros['situacao'], categories=CLASSES_SITUACAO)
+  return pd.DataFrame(colunas, copy=False)
+
+# __________ VERSÃO VETORIZADA (NUMPY) ____________
+
+def get_random_float_vetor(rng, start, end, tamanho):
+  return np.round(rng.uniform(start, end+0.01, tamanho), 2)
+
+def get_random_int_vetor(rng, start, end, tamanho):
+  return rng.integers(start, end, size=tamanho, endpoint=True)
+
+def get_prob_fazer_atv(pesos):
+  # Probabilidade de sortear 1 em random.choices([0, 1], weights=pesos)
+  return pesos[1] / (pesos[0] + pesos[1])
+
+# Sorteios das colunas dependentes, guardados como uniformes em [0, 1) e só convertidos para os
+# intervalos da config na hora de aplicar as regras: assim os mesmos sorteios servem para qualquer
+# config (ex.: as variantes de src/cenarios.py)
+SORTEIOS_ALUNO = ['faltas', 'horas_estudo', 'fez_atividade_extra', 'nota_p2', 'nota_p3']
+
+def sortear_base_vetorizado(rng, tamanho):
+  """Sorteios uniformes em [0, 1) usados pelas regras, um array por nome de SORTEIOS_ALUNO"""
+  return {nome: rng.random(tamanho) for nome in SORTEIOS_ALUNO}
+
+def escalar_int_vetor(sorteio, start, end):
+  # Mesmo intervalo de get_random_int_vetor (start e end inclusos)
+  return np.minimum(start + np.floor(sorteio * (end - start + 1)).astype(np.int64), end)
+
+def escalar_float_vetor(sorteio, start, end):
+  # Mesmo intervalo e arredondamento de get_random_float_vetor
+  return np.round(start + sorteio * (end + 0.01 - start), 2)
+
+def aplicar_regras_vetorizado(tempo_desloc_minutos, nota_p1, sorteios, cfg=None):
+  """Aplica as regras de calcular_dados_aluno a todos os alunos de uma vez, a partir de sorteios já feitos
+
+  Args:
+    tempo_desloc_minutos (array): Tempo de deslocamento de cada aluno.
+    nota_p1 (array): Primeira nota de cada aluno.
+    sorteios (dict): Uniformes em [0, 1) de cada aluno (sortear_base_vetorizado).
+    cfg (dict | None): Configuração das regras. Se None, usa o dict global 'config' (que nunca é alterado aqui).
+
+  Returns:
+    dict: Arrays das colunas dependentes ('faltas', 'horas_estudo', 'fez_atividade_extra', 'nota_p2',
+      'nota_p3', 'recuperacao') e a 'media' das duas maiores notas, usada em calcular_reprovado_vetorizado.
+  """
+  cfg = config if cfg is None else cfg
+
+  tempo_desloc_minutos = np.asarray(tempo_desloc_minutos)
+  nota_p1 = np.asarray(nota_p1, dtype=np.float64)
+
+  faltas = (
+    escalar_int_vetor(sorteios['faltas'], cfg['RND_MIN_FALTAS'], cfg['RND_MAX_FALTAS'])
+    + np.round(tempo_desloc_minutos / 10).astype(np.int64)
+  )
+
+  nota_p1_alta = nota_p1 > 6
+
+  horas_estudo = (
+    escalar_int_vetor(sorteios['horas_estudo'], cfg['RND_MIN_HORAS_ESTUDO'], cfg['RND_MAX_HORAS_ESTUDO'])
+    - np.round(faltas / 2).astype(np.int64)
+  )
+  horas_estudo = np.clip(horas_estudo, 0, None)
+
+  # Se a Nota_P1 não for alta, o aluno ganha + 25% de horas de estudo
+  horas_estudo = np.where(
+    nota_p1_alta,
+    horas_estudo,
+    horas_estudo + np.round(horas_estudo * 0.25).astype(np.int64)
+  )
+
+  # Se a Nota_P1 não for alta, o aluno tem mais chance de fazer a atividade extra
+  prob_fazer_atv = np.where(
+    nota_p1_alta,
+    get_prob_fazer_atv(cfg['PROB_BAIXA_FAZER_ATV']),
+    get_prob_fazer_atv(cfg['PROB_ALTA_FAZER_ATV'])
+  )
+  fez_atividade_extra = (sorteios['fez_atividade_extra'] < prob_fazer_atv).astype(np.int64)
+
+  nota_p2 = (
+    escalar_float_vetor(sorteios['nota_p2'], cfg['RND_MIN_NOTA_P2'], cfg['RND_MAX_NOTA_P2'])
+    + (horas_estudo / cfg['P2_DIVISOR_HORAS_ESTUDO'])
+    + fez_atividade_extra * cfg['PONTOS_ATIVIDADE']
+  )
+  nota_p2 = np.minimum(np.round(nota_p2, 2), 10.00)
+
+  # Recuperação: só quem tem p1 ou p2 abaixo do limite ganha +20 horas e uma nota p3
+  recuperacao = (nota_p1 < cfg['LIMITE_RECUPERACAO']) | (nota_p2 < cfg['LIMITE_RECUPERACAO'])
+  horas_estudo = horas_estudo + 20 * recuperacao
+
+  # A p3 é sorteada para todos e descartada onde não há recuperação, para manter o sorteio em lote
+  nota_p3 = (
+    escalar_float_vetor(sorteios['nota_p3'], cfg['RND_MIN_NOTA_P3'], cfg['RND_MAX_NOTA_P3'])
+    + (horas_estudo / cfg['P3_DIVISOR_HORAS_ESTUDO'])
+  )
+  nota_p3 = np.where(recuperacao, np.minimum(np.round(nota_p3, 2), 10.00), -1.0)
+
+  return {
     'faltas': faltas,
-    'cod_cor_favorita': cod_cor_favorita,
-    'quant_irmaos': quant_irmaos,
     'horas_estudo': horas_estudo,
     'fez_atividade_extra': fez_atividade_extra,
-    'cod_letra_turma': cod_letra_turma,
-    'nota_p1': nota_p1,
     'nota_p2': nota_p2,
     'nota_p3': nota_p3,
     'recuperacao': recuperacao,
+    'media': calcular_media_vetorizado(nota_p1, nota_p2, nota_p3),
+  }
+
+def calcular_media_vetorizado(nota_p1, nota_p2, nota_p3):
+  """Média das duas maiores notas entre (p1, p2, p3), arredondada em 2 casas"""
+  # Soma das duas maiores, sem ordenar linha a linha
+  soma_maiores_notas = np.maximum(nota_p1, nota_p2) + np.maximum(np.minimum(nota_p1, nota_p2), nota_p3)
+  return np.round(soma_maiores_notas / 2, 2)
+
+def calcular_reprovado_vetorizado(faltas, media, cfg=None):
+  """True para os alunos reprovados (faltas acima do limite ou média abaixo do corte)"""
+  cfg = config if cfg is None else cfg
+  return (faltas > cfg['TOTAL_MAX_FALTAS']) | (media < cfg['MEDIA_CORTE'])
+
+def calcular_colunas_alunos_vetorizado(ID,
+                                       tempo_desloc_minutos,
+                                       nota_p1,
+                                       cod_cor_favorita,
+                                       quant_irmaos,
+                                       cod_letra_turma,
+                                       rng=None,
+                                       cfg=None,
+                                       sorteios=None):
+  """Mesmo cálculo de calcular_dados_alunos_vetorizado, retornando um dict com um array por coluna (sem pandas)
+
+  Returns:
+    dict: Um array por coluna de esquema.COLUNAS, na mesma ordem (situacao com o nome da classe).
+  """
+  tempo_desloc_minutos = np.asarray(tempo_desloc_minutos)
+
+  if sorteios is None:
+    sorteios = sortear_base_vetorizado(np.random.default_rng(rng), len(tempo_desloc_minutos))
+  dependentes = aplicar_regras_vetorizado(tempo_desloc_minutos, nota_p1, sorteios, cfg)
+  reprovado = calcular_reprovado_vetorizado(dependentes['faltas'], dependentes['media'], cfg)
+  situacao = np.where(reprovado, 'reprovado', 'aprovado')
+
+  return {
+    'ID': np.asarray(ID),
+    'tempo_desloc_minutos': tempo_desloc_minutos,
+    'faltas': dependentes['faltas'],
+    'cod_cor_favorita': np.asarray(cod_cor_favorita),
+    'quant_irmaos': np.asarray(quant_irmaos),
+    'horas_estudo': dependentes['horas_estudo'],
+    'fez_atividade_extra': dependentes['fez_atividade_extra'],
+    'cod_letra_turma': np.asarray(cod_letra_turma),
+    'nota_p1': np.asarray(nota_p1, dtype=np.float64),
+    'nota_p2': dependentes['nota_p2'],
+    'nota_p3': dependentes['nota_p3'],
+    'recuperacao': dependentes['recuperacao'].astype(np.int64),
     'situacao': situacao
   }
 
-  return aluno
+def calcular_dados_alunos_vetorizado(ID,
+                                     tempo_desloc_minutos,
+                                     nota_p1,
+                                     cod_cor_favorita,
+                                     quant_irmaos,
+                                     cod_letra_turma,
+                                     rng=None,
+                                     cfg=None,
+                                     sorteios=None):
+  """Versão em lote de calcular_dados_aluno: recebe arrays com os dados independentes e calcula as colunas dependentes de todos os alunos de uma vez
 
-def gerar_registros(quant_registros):
-  """Gera N registros de alunos e retorna uma lista
+  Segue exatamente as mesmas regras de calcular_dados_aluno (que continua sendo a implementação de referência),
+  mas sorteia os valores aleatórios com um numpy.random.Generator em vez do módulo random.
 
   Args:
-      quant_registros (int): The length of the rectangle.
+    ID (array): IDs dos alunos.
+    tempo_desloc_minutos (array): Tempo de deslocamento de cada aluno.
+    nota_p1 (array): Primeira nota de cada aluno.
+    cod_cor_favorita (array): Cor favorita de cada aluno.
+    quant_irmaos (array): Quantidade de irmãos de cada aluno.
+    cod_letra_turma (array): Letra da turma de cada aluno.
+    rng (numpy.random.Generator | int | None): Gerador (ou semente) usado nos sorteios.
+    cfg (dict | None): Configuração das regras. Se None, usa o dict global 'config'.
+    sorteios (dict | None): Sorteios já feitos (ex.: sortear_base_por_aluno). Se None, sorteia com o rng.
 
   Returns:
-      list: Lista contendo a quantidade de alunos especificada.
+    pd.DataFrame: Um DataFrame com as mesmas colunas do dict retornado por calcular_dados_aluno.
   """
-  
-  LISTA_ALUNOS = []
-  
-  for i in range(0, quant_registros):
-    # Definindo um tempo de deslocamento aleatorio
-    tempo_desloc_minutos = get_random_int(15, 150)
+  import pandas as pd
+
+  colunas = calcular_colunas_alunos_vetorizado(ID, tempo_desloc_minutos, nota_p1, cod_cor_favorita, quant_irmaos,
+                                               cod_letra_turma, rng, cfg, sorteios)
+
+  # _____________ Montando o DataFrame (colunar) dos alunos ______________
+
+  return pd.DataFrame(colunas, columns=COLUNAS)
+
+def sortear_independentes_vetorizado(quant_registros, rng):
+  """Sorteia os dados independentes (os do formulário do app.py) de N alunos, um array por coluna"""
+  tempo_desloc_minutos = get_random_int_vetor(rng, 15, 150, quant_registros)
+  nota_p1 = get_random_float_vetor(rng, 0, 10, quant_registros)
+
+  # _____________ Adicionando colunas de "barulho" _______________________
+
+  cod_cor_favorita = get_random_int_vetor(rng, 0, 7, quant_registros)
+  cod_letra_turma = get_random_int_vetor(rng, 0, 3, quant_registros)
+  quant_irmaos = get_random_int_vetor(rng, 0, 4, quant_registros)
+
+  return {
+    'tempo_desloc_minutos': tempo_desloc_minutos,
+    'nota_p1': nota_p1,
+    'cod_cor_favorita': cod_cor_favorita,
+    'quant_irmaos': quant_irmaos,
+    'cod_letra_turma': cod_letra_turma,
+  }
+
+def gerar_registros_vetorizado(quant_registros, rng=None, id_inicial=0):
+  """Gera N registros de alunos em lote com numpy e retorna um DataFrame colunar
+
+  Args:
+      quant_registros (int): Quantidade de alunos a gerar.
+      rng (numpy.random.Generator | int | None): Gerador (ou semente) usado nos sorteios.
+      id_inicial (int): ID do primeiro aluno gerado. Os IDs são contíguos a partir dele.
+
+  Returns:
+      pd.DataFrame: DataFrame com os alunos gerados.
+  """
+  rng = np.random.default_rng(rng)
+
+  ID = np.arange(id_inicial, id_inicial + quant_registros)
+  independentes = sortear_independentes_vetorizado(quant_registros, rng)
+
+  return calcular_dados_alunos_vetorizado(ID, **independentes, rng=rng)
+
+
+# __________ SORTEIOS REPRODUTÍVEIS POR ALUNO ______
+
+# Os sorteios de um aluno são uma função pura dos seus dados independentes (e da semente): o mesmo
+# aluno recebe sempre os mesmos sorteios, em qualquer lote, ordem, processo ou sessão. É o esquema
+# usado pelo app.py, pelo cache de previsões, pela pontuação em lote e pelo servidor.
+# Em vez de um gerador por aluno, cada sorteio sai de um hash (splitmix64) de (aluno, número do sorteio),
+# calculado com operações de array para todos os alunos de uma vez.
+INCREMENTO_SPLITMIX = np.uint64(0x9E3779B97F4A7C15)
+MULTIPLICADORES_SPLITMIX = (np.uint64(0xBF58476D1CE4E5B9), np.uint64(0x94D049BB133111EB))
+
+def misturar_splitmix64(valores):
+  """Função de mistura do splitmix64 aplicada a um array uint64 (as contas dão a volta em 2**64)"""
+  valores = (valores ^ (valores >> np.uint64(30))) * MULTIPLICADORES_SPLITMIX[0]
+  valores = (valores ^ (valores >> np.uint64(27))) * MULTIPLICADORES_SPLITMIX[1]
+  return valores ^ (valores >> np.uint64(31))
+
+def get_chaves_alunos(tempo_desloc_minutos, nota_p1, cod_cor_favorita, quant_irmaos, cod_letra_turma):
+  """Matriz (n_alunos x 5) de inteiros que identifica os dados independentes de cada aluno (nota_p1 em centésimos)"""
+  return np.stack([
+    np.asarray(tempo_desloc_minutos).astype(np.int64),
+    np.rint(np.asarray(nota_p1, dtype=np.float64) * 100).astype(np.int64),
+    np.asarray(cod_cor_favorita).astype(np.int64),
+    np.asarray(quant_irmaos).astype(np.int64),
+    np.asarray(cod_letra_turma).astype(np.int64),
+  ], axis=1)
+
+def get_hash_alunos(chaves, semente):
+  """Hash uint64 de cada linha de chaves (get_chaves_alunos), misturado com a semente"""
+  hash_alunos = misturar_splitmix64(np.full(len(chaves), semente % 2**64, dtype=np.uint64) + INCREMENTO_SPLITMIX)
+  for coluna in chaves.T:
+    hash_alunos = misturar_splitmix64((hash_alunos ^ coluna.astype(np.uint64)) + INCREMENTO_SPLITMIX)
+  return hash_alunos
+
+def sortear_base_por_aluno(tempo_desloc_minutos, nota_p1, cod_cor_favorita, quant_irmaos, cod_letra_turma, semente=None,
+                           quant_amostras=1):
+  """Sorteios uniformes em [0, 1) de cada aluno (mesmo formato de sortear_base_vetorizado), semeados pelos seus dados
+
+  O resultado de um aluno não depende dos outros alunos do lote nem da ordem.
+  Com quant_amostras = K, cada array tem as K amostras do primeiro aluno, depois as do segundo... (como np.repeat).
+  """
+  semente = SEMENTE_PADRAO if semente is None else semente
+  hash_alunos = get_hash_alunos(
+    get_chaves_alunos(tempo_desloc_minutos, nota_p1, cod_cor_favorita, quant_irmaos, cod_letra_turma), semente
+  )[:, np.newaxis]
+
+  sorteios = {}
+  for indice, nome in enumerate(SORTEIOS_ALUNO):
+    # Sorteio k do nome i = saída número i*K + k + 1 de um splitmix64 semeado pelo hash do aluno
+    contadores = np.arange(indice * quant_amostras + 1, (indice + 1) * quant_amostras + 1, dtype=np.uint64)
+    bits = misturar_splitmix64(hash_alunos + contadores * INCREMENTO_SPLITMIX)
+    # Os 53 bits mais altos viram um float64 uniforme em [0, 1)
+    sorteios[nome] = ((bits >> np.uint64(11)).astype(np.float64) * 2.0 ** -53).ravel()
+  return sorteios
+
+def calcular_dados_aluno_semeado(ID, tempo_desloc_minutos, nota_p1, cod_cor_favorita, quant_irmaos, cod_letra_turma,
+                                 semente=None):
+  """Dados de um único aluno (dict, como o de calcular_dados_aluno) com os sorteios de sortear_base_por_aluno
+
+  É exatamente o aluno que a pontuação em lote e o servidor calculam para as mesmas entradas, sem importar o pandas.
+  """
+  independentes = [np.asarray([valor]) for valor in (tempo_desloc_minutos, nota_p1, cod_cor_favorita, quant_irmaos,
+                                                      cod_letra_turma)]
+  colunas = calcular_colunas_alunos_vetorizado(np.asarray([ID]), *independentes,
+                                               sorteios=sortear_base_por_aluno(*independentes, semente=semente))
+  return {coluna: valores[0].item() for coluna, valores in colunas.items()}
+
+
+# __________ GERAÇÃO EM BLOCOS (STREAMING) ________
+
+TAMANHO_BLOCO_PADRAO = 100_000
+SEMENTE_PADRAO = 42
+
+def gerar_bloco(indice_bloco, tamanho_bloco, quant_registros, semente=SEMENTE_PADRAO):
+  """Gera um único bloco de alunos de forma determinística
 
-    # Definindo a nota_p1 do aluno
-    nota_p1 = get_random_float(0, 10)
-    
-    # _____________ Adicionando colunas de "barulho" _______________________
-    
-    cod_cor_favorita = get_random_int(0, 7)
+  Cada bloco tem a sua própria sequência de sementes (filha da semente principal), então o
+  conteúdo de um bloco não depende dos blocos anteriores. Isso é o que permite retomar a geração.
 
-    cod_letra_turma = get_random_int(0, 3)
+  Args:
+      indice_bloco (int): Posição do bloco (0, 1, 2...).
+      tamanho_bloco (int): Quantidade de alunos por bloco.
+      quant_registros (int): Quantidade total de alunos da geração (o último bloco pode ser menor).
+      semente (int): Semente principal da geração.
+
+  Returns:
+      pd.DataFrame: DataFrame com os alunos do bloco.
+  """
+  id_inicial = indice_bloco * tamanho_bloco
+  quant_bloco = min(tamanho_bloco, quant_registros - id_inicial)
+  rng = np.random.default_rng(np.random.SeedSequence(semente, spawn_key=(indice_bloco,)))
+  return gerar_registros_vetorizado(quant_bloco, rng=rng, id_inicial=id_inicial)
+
+def gerar_bloco_serializado(indice_bloco, tamanho_bloco, quant_registros, semente=SEMENTE_PADRAO,
+                            formato=None):
+  """Gera um bloco e já o converte para bytes no formato de saída (no CSV, o cabeçalho só vai no primeiro bloco)
+
+  A serialização é a parte mais cara da gravação, por isso ela roda dentro do worker.
+
+  Returns:
+      tuple: (bytes do bloco, dict com a quantidade de alunos por situacao).
+  """
+  from src.armazenamento import FORMATO_PARQUET, serializar_bloco
+
+  formato = FORMATO_PARQUET if formato is None else formato
+  with medir('gerar_dados.gerar_bloco'):
+    df = gerar_bloco(indice_bloco, tamanho_bloco, quant_registros, semente)
+  with medir('gerar_dados.serializar_bloco'):
+    conteudo = serializar_bloco(df, formato, cabecalho=(indice_bloco == 0))
+  contar('gerar_dados.alunos_gerados', len(df))
+  contagem_situacao = {situacao: int(quantidade) for situacao, quantidade in df['situacao'].value_counts().items()}
+  return conteudo, contagem_situacao
+
+def iterar_blocos_serializados(bloco_inicial, quant_blocos, tamanho_bloco, quant_registros,
+                               semente=SEMENTE_PADRAO, workers=1, formato=None):
+  """Gera os blocos [bloco_inicial, quant_blocos) e os devolve sempre na ordem dos IDs
+
+  Com workers > 1 os blocos são gerados em um pool de processos. Como cada bloco tem a sua
+  própria semente, o resultado é idêntico byte a byte para qualquer quantidade de workers.
+  No máximo 2 blocos por worker ficam em memória ao mesmo tempo.
+  """
+  if workers <= 1:
+    for indice_bloco in range(bloco_inicial, quant_blocos):
+      yield indice_bloco, *gerar_bloco_serializado(indice_bloco, tamanho_bloco, quant_registros, semente, formato)
+    return
+
+  with ProcessPoolExecutor(max_workers=workers) as executor:
+    pendentes = deque()
+    proximo_bloco = bloco_inicial
+    while pendentes or proximo_bloco < quant_blocos:
+      while proximo_bloco < quant_blocos and len(pendentes) < 2 * workers:
+        futuro = executor.submit(gerar_bloco_serializado, proximo_bloco, tamanho_bloco, quant_registros,
+                                 semente, formato)
+        pendentes.append((proximo_bloco, futuro))
+        proximo_bloco += 1
+      indice_bloco, futuro = pendentes.popleft()
+      yield indice_bloco, *futuro.result()
+
+def get_caminho_progresso(caminho_saida):
+  caminho_saida = Path(caminho_saida)
+  return caminho_saida.with_name(caminho_saida.name + '.progresso.json')
+
+def salvar_progresso(caminho_progresso, progresso):
+  # Escreve em um arquivo temporário e troca de uma vez, para o progresso nunca ficar pela metade
+  caminho_tmp = caminho_progresso.with_name(caminho_progresso.name + '.tmp')
+  with open(caminho_tmp, 'w') as arquivo:
+    json.dump(progresso, arquivo)
+  os.replace(caminho_tmp, caminho_progresso)
+
+def gravar_registros_em_blocos(quant_registros,
+                               caminho_saida=URL_SAIDA_DADOS,
+                               tamanho_bloco=TAMANHO_BLOCO_PADRAO,
+                               semente=SEMENTE_PADRAO,
+                               retomar=True,
+                               workers=1):
+  """Gera os alunos em blocos de tamanho fixo e grava cada bloco assim que ele fica pronto
+
+  Em Parquet (padrão), cada bloco vira uma parte "part-XXXXX.parquet" dentro da pasta de saída.
+  Em CSV, cada bloco é anexado ao final do arquivo.
+
+  O uso de memória fica limitado a um bloco, não importa a quantidade total de alunos.
+  Após cada bloco gravado, um arquivo '<saida>.progresso.json' registra quantos blocos (e bytes)
+  já estão no disco. Se a execução for interrompida, rodar de novo com os mesmos parâmetros
+  continua a partir do último bloco concluído.
 
-    quant_irmaos = get_random_int(0, 4)
+  Args:
+      quant_registros (int): Quantidade total de alunos.
+      caminho_saida (Path | str): Caminho de saída (.parquet ou .csv).
+      tamanho_bloco (int): Quantidade de alunos por bloco.
+      semente (int): Semente principal da geração.
+      retomar (bool): Se False, ignora um progresso anterior e começa do zero.
+      workers (int): Quantidade de processos gerando blocos em paralelo.
 
-    aluno = calcular_dados_aluno(i, tempo_desloc_minutos, nota_p1, cod_cor_favorita, quant_irmaos, cod_letra_turma)
+  Returns:
+      dict: Quantidade de alunos por situacao.
+  """
+  from src.armazenamento import FORMATO_PARQUET, get_caminho_parte, get_formato, get_indice_parte
 
-    LISTA_ALUNOS.append(aluno)
+  caminho_saida = Path(caminho_saida)
+  caminho_progresso = get_caminho_progresso(caminho_saida)
+  formato = get_formato(caminho_saida)
+  quant_blocos = -(-quant_registros // tamanho_bloco)
 
-  return LISTA_ALUNOS
+  parametros = {
+    'quant_registros': quant_registros,
+    'tamanho_bloco': tamanho_bloco,
+    'semente': semente
+  }
+  progresso = {'parametros': parametros, 'blocos_concluidos': 0, 'bytes_gravados': 0, 'situacao': {}}
+
+  if retomar and caminho_progresso.exists() and caminho_saida.exists():
+    with open(caminho_progresso) as arquivo:
+      progresso_anterior = json.load(arquivo)
+    if progresso_anterior['parametros'] != parametros:
+      raise ValueError(f'O progresso salvo em "{caminho_progresso}" foi gerado com outros parâmetros '
+                       f'({progresso_anterior["parametros"]}). Use --restart para começar do zero.')
+    progresso = progresso_anterior
+    print(f'--- Retomando a partir do bloco {progresso["blocos_concluidos"]} de {quant_blocos} ---')
+
+  # Descarta qualquer bloco gravado pela metade depois do último progresso salvo
+  arquivo = None
+  if formato == FORMATO_PARQUET:
+    caminho_saida.mkdir(parents=True, exist_ok=True)
+    for parte in caminho_saida.glob('part-*'):
+      indice_parte = get_indice_parte(parte)
+      if indice_parte is not None and indice_parte >= progresso['blocos_concluidos']:
+        parte.unlink()
+  else:
+    arquivo = open(caminho_saida, 'r+b' if progresso['blocos_concluidos'] > 0 else 'wb')
+    arquivo.truncate(progresso['bytes_gravados'])
+    arquivo.seek(progresso['bytes_gravados'])
+
+  try:
+    blocos = iterar_blocos_serializados(progresso['blocos_concluidos'], quant_blocos, tamanho_bloco,
+                                        quant_registros, semente, workers, formato)
+    for indice_bloco, conteudo, contagem_situacao in blocos:
+      with medir('gerar_dados.gravar_bloco'):
+        if arquivo is None:
+          # Cada parte é escrita em um temporário e renomeada, então uma parte existente está sempre completa
+          caminho_parte = get_caminho_parte(caminho_saida, indice_bloco)
+          caminho_tmp = caminho_parte.with_name(caminho_parte.name + '.tmp')
+          with open(caminho_tmp, 'wb') as parte:
+            parte.write(conteudo)
+            parte.flush()
+            os.fsync(parte.fileno())
+          os.replace(caminho_tmp, caminho_parte)
+        else:
+          arquivo.write(conteudo)
+          arquivo.flush()
+          os.fsync(arquivo.fileno())
+
+      for situacao, quantidade in contagem_situacao.items():
+        progresso['situacao'][situacao] = progresso['situacao'].get(situacao, 0) + quantidade
+      progresso['blocos_concluidos'] = indice_bloco + 1
+      progresso['bytes_gravados'] += len(conteudo)
+      salvar_progresso(caminho_progresso, progresso)
+  finally:
+    if arquivo is not None:
+      arquivo.close()
+
+  caminho_progresso.unlink()
+  return progresso['situacao']
+
+def criar_parser():
+  parser = argparse.ArgumentParser(description='Gera a base sintética de desempenho dos alunos.')
+  parser.add_argument('--rows', type=int, default=50000,
+                      help='Quantidade total de alunos a gerar.')
+  parser.add_argument('--chunk-size', type=int, default=TAMANHO_BLOCO_PADRAO,
+                      help='Quantidade de alunos gerados e gravados por bloco.')
+  parser.add_argument('--out', type=Path, default=URL_SAIDA_DADOS,
+                      help='Caminho de saída: .parquet (pasta com uma parte por bloco) ou .csv (exportação).')
+  parser.add_argument('--seed', type=int, default=SEMENTE_PADRAO,
+                      help='Semente principal da geração.')
+  parser.add_argument('--restart', action='store_true',
+                      help='Ignora um progresso salvo e gera a base do zero.')
+  parser.add_argument('--workers', type=int, default=1,
+                      help='Quantidade de processos gerando blocos em paralelo (o resultado não muda).')
+  parser.add_argument('--profile', type=Path, default=None,
+                      help='Roda sob cProfile/tracemalloc e grava <arquivo>.prof/.txt/.json com os tempos por etapa.')
+  return parser
 
 
 if __name__ == "__main__":
-  random.seed(42)
-  lista_registros = gerar_registros(50000)
+  import pandas as pd
+  from src.armazenamento import get_formato, iterar_dataset
+
+  args = criar_parser().parse_args()
 
-  df = pd.DataFrame(lista_registros)
-  df.to_csv(URL_SAIDA_DADOS, index=False)
+  with perfil_opcional(args.profile):
+    contagem_situacao = gravar_registros_em_blocos(args.rows,
+                                                   caminho_saida=args.out,
+                                                   tamanho_bloco=args.chunk_size,
+                                                   semente=args.seed,
+                                                   retomar=not args.restart,
+                                                   workers=args.workers)
 
   print(f'\n --- RESULTADO SITUACAO --- \n'\
-        f'{df.groupby('situacao')['situacao'].count()}\n')
+        f'{pd.Series(contagem_situacao, name="situacao").sort_index()}\n')
 
-  print(f'--- Dados gerados e salvos com sucesso em formato CSV ---\n'\
-        f'--- Nome do arquivo: "desempenho_alunos.csv" ---\n'\
-        f'--- Função "Calculdora_features.pkl" salva com sucesso ---\n')
-  print(df.head(5))
+  print(f'--- Dados gerados e salvos com sucesso em formato {get_formato(args.out).upper()} ---\n'\
+        f'--- Nome do arquivo: "{args.out.name}" ---\n')
+  print(next(iterar_dataset(args.out, tamanho_bloco=5)))
@@ -0,0 +1,259 @@
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+
+"""
+  Motor de inferência leve para a árvore de decisão treinada.
+
+  compilar_arvore() transforma o modelo treinado (DecisionTreeClassifier ou ArvoreHistograma) em
+  arrays planos (feature, threshold, filhos e probabilidades das folhas), salvos em uma pasta com um
+  .npy por array, junto com o hash do .pkl de origem. PreditorArvore carrega essa pasta usando só
+  numpy (sem sklearn/joblib/pandas), com os arrays mapeados em memória (mmap), e:
+    - prever_um(): percorre a árvore em Python puro para uma única linha (microssegundos)
+    - prever_lote(): percorre a árvore em lote, vetorizado com numpy
+  Os dois devolvem a classe e as probabilidades em uma única travessia.
+"""
+
+BASE_DIR = Path(__file__).resolve().parent
+
+NOME_ARQUIVO_MODELO = BASE_DIR.parent / 'models' / 'modelo_desempenho.pkl'
+NOME_ARQUIVO_MODELO_COMPILADO = BASE_DIR.parent / 'models' / 'modelo_compilado'
+
+FOLHA = -1
+
+
+def compilar_arvore(modelo):
+    """Extrai os arrays planos de uma árvore de decisão treinada
+
+    Args:
+        modelo: DecisionTreeClassifier (sklearn) ou ArvoreHistograma já treinados.
+
+    Returns:
+        dict: Arrays 'feature', 'threshold', 'children_left', 'children_right', 'proba',
+            'classes' e 'feature_names'.
+
+    Raises:
+        TypeError: Se o modelo não for uma única árvore de decisão (ex.: HistGradientBoostingClassifier).
+    """
+    if hasattr(modelo, 'tree_'):
+        arvore = modelo.tree_
+        feature, threshold = arvore.feature, arvore.threshold
+        children_left, children_right = arvore.children_left, arvore.children_right
+        contagens = arvore.value[:, 0, :]
+    elif all(hasattr(modelo, atributo) for atributo in ('feature', 'threshold', 'children_left', 'children_right', 'value')):
+        feature, threshold = modelo.feature, modelo.threshold
+        children_left, children_right = modelo.children_left, modelo.children_right
+        contagens = modelo.value
+    else:
+        raise TypeError(f'Só árvores de decisão podem ser compiladas (recebido: {type(modelo).__name__}).')
+
+    folhas = np.asarray(children_left) == FOLHA
+    contagens = np.asarray(contagens, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        proba = contagens / contagens.sum(axis=1, keepdims=True)
+
+    return {
+        'feature': np.where(folhas, FOLHA, feature).astype(np.int32),
+        'threshold': np.asarray(threshold, dtype=np.float64),
+        'children_left': np.asarray(children_left, dtype=np.int32),
+        'children_right': np.asarray(children_right, dtype=np.int32),
+        'proba': np.nan_to_num(proba),
+        'classes': np.asarray(modelo.classes_).astype(str),
+        'feature_names': np.asarray(modelo.feature_names_in_).astype(str),
+    }
+
+
+def get_thresholds_float64(threshold):
+    """Ajusta os thresholds para comparar valores float64 dando o mesmo resultado que o sklearn
+
+    O sklearn converte X para float32 antes de comparar 'x <= threshold'. Para cada threshold t,
+    devolve o maior float64 t' tal que 'x <= t'' equivale a 'float32(x) <= t', assim a travessia de
+    uma linha em Python puro não precisa converter cada valor para float32.
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+    with np.errstate(over='ignore', invalid='ignore'):
+        # Maior float32 <= t e o float32 seguinte
+        abaixo = threshold.astype(np.float32)
+        abaixo = np.where(abaixo.astype(np.float64) > threshold, np.nextafter(abaixo, np.float32(-np.inf)), abaixo)
+        acima = np.nextafter(abaixo, np.float32(np.inf))
+        # float32(x) <= abaixo  <=>  x < ponto médio entre 'abaixo' e 'acima'
+        ponto_medio = (abaixo.astype(np.float64) + acima.astype(np.float64)) / 2
+    return np.nextafter(ponto_medio, -np.inf)
+
+
+def get_hash_modelo(caminho_modelo=NOME_ARQUIVO_MODELO):
+    """sha256 do conteúdo do .pkl do modelo (identifica o modelo que gerou um artefato derivado)."""
+    hash_arquivo = hashlib.sha256()
+    with open(caminho_modelo, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+            hash_arquivo.update(bloco)
+    return hash_arquivo.hexdigest()
+
+
+def salvar_arvore_compilada(modelo, caminho=NOME_ARQUIVO_MODELO_COMPILADO, hash_modelo=''):
+    """Grava os arrays da árvore compilada (um .npy por array) e o hash do .pkl de origem
+
+    A pasta é montada ao lado e só então trocada pela antiga, então quem estiver lendo nunca
+    encontra uma versão pela metade.
+    """
+    arrays = {**compilar_arvore(modelo), 'hash_modelo': np.str_(hash_modelo)}
+
+    caminho = Path(caminho)
+    caminho_temporario = caminho.with_name(caminho.name + '.tmp')
+    shutil.rmtree(caminho_temporario, ignore_errors=True)
+    caminho_temporario.mkdir(parents=True)
+    for nome, array in arrays.items():
+        np.save(caminho_temporario / f'{nome}.npy', array)
+
+    caminho_antigo = caminho.with_name(caminho.name + '.old')
+    shutil.rmtree(caminho_antigo, ignore_errors=True)
+    if caminho.exists():
+        os.replace(caminho, caminho_antigo)
+    os.replace(caminho_temporario, caminho)
+    shutil.rmtree(caminho_antigo, ignore_errors=True)
+
+
+def remover_arvore_compilada(caminho=NOME_ARQUIVO_MODELO_COMPILADO):
+    shutil.rmtree(caminho, ignore_errors=True)
+
+
+def get_hash_arvore_compilada(caminho=NOME_ARQUIVO_MODELO_COMPILADO):
+    """Hash do .pkl que gerou a árvore compilada ('' se não houver)."""
+    caminho_hash = Path(caminho) / 'hash_modelo.npy'
+    return str(np.load(caminho_hash)) if caminho_hash.exists() else ''
+
+
+class PreditorArvore:
+    """Preditor de uma árvore compilada, com a mesma interface básica do modelo do sklearn."""
+
+    def __init__(self, arrays):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.children_left = arrays['children_left']
+        self.children_right = arrays['children_right']
+        self.proba = arrays['proba']
+        self.classes_ = arrays['classes']
+        self.feature_names_in_ = arrays['feature_names']
+
+        # Classe de cada nó e listas Python para a travessia de uma linha (mais rápidas que indexar arrays numpy)
+        self.classe_no = self.classes_[np.argmax(self.proba, axis=1)]
+        self._nos = list(zip(self.feature.tolist(), get_thresholds_float64(self.threshold).tolist(),
+                             self.children_left.tolist(), self.children_right.tolist()))
+        self._proba_nos = [tuple(linha) for linha in self.proba.tolist()]
+        self._classe_nos = self.classe_no.tolist()
+        self._nomes = self.feature_names_in_.tolist()
+
+    @classmethod
+    def carregar(cls, caminho=NOME_ARQUIVO_MODELO_COMPILADO):
+        """Carrega a árvore compilada, com os arrays mapeados em memória (mmap_mode='r')."""
+        return cls({arquivo.stem: np.load(arquivo, mmap_mode='r') for arquivo in Path(caminho).glob('*.npy')})
+
+    # __________ Uma linha __________
+
+    def prever_um(self, linha):
+        """Prevê um único aluno
+
+        Args:
+            linha (dict | sequence): Valores das features, por nome (dict) ou na ordem de feature_names_in_.
+                Colunas a mais no dict (ex.: 'ID', 'situacao') são ignoradas.
+
+        Returns:
+            tuple: (classe prevista, tupla com a probabilidade de cada classe na ordem de classes_).
+        """
+        if isinstance(linha, dict):
+            linha = [linha[nome] for nome in self._nomes]
+
+        nos = self._nos
+        no = 0
+        feature, threshold, esquerda, direita = nos[0]
+        while feature != FOLHA:
+            no = esquerda if linha[feature] <= threshold else direita
+            feature, threshold, esquerda, direita = nos[no]
+        return self._classe_nos[no], self._proba_nos[no]
+
+    # __________ Lote __________
+
+    def get_array(self, X):
+        if hasattr(X, 'columns'):
+            X = X[self._nomes]
+        # Mesma precisão usada pelo sklearn ao comparar com os thresholds
+        return np.asarray(X, dtype=np.float32)
+
+    def apply(self, X):
+        """Índice da folha de cada linha, percorrendo a árvore nível a nível para todas as linhas juntas."""
+        X = self.get_array(X)
+        nos = np.zeros(len(X), dtype=np.int32)
+        ativos = np.flatnonzero(self.feature[nos] != FOLHA)
+        while len(ativos):
+            no = nos[ativos]
+            vai_para_esquerda = X[ativos, self.feature[no]] <= self.threshold[no]
+            nos[ativos] = np.where(vai_para_esquerda, self.children_left[no], self.children_right[no])
+            ativos = ativos[self.feature[nos[ativos]] != FOLHA]
+        return nos
+
+    def prever_lote(self, X):
+        """Prevê várias linhas de uma vez
+
+        Returns:
+            tuple: (array com a classe de cada linha, array (n_linhas x n_classes) de probabilidades).
+        """
+        folhas = self.apply(X)
+        return self.classe_no[folhas], self.proba[folhas]
+
+    def predict(self, X):
+        return self.prever_lote(X)[0]
+
+    def predict_proba(self, X):
+        return self.prever_lote(X)[1]
+
+
+def prever_uma_linha(modelo, linha):
+    """Classe e probabilidades de um único aluno (dict) com qualquer modelo, em uma única chamada
+
+    Usa a travessia em Python puro da árvore compilada. Para os demais modelos, faz uma única
+    chamada de predict_proba e tira a classe das probabilidades (sem chamar o predict).
+    """
+    if isinstance(modelo, PreditorArvore):
+        return modelo.prever_um(linha)
+
+    import pandas as pd
+    dados = pd.DataFrame([{nome: linha[nome] for nome in modelo.feature_names_in_}])
+    probabilidades = modelo.predict_proba(dados)[0]
+    return modelo.classes_[int(np.argmax(probabilidades))], tuple(probabilidades)
+
+
+def carregar_preditor(caminho_modelo=NOME_ARQUIVO_MODELO, caminho_modelo_compilado=NOME_ARQUIVO_MODELO_COMPILADO):
+    """Carrega o modelo para previsão, preferindo a árvore compilada
+
+    A versão compilada só é usada se tiver sido gerada a partir do .pkl atual (mesmo hash), ou se o
+    .pkl não existir. Caso contrário (ou se o modelo não for uma árvore), carrega o .pkl com joblib,
+    que só é importado (junto com o sklearn) nesse caso.
+    """
+    caminho_modelo, caminho_modelo_compilado = Path(caminho_modelo), Path(caminho_modelo_compilado)
+    if caminho_modelo_compilado.is_dir() and (
+            not caminho_modelo.exists()
+            or get_hash_arvore_compilada(caminho_modelo_compilado) == get_hash_modelo(caminho_modelo)):
+        return PreditorArvore.carregar(caminho_modelo_compilado)
+
+    import joblib
+    return joblib.load(caminho_modelo)
+
+
+if __name__ == "__main__":
+    # Compila o modelo já treinado (útil para modelos salvos antes da exportação automática)
+    parser = argparse.ArgumentParser(description='Compila o modelo treinado em arrays planos (pasta de .npy).')
+    parser.add_argument('--modelo', type=Path, default=NOME_ARQUIVO_MODELO)
+    parser.add_argument('--out', type=Path, default=NOME_ARQUIVO_MODELO_COMPILADO)
+    args = parser.parse_args()
+
+    if str(BASE_DIR.parent) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR.parent))
+    import joblib
+
+    salvar_arvore_compilada(joblib.load(args.modelo), args.out, get_hash_modelo(args.modelo))
+    print(f'--- Modelo compilado salvo em "{args.out}" ---')
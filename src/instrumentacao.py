@@ -0,0 +1,180 @@
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+"""
+  Instrumentação leve do pipeline: spans (tempo por etapa) e contadores.
+
+  Uso no código:
+    with medir('treinar_modelo.fit'):
+        modelo.fit(X_train, y_train)
+    contar('gerar_dados.alunos_gerados', len(bloco))
+
+  Desligada (o padrão), medir() devolve sempre o mesmo contexto vazio e contar() retorna na
+  primeira linha, então dá para deixar as chamadas no código de produção. Para ligar:
+    - variável de ambiente INSTRUMENTACAO=1 (ex.: no app.py); com INSTRUMENTACAO_SAIDA=<arquivo>
+      o resumo é gravado nesse arquivo quando o processo termina (.prom = formato Prometheus, senão JSON)
+    - ativar(), ou a flag --profile dos scripts, que também liga o cProfile e o tracemalloc
+
+  Só o processo atual é medido: os processos auxiliares (ex.: gerar_dados.py --workers) não entram no resumo.
+"""
+
+ATIVO = os.environ.get('INSTRUMENTACAO', '') not in ('', '0')
+
+# nome -> [chamadas, total_s, min_s, max_s]
+_spans = {}
+_contadores = {}
+_lock = threading.Lock()
+
+_CONTEXTO_VAZIO = contextlib.nullcontext()
+
+
+class Span:
+    """Mede o tempo de um bloco 'with' e acumula no span de mesmo nome."""
+
+    __slots__ = ('nome', 'inicio')
+
+    def __init__(self, nome):
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excecao):
+        duracao = time.perf_counter() - self.inicio
+        with _lock:
+            estatisticas = _spans.get(self.nome)
+            if estatisticas is None:
+                _spans[self.nome] = [1, duracao, duracao, duracao]
+            else:
+                estatisticas[0] += 1
+                estatisticas[1] += duracao
+                estatisticas[2] = min(estatisticas[2], duracao)
+                estatisticas[3] = max(estatisticas[3], duracao)
+        return False
+
+
+def medir(nome):
+    """Contexto que mede o tempo do bloco (um contexto vazio compartilhado se a instrumentação estiver desligada)."""
+    if not ATIVO:
+        return _CONTEXTO_VAZIO
+    return Span(nome)
+
+
+def contar(nome, quantidade=1):
+    if not ATIVO:
+        return
+    with _lock:
+        _contadores[nome] = _contadores.get(nome, 0) + quantidade
+
+
+def ativar(ativo=True):
+    global ATIVO
+    ATIVO = ativo
+
+
+def limpar():
+    with _lock:
+        _spans.clear()
+        _contadores.clear()
+
+
+def resumo():
+    """Spans (chamadas, total, média, mínimo e máximo) e contadores acumulados até agora."""
+    with _lock:
+        return {
+            'spans': {
+                nome: {
+                    'chamadas': chamadas,
+                    'total_s': total,
+                    'media_ms': total / chamadas * 1000,
+                    'min_ms': minimo * 1000,
+                    'max_ms': maximo * 1000,
+                }
+                for nome, (chamadas, total, minimo, maximo) in sorted(_spans.items())
+            },
+            'contadores': dict(sorted(_contadores.items())),
+        }
+
+
+def exportar_prometheus(dados=None):
+    """Resumo no formato de texto do Prometheus (exposition format)."""
+    dados = dados or resumo()
+    linhas = [
+        '# HELP preditor_etapa_segundos_total Tempo total gasto em cada etapa.',
+        '# TYPE preditor_etapa_segundos_total counter',
+        *(f'preditor_etapa_segundos_total{{etapa="{nome}"}} {span["total_s"]:.6f}' for nome, span in dados['spans'].items()),
+        '# HELP preditor_etapa_chamadas_total Quantidade de execuções de cada etapa.',
+        '# TYPE preditor_etapa_chamadas_total counter',
+        *(f'preditor_etapa_chamadas_total{{etapa="{nome}"}} {span["chamadas"]}' for nome, span in dados['spans'].items()),
+        '# HELP preditor_etapa_max_segundos Maior duração de uma execução de cada etapa.',
+        '# TYPE preditor_etapa_max_segundos gauge',
+        *(f'preditor_etapa_max_segundos{{etapa="{nome}"}} {span["max_ms"] / 1000:.6f}' for nome, span in dados['spans'].items()),
+        '# HELP preditor_contador_total Contadores do pipeline.',
+        '# TYPE preditor_contador_total counter',
+        *(f'preditor_contador_total{{nome="{nome}"}} {valor}' for nome, valor in dados['contadores'].items()),
+    ]
+    return '\n'.join(linhas) + '\n'
+
+
+def salvar_resumo(caminho):
+    """Grava o resumo em JSON ou, se o arquivo terminar em .prom, no formato do Prometheus."""
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    if caminho.suffix == '.prom':
+        caminho.write_text(exportar_prometheus(), encoding='utf-8')
+    else:
+        caminho.write_text(json.dumps(resumo(), indent=2, ensure_ascii=False), encoding='utf-8')
+
+
+@contextlib.contextmanager
+def perfilar(caminho_saida, quant_linhas=30):
+    """Liga a instrumentação e roda o bloco sob cProfile e tracemalloc
+
+    Grava, com o nome de caminho_saida:
+      - <nome>.prof: estatísticas do cProfile (abrir com pstats ou snakeviz)
+      - <nome>.txt: funções mais demoradas (tempo acumulado), maiores alocações e pico de memória
+      - <nome>.json: resumo dos spans e contadores
+    """
+    # Só importados quando o perfil é pedido
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+
+    caminho_saida = Path(caminho_saida)
+    caminho_saida.parent.mkdir(parents=True, exist_ok=True)
+    ativar()
+    tracemalloc.start()
+    perfil = cProfile.Profile()
+    perfil.enable()
+    try:
+        yield
+    finally:
+        perfil.disable()
+        alocacoes = tracemalloc.take_snapshot().statistics('lineno')[:quant_linhas]
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        perfil.dump_stats(caminho_saida.with_suffix('.prof'))
+        texto = io.StringIO()
+        pstats.Stats(perfil, stream=texto).sort_stats('cumulative').print_stats(quant_linhas)
+        texto.write(f'\n--- Pico de memória (tracemalloc): {pico / 2**20:.1f} MiB ---\n')
+        texto.write(f'--- Maiores alocações ainda vivas ao final ---\n')
+        texto.writelines(f'{alocacao}\n' for alocacao in alocacoes)
+        caminho_saida.with_suffix('.txt').write_text(texto.getvalue(), encoding='utf-8')
+        salvar_resumo(caminho_saida.with_suffix('.json'))
+
+
+def perfil_opcional(caminho_saida):
+    """perfilar(caminho_saida) se um caminho foi informado (flag --profile), senão um contexto vazio."""
+    return perfilar(caminho_saida) if caminho_saida else contextlib.nullcontext()
+
+
+if ATIVO and os.environ.get('INSTRUMENTACAO_SAIDA'):
+    atexit.register(salvar_resumo, os.environ['INSTRUMENTACAO_SAIDA'])
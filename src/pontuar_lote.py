@@ -0,0 +1,216 @@
+import argparse
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+# Permite rodar "python src/pontuar_lote.py" e ainda importar os módulos irmãos como "src.<modulo>"
+if str(Path(__file__).resolve().parent.parent) not in sys.path:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.armazenamento import EscritorDataset, iterar_dataset
+from src.esquema import COLUNAS_INDEPENDENTES
+from src.explicacao import ExplicadorArvore
+from src.gerar_dados import SEMENTE_PADRAO, calcular_dados_alunos_vetorizado, sortear_base_por_aluno
+from src.inferencia import NOME_ARQUIVO_MODELO, NOME_ARQUIVO_MODELO_COMPILADO, carregar_preditor
+
+"""
+  Pontuação em lote: prevê a situação de todos os alunos de um arquivo (CSV ou Parquet).
+
+  O arquivo precisa ter os dados independentes do aluno (os mesmos do formulário do app.py).
+  As colunas dependentes (faltas, horas_estudo, notas p2/p3...) são usadas quando existirem;
+  se não existirem, são calculadas com as regras de src/gerar_dados.py, em lote, com sorteios
+  semeados pelos dados de cada aluno (como no app.py): o resultado não depende de --chunk-size,
+  de --workers nem da posição do aluno no arquivo.
+
+  O arquivo é lido em blocos e cada bloco é pontuado com uma única chamada vetorizada ao modelo,
+  então a memória fica limitada ao tamanho do bloco, qualquer que seja o tamanho da entrada.
+
+  Com --samples K (valor esperado), as colunas dependentes de cada aluno são sorteadas K vezes e a
+  saída traz a média e a variância da probabilidade de cada classe nesses K sorteios. As K cópias
+  de todos os alunos do bloco continuam sendo pontuadas em uma única chamada ao modelo.
+
+  Com --explain, cada aluno sai com a regra que levou à previsão e a contribuição de cada feature
+  para a probabilidade da classe prevista (src/explicacao.py). A explicação vem da mesma travessia
+  da árvore que dá as probabilidades, então o custo fica próximo ao do predict_proba.
+"""
+
+TAMANHO_BLOCO_PONTUACAO = 500_000
+QUANT_AMOSTRAS_PADRAO = 100
+
+# Modelo (e explicador, com --explain) carregados uma vez por processo (no processo principal ou em cada worker do pool)
+MODELO = None
+EXPLICADOR = None
+
+
+def inicializar_modelo(caminho_modelo=NOME_ARQUIVO_MODELO, caminho_modelo_compilado=NOME_ARQUIVO_MODELO_COMPILADO,
+                       explicar=False):
+    global MODELO, EXPLICADOR
+    MODELO = carregar_preditor(caminho_modelo, caminho_modelo_compilado)
+    EXPLICADOR = ExplicadorArvore(MODELO) if explicar else None
+
+
+def completar_features(df, semente=SEMENTE_PADRAO):
+    """Calcula as colunas dependentes que faltarem no bloco, com sorteios semeados pelos dados de cada aluno."""
+    faltando = [coluna for coluna in MODELO.feature_names_in_ if coluna not in df.columns]
+    if not faltando:
+        return df
+
+    colunas_ausentes = [coluna for coluna in COLUNAS_INDEPENDENTES if coluna not in df.columns]
+    if colunas_ausentes:
+        raise ValueError(f'Colunas obrigatórias ausentes no arquivo de entrada: {colunas_ausentes}')
+
+    ids = df['ID'].to_numpy() if 'ID' in df.columns else np.arange(len(df))
+    independentes = [df[coluna].to_numpy() for coluna in COLUNAS_INDEPENDENTES]
+    calculados = calcular_dados_alunos_vetorizado(ids, *independentes,
+                                                  sorteios=sortear_base_por_aluno(*independentes, semente=semente))
+    calculados.index = df.index
+    return df.assign(**{coluna: calculados[coluna] for coluna in faltando})
+
+
+def calcular_valor_esperado(modelo, df, quant_amostras=QUANT_AMOSTRAS_PADRAO, rng=None, semente=SEMENTE_PADRAO):
+    """Probabilidade esperada de cada classe, sorteando K vezes as colunas dependentes de cada aluno
+
+    Cada aluno é repetido K vezes, as colunas dependentes de todas as cópias são calculadas em lote
+    e tudo é pontuado com uma única chamada de predict_proba (e não K chamadas).
+
+    Args:
+        modelo: Modelo com predict_proba e feature_names_in_.
+        df (pd.DataFrame): Dados independentes (COLUNAS_INDEPENDENTES) de cada aluno.
+        quant_amostras (int): Quantidade K de sorteios por aluno.
+        rng (numpy.random.Generator | int | None): Gerador (ou semente) usado nos sorteios de todos os
+            alunos. Se None, os sorteios de cada aluno são semeados pelos seus dados (sortear_base_por_aluno e a semente).
+
+    Returns:
+        tuple: (média, variância) da probabilidade de cada classe, arrays (n_alunos x n_classes).
+    """
+    colunas_ausentes = [coluna for coluna in COLUNAS_INDEPENDENTES if coluna not in df.columns]
+    if colunas_ausentes:
+        raise ValueError(f'Colunas obrigatórias ausentes: {colunas_ausentes}')
+
+    quant_alunos = len(df)
+    ids = np.repeat(df['ID'].to_numpy() if 'ID' in df.columns else np.arange(quant_alunos), quant_amostras)
+    sorteios = None
+    if rng is None:
+        sorteios = sortear_base_por_aluno(*(df[coluna].to_numpy() for coluna in COLUNAS_INDEPENDENTES),
+                                          semente=semente, quant_amostras=quant_amostras)
+    independentes = (np.repeat(df[coluna].to_numpy(), quant_amostras) for coluna in COLUNAS_INDEPENDENTES)
+    sorteados = calcular_dados_alunos_vetorizado(ids, *independentes, rng=rng, sorteios=sorteios)
+
+    probabilidades = np.asarray(modelo.predict_proba(sorteados[list(modelo.feature_names_in_)]), dtype=np.float64)
+    probabilidades = probabilidades.reshape(quant_alunos, quant_amostras, -1)
+    return probabilidades.mean(axis=1), probabilidades.var(axis=1)
+
+
+def pontuar_bloco(df, semente=SEMENTE_PADRAO, manter_features=False, quant_amostras=1):
+    """Pontua um bloco de alunos com uma única chamada de predict_proba
+
+    Returns:
+        pd.DataFrame: ID (se existir), situacao_prevista e a probabilidade de cada classe
+            (com quant_amostras > 1, a probabilidade média e a variância, 'var_<classe>'; com o
+            explicador carregado, a 'regra' e a contribuição de cada feature, 'contrib_<feature>').
+    """
+    variancias = explicacao = None
+    if quant_amostras > 1:
+        probabilidades, variancias = calcular_valor_esperado(MODELO, df, quant_amostras, semente=semente)
+    elif EXPLICADOR is not None:
+        df = completar_features(df, semente)
+        explicacao = EXPLICADOR.explicar_lote(df[list(MODELO.feature_names_in_)])
+        probabilidades = explicacao['probabilidades']
+    else:
+        df = completar_features(df, semente)
+        probabilidades = MODELO.predict_proba(df[list(MODELO.feature_names_in_)])
+    classes = np.asarray(MODELO.classes_)
+
+    resultado = df if manter_features else df[[coluna for coluna in ['ID'] if coluna in df.columns]]
+    resultado = resultado.assign(situacao_prevista=classes[np.argmax(probabilidades, axis=1)])
+    for indice_classe, classe in enumerate(classes):
+        resultado[f'prob_{classe}'] = probabilidades[:, indice_classe].astype(np.float32)
+    if variancias is not None:
+        for indice_classe, classe in enumerate(classes):
+            resultado[f'var_{classe}'] = variancias[:, indice_classe].astype(np.float32)
+    if explicacao is not None:
+        resultado['regra'] = explicacao['regras']
+        for indice_feature, feature in enumerate(EXPLICADOR.feature_names_in_):
+            resultado[f'contrib_{feature}'] = explicacao['contribuicoes'][:, indice_feature].astype(np.float32)
+    return resultado
+
+
+def iterar_blocos_pontuados(caminho_entrada, tamanho_bloco, semente=SEMENTE_PADRAO, manter_features=False, workers=1,
+                            caminho_modelo=NOME_ARQUIVO_MODELO, caminho_modelo_compilado=NOME_ARQUIVO_MODELO_COMPILADO,
+                            quant_amostras=1, explicar=False):
+    """Lê e pontua a entrada em blocos, devolvendo os blocos pontuados na ordem do arquivo
+
+    Com workers > 1, os blocos são pontuados em um pool de processos (cada um carrega o modelo uma vez)
+    e no máximo 2 blocos por worker ficam em memória ao mesmo tempo.
+    """
+    if explicar and quant_amostras > 1:
+        raise ValueError('A explicação vale para uma previsão por aluno: não dá para usar junto com o valor esperado.')
+    blocos = iterar_dataset(caminho_entrada, tamanho_bloco)
+
+    if workers <= 1:
+        inicializar_modelo(caminho_modelo, caminho_modelo_compilado, explicar)
+        for df in blocos:
+            yield pontuar_bloco(df, semente, manter_features, quant_amostras)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=inicializar_modelo,
+                             initargs=(caminho_modelo, caminho_modelo_compilado, explicar)) as executor:
+        pendentes = deque()
+        for df in blocos:
+            pendentes.append(executor.submit(pontuar_bloco, df, semente, manter_features, quant_amostras))
+            if len(pendentes) >= 2 * workers:
+                yield pendentes.popleft().result()
+        while pendentes:
+            yield pendentes.popleft().result()
+
+
+def pontuar_arquivo(caminho_entrada, caminho_saida, tamanho_bloco=TAMANHO_BLOCO_PONTUACAO, semente=SEMENTE_PADRAO,
+                    manter_features=False, workers=1, quant_amostras=1, explicar=False):
+    """Pontua o arquivo de entrada inteiro e grava o resultado (CSV ou Parquet, pela extensão)
+
+    Returns:
+        dict: Linhas pontuadas, tempo total e linhas por segundo.
+    """
+    inicio = time.perf_counter()
+    with EscritorDataset(caminho_saida) as escritor:
+        for resultado in iterar_blocos_pontuados(caminho_entrada, tamanho_bloco, semente, manter_features, workers,
+                                                 quant_amostras=quant_amostras, explicar=explicar):
+            escritor.escrever(resultado)
+            print(f'--- {escritor.linhas_gravadas} linhas pontuadas ---')
+    tempo_total = time.perf_counter() - inicio
+
+    return {
+        'linhas': escritor.linhas_gravadas,
+        'tempo_s': tempo_total,
+        'linhas_por_s': escritor.linhas_gravadas / tempo_total if tempo_total else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pontua (prevê a situação de) todos os alunos de um arquivo.')
+    parser.add_argument('entrada', type=Path, help='Arquivo de entrada (.csv ou .parquet).')
+    parser.add_argument('--out', type=Path, required=True, help='Arquivo de saída (.csv ou .parquet).')
+    parser.add_argument('--chunk-size', type=int, default=TAMANHO_BLOCO_PONTUACAO,
+                        help='Linhas lidas e pontuadas por bloco.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processos pontuando blocos em paralelo.')
+    parser.add_argument('--seed', type=int, default=SEMENTE_PADRAO,
+                        help='Semente usada ao calcular as colunas dependentes que faltarem.')
+    parser.add_argument('--keep-features', action='store_true',
+                        help='Inclui todas as colunas de entrada (e as calculadas) na saída.')
+    parser.add_argument('--samples', type=int, default=1,
+                        help='Sorteios das colunas dependentes por aluno (valor esperado). Cada bloco vira '
+                             'chunk-size x samples linhas na memória, então reduza o --chunk-size junto.')
+    parser.add_argument('--explain', action='store_true',
+                        help='Inclui a regra da árvore e a contribuição de cada feature para a classe prevista.')
+    args = parser.parse_args()
+
+    resumo = pontuar_arquivo(args.entrada, args.out, args.chunk_size, args.seed, args.keep_features, args.workers,
+                             args.samples, args.explain)
+    print(f'\n--- {resumo["linhas"]} alunos pontuados em {resumo["tempo_s"]:.2f}s '
+          f'({resumo["linhas_por_s"]:,.0f} linhas/s) ---\n'
+          f'--- Resultado salvo em "{args.out}" ---')
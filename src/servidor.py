@@ -0,0 +1,270 @@
+import argparse
+import json
+import math
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Permite rodar "python src/servidor.py" e ainda importar os módulos irmãos como "src.<modulo>"
+if str(Path(__file__).resolve().parent.parent) not in sys.path:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.esquema import COLUNAS_INDEPENDENTES
+from src.gerar_dados import SEMENTE_PADRAO, calcular_dados_alunos_vetorizado, sortear_base_por_aluno
+from src.inferencia import NOME_ARQUIVO_MODELO, NOME_ARQUIVO_MODELO_COMPILADO, carregar_preditor
+
+"""
+  Servidor HTTP de previsões (só biblioteca padrão + numpy/pandas), independente do Streamlit.
+
+  Endpoints:
+    POST /predict   {"tempo_desloc_minutos": 60, "nota_p1": 5.0, ...}          -> uma previsão
+                    {"alunos": [{...}, {...}]}                                  -> uma previsão por aluno
+    GET  /metrics   latência p50/p99, vazão e contadores
+    GET  /health    "ok"
+
+  Cada aluno precisa dos dados independentes do formulário do app.py. As colunas dependentes
+  (faltas, horas_estudo, notas p2/p3...) são usadas quando enviadas e calculadas quando não, com
+  sorteios semeados pelos dados do próprio aluno (sortear_base_por_aluno, o mesmo esquema do app.py e da
+  pontuação em lote): a resposta não depende das requisições anteriores nem do micro-lote.
+
+  O modelo é carregado uma vez. As requisições concorrentes são agrupadas em micro-lotes por uma
+  única thread, que calcula as colunas dependentes e chama o predict_proba uma vez por lote.
+"""
+
+PORTA_PADRAO = 8000
+TAMANHO_MAXIMO_LOTE = 1024
+ESPERA_MAXIMA_LOTE_S = 0.002
+JANELA_LATENCIAS = 10_000
+
+
+class MicroLote:
+    """Agrupa as previsões pedidas por várias threads em uma única chamada ao modelo."""
+
+    def __init__(self, modelo, tamanho_maximo=TAMANHO_MAXIMO_LOTE, espera_maxima=ESPERA_MAXIMA_LOTE_S,
+                 semente=SEMENTE_PADRAO):
+        self.modelo = modelo
+        self.colunas = list(modelo.feature_names_in_)
+        self.classes = [str(classe) for classe in modelo.classes_]
+        self.tamanho_maximo = tamanho_maximo
+        self.espera_maxima = espera_maxima
+        self.semente = semente
+        self.fila = queue.Queue()
+        self.estatisticas = Estatisticas()
+        threading.Thread(target=self.executar, daemon=True).start()
+
+    def preparar_aluno(self, aluno):
+        """Valida um aluno (dict) e o converte em uma linha de floats na ordem das features (NaN = calcular)
+
+        Raises:
+            ValueError: Se faltar um campo obrigatório ou algum valor não for numérico.
+        """
+        if not isinstance(aluno, dict):
+            raise ValueError(f'Cada aluno deve ser um objeto JSON (recebido: {type(aluno).__name__}).')
+        campos_ausentes = [coluna for coluna in COLUNAS_INDEPENDENTES if aluno.get(coluna) is None]
+        if campos_ausentes:
+            raise ValueError(f'Campos obrigatórios ausentes: {campos_ausentes}')
+
+        linha = []
+        for coluna in self.colunas:
+            valor = aluno.get(coluna)
+            if valor is None:
+                linha.append(math.nan)
+                continue
+            try:
+                numero = float(valor)
+            except (TypeError, ValueError):
+                numero = math.nan
+            if not math.isfinite(numero):
+                raise ValueError(f'Valor inválido em "{coluna}": {valor!r} (esperado um número).')
+            linha.append(numero)
+        return linha
+
+    def prever(self, alunos):
+        """Valida e enfileira uma lista de alunos (dicts) e espera as previsões."""
+        # A validação e a conversão rodam na thread da requisição: um aluno inválido não derruba o
+        # micro-lote dos outros, que só recebe linhas de floats
+        linhas = [self.preparar_aluno(aluno) for aluno in alunos]
+
+        futuro = Future()
+        self.fila.put((linhas, futuro))
+        return futuro.result()
+
+    def executar(self):
+        while True:
+            pedidos = [self.fila.get()]
+            quant_alunos = len(pedidos[0][0])
+            limite = time.perf_counter() + self.espera_maxima
+            while quant_alunos < self.tamanho_maximo:
+                restante = limite - time.perf_counter()
+                try:
+                    pedido = self.fila.get(timeout=restante) if restante > 0 else self.fila.get_nowait()
+                except queue.Empty:
+                    break
+                pedidos.append(pedido)
+                quant_alunos += len(pedido[0])
+
+            try:
+                linhas = [linha for pedido, _ in pedidos for linha in pedido]
+                resultados = self.prever_alunos(np.array(linhas, dtype=np.float64))
+                self.estatisticas.registrar_lote()
+            except Exception as erro:
+                for _, futuro in pedidos:
+                    futuro.set_exception(erro)
+                continue
+
+            inicio = 0
+            for pedido, futuro in pedidos:
+                futuro.set_result(resultados[inicio:inicio + len(pedido)])
+                inicio += len(pedido)
+
+    def prever_alunos(self, X):
+        """Previsões de um lote de linhas já validadas (preparar_aluno), na ordem das features."""
+        # Calcula (em lote) as colunas dependentes que não vieram na requisição
+        faltando = np.isnan(X)
+        if faltando.any():
+            # Sorteios semeados pelos dados de cada aluno, calculados para o lote todo com operações de array
+            # (sem um gerador por aluno): a mesma entrada tem sempre a mesma resposta que no app, qualquer
+            # que seja o micro-lote em que ela caiu
+            independentes = [X[:, self.colunas.index(coluna)] for coluna in COLUNAS_INDEPENDENTES]
+            calculados = calcular_dados_alunos_vetorizado(np.zeros(len(X), dtype=np.int64), *independentes,
+                                                          sorteios=sortear_base_por_aluno(*independentes, semente=self.semente))
+            X = np.where(faltando, calculados[self.colunas].to_numpy(dtype=np.float64), X)
+
+        probabilidades = self.modelo.predict_proba(pd.DataFrame(X, columns=self.colunas)).tolist()
+        return [
+            {
+                'situacao': self.classes[int(np.argmax(probabilidade))],
+                'probabilidades': dict(zip(self.classes, probabilidade)),
+            }
+            for probabilidade in probabilidades
+        ]
+
+
+class Estatisticas:
+    """Contadores e janela de latências das requisições (thread-safe)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inicio = time.time()
+        self.latencias = deque(maxlen=JANELA_LATENCIAS)
+        self.requisicoes = 0
+        self.erros = 0
+        self.alunos = 0
+        self.lotes = 0
+
+    def registrar_requisicao(self, latencia, quant_alunos, erro=False):
+        with self.lock:
+            self.latencias.append(latencia)
+            self.requisicoes += 1
+            self.alunos += quant_alunos
+            self.erros += erro
+
+    def registrar_lote(self):
+        with self.lock:
+            self.lotes += 1
+
+    def resumo(self):
+        with self.lock:
+            latencias = np.array(self.latencias)
+            tempo_no_ar = time.time() - self.inicio
+            return {
+                'requisicoes': self.requisicoes,
+                'erros': self.erros,
+                'alunos_previstos': self.alunos,
+                'lotes_do_modelo': self.lotes,
+                'alunos_por_lote': self.alunos / self.lotes if self.lotes else 0.0,
+                'latencia_p50_ms': float(np.percentile(latencias, 50) * 1000) if len(latencias) else None,
+                'latencia_p99_ms': float(np.percentile(latencias, 99) * 1000) if len(latencias) else None,
+                'requisicoes_por_s': self.requisicoes / tempo_no_ar,
+                'tempo_no_ar_s': tempo_no_ar,
+            }
+
+
+class HandlerPrevisao(BaseHTTPRequestHandler):
+    # HTTP/1.1 mantém a conexão aberta entre requisições (keep-alive)
+    protocol_version = 'HTTP/1.1'
+    # Cabeçalhos e corpo saem em duas escritas: sem o algoritmo de Nagle, a segunda não espera o ACK da primeira
+    disable_nagle_algorithm = True
+    micro_lote = None
+
+    def responder(self, status, corpo):
+        conteudo = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(conteudo)))
+        self.end_headers()
+        self.wfile.write(conteudo)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.responder(200, 'ok')
+        elif self.path == '/metrics':
+            self.responder(200, self.micro_lote.estatisticas.resumo())
+        else:
+            self.responder(404, {'erro': f'Caminho não encontrado: {self.path}'})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self.responder(404, {'erro': f'Caminho não encontrado: {self.path}'})
+            return
+
+        inicio = time.perf_counter()
+        quant_alunos = 0
+        try:
+            corpo = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            if not isinstance(corpo, dict):
+                raise ValueError('O corpo deve ser um objeto JSON: um aluno ou {"alunos": [...]}.')
+            lote = 'alunos' in corpo
+            alunos = corpo['alunos'] if lote else [corpo]
+            if not isinstance(alunos, list) or not alunos:
+                raise ValueError('"alunos" deve ser uma lista com pelo menos um aluno.')
+            quant_alunos = len(alunos)
+            resultados = self.micro_lote.prever(alunos)
+            self.responder(200, {'previsoes': resultados} if lote else resultados[0])
+            erro = False
+        except (ValueError, KeyError, TypeError) as excecao:
+            self.responder(400, {'erro': str(excecao)})
+            erro = True
+        except Exception as excecao:
+            self.responder(500, {'erro': str(excecao)})
+            erro = True
+        self.micro_lote.estatisticas.registrar_requisicao(time.perf_counter() - inicio, quant_alunos, erro)
+
+    def log_message(self, format, *args):
+        # Não imprime uma linha por requisição (atrapalha a vazão)
+        pass
+
+
+class ServidorPrevisoes(ThreadingHTTPServer):
+    daemon_threads = True
+    # Conexões aguardando o accept (o padrão, 5, derruba conexões com muitos clientes simultâneos)
+    request_queue_size = 128
+
+
+def criar_servidor(host='127.0.0.1', porta=PORTA_PADRAO, caminho_modelo=NOME_ARQUIVO_MODELO,
+                   caminho_modelo_compilado=NOME_ARQUIVO_MODELO_COMPILADO):
+    modelo = carregar_preditor(caminho_modelo, caminho_modelo_compilado)
+    handler = type('HandlerPrevisaoModelo', (HandlerPrevisao,), {'micro_lote': MicroLote(modelo)})
+    return ServidorPrevisoes((host, porta), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Servidor HTTP de previsões de desempenho dos alunos.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORTA_PADRAO)
+    args = parser.parse_args()
+
+    servidor = criar_servidor(args.host, args.port)
+    print(f'--- Servidor de previsões em http://{args.host}:{args.port} (POST /predict, GET /metrics) ---')
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.server_close()
@@ -0,0 +1,102 @@
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+
+import numpy as np
+
+"""
+  Teste de carga do servidor de previsões (src/servidor.py).
+
+  Abre N conexões keep-alive em paralelo, cada uma enviando requisições POST /predict com alunos
+  aleatórios, e mostra requisições/s e a latência vista pelo cliente. Erros de conexão contam como
+  erros (a conexão é reaberta) e o resumo compara as requisições concluídas com as esperadas.
+
+  Uso:
+    python src/servidor.py &
+    python src/teste_carga.py --threads 16 --requests 2000
+"""
+
+
+def gerar_aluno(rng):
+    return {
+        'tempo_desloc_minutos': rng.randrange(15, 151, 5),
+        'nota_p1': round(rng.uniform(0, 10), 1),
+        'cod_cor_favorita': rng.randint(0, 7),
+        'quant_irmaos': rng.randint(0, 4),
+        'cod_letra_turma': rng.randint(0, 3),
+    }
+
+
+def executar_cliente(host, porta, quant_requisicoes, alunos_por_requisicao, semente, latencias, erros):
+    rng = random.Random(semente)
+    conexao = http.client.HTTPConnection(host, porta)
+    for _ in range(quant_requisicoes):
+        if alunos_por_requisicao == 1:
+            corpo = gerar_aluno(rng)
+        else:
+            corpo = {'alunos': [gerar_aluno(rng) for _ in range(alunos_por_requisicao)]}
+
+        inicio = time.perf_counter()
+        try:
+            conexao.request('POST', '/predict', body=json.dumps(corpo), headers={'Content-Type': 'application/json'})
+            resposta = conexao.getresponse()
+            resposta.read()
+        except (OSError, http.client.HTTPException) as erro:
+            # A conexão fica inutilizável: conta o erro e abre outra para as próximas requisições
+            erros.append(type(erro).__name__)
+            conexao.close()
+            conexao = http.client.HTTPConnection(host, porta)
+            continue
+        latencias.append(time.perf_counter() - inicio)
+        if resposta.status != 200:
+            erros.append(resposta.status)
+    conexao.close()
+
+
+def executar_teste_carga(host='127.0.0.1', porta=8000, threads=8, requisicoes=1000, alunos_por_requisicao=1):
+    """Roda o teste de carga e devolve um resumo com requisições/s e latências p50/p99 (ms)."""
+    latencias, erros = [], []
+    clientes = [
+        threading.Thread(target=executar_cliente,
+                         args=(host, porta, requisicoes, alunos_por_requisicao, semente, latencias, erros))
+        for semente in range(threads)
+    ]
+
+    inicio = time.perf_counter()
+    for cliente in clientes:
+        cliente.start()
+    for cliente in clientes:
+        cliente.join()
+    tempo_total = time.perf_counter() - inicio
+
+    return {
+        'requisicoes_esperadas': threads * requisicoes,
+        'requisicoes_concluidas': len(latencias),
+        'erros': len(erros),
+        'erros_por_tipo': {str(tipo): erros.count(tipo) for tipo in sorted(set(erros), key=str)},
+        'requisicoes_por_s': len(latencias) / tempo_total,
+        'alunos_por_s': len(latencias) * alunos_por_requisicao / tempo_total,
+        'latencia_p50_ms': float(np.percentile(latencias, 50) * 1000) if latencias else None,
+        'latencia_p99_ms': float(np.percentile(latencias, 99) * 1000) if latencias else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Teste de carga do servidor de previsões.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--threads', type=int, default=8, help='Conexões simultâneas.')
+    parser.add_argument('--requests', type=int, default=1000, help='Requisições por conexão.')
+    parser.add_argument('--batch', type=int, default=1, help='Alunos por requisição.')
+    args = parser.parse_args()
+
+    resumo = executar_teste_carga(args.host, args.port, args.threads, args.requests, args.batch)
+    print(json.dumps(resumo, indent=2))
+
+    conexao = http.client.HTTPConnection(args.host, args.port)
+    conexao.request('GET', '/metrics')
+    print('--- Métricas do servidor ---')
+    print(json.dumps(json.loads(conexao.getresponse().read()), indent=2, ensure_ascii=False))
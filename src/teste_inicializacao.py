@@ -0,0 +1,95 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+"""
+  Teste de inicialização a frio (cold start): tempo entre iniciar um processo Python novo e ter a
+  primeira previsão pronta, para cada forma de carregar o modelo e as métricas.
+
+  Cenários:
+    legado      joblib + sklearn + pandas: unpickle do .pkl e predict_proba de um DataFrame (sem métricas)
+    compilado   só numpy: árvore compilada (mmap) + métricas em JSON + prever_um
+    app         importações do app.py (streamlit incluso) + versão atual do modelo/métricas + previsão do formulário
+
+  Cada cenário roda em um processo novo várias vezes; o tempo é medido do momento em que o processo
+  é criado até ele registrar a primeira previsão (a finalização do processo não entra na conta).
+
+  Uso:
+    python src/teste_inicializacao.py --runs 5
+"""
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Aluno de exemplo, com os dados independentes do formulário
+ALUNO = {'tempo_desloc_minutos': 60, 'nota_p1': 5.0, 'cod_cor_favorita': 3, 'quant_irmaos': 1, 'cod_letra_turma': 2}
+
+CENARIOS = {
+    'legado': f'''
+import joblib, pandas as pd
+from src.gerar_dados import calcular_dados_aluno_semeado
+modelo = joblib.load('models/modelo_desempenho.pkl')
+aluno = calcular_dados_aluno_semeado(99999, **{ALUNO!r})
+dados = pd.DataFrame([aluno])[list(modelo.feature_names_in_)]
+previsao = modelo.classes_[modelo.predict_proba(dados)[0].argmax()]
+''',
+    'compilado': f'''
+import json
+from src.gerar_dados import calcular_dados_aluno_semeado
+from src.inferencia import carregar_preditor
+modelo = carregar_preditor()
+metricas = json.load(open('models/model_metrics.json', encoding='utf-8'))
+aluno = calcular_dados_aluno_semeado(99999, **{ALUNO!r})
+previsao = modelo.prever_um(aluno)[0]
+''',
+    'app': f'''
+import app
+versao = app.RecarregadorModelo().obter()
+previsao = app.CachePrevisoes(versao['caminho_modelo']).prever(versao['modelo'], **{ALUNO!r})[1]
+''',
+}
+
+# Ao final de cada cenário, o processo imprime o instante (relógio de parede) da primeira previsão
+FINAL_CENARIO = '''
+import time
+print(previsao, time.time())
+'''
+
+
+def medir_cenario(codigo, quant_execucoes):
+    """Roda o cenário em processos novos e devolve o tempo (s) até a primeira previsão de cada execução."""
+    tempos = []
+    for _ in range(quant_execucoes):
+        inicio = time.time()
+        saida = subprocess.run([sys.executable, '-W', 'ignore', '-c', codigo + FINAL_CENARIO], cwd=RAIZ,
+                               capture_output=True, text=True, check=True).stdout
+        previsao, instante = saida.strip().splitlines()[-1].rsplit(' ', 1)
+        tempos.append(float(instante) - inicio)
+    return tempos, previsao
+
+
+def executar_teste_inicializacao(quant_execucoes=5, cenarios=tuple(CENARIOS)):
+    """Mede cada cenário e devolve, por cenário, a mediana/mínimo/máximo (ms) e a previsão obtida."""
+    resumo = {}
+    for nome in cenarios:
+        tempos, previsao = medir_cenario(CENARIOS[nome], quant_execucoes)
+        resumo[nome] = {
+            'primeira_previsao_p50_ms': float(np.median(tempos) * 1000),
+            'primeira_previsao_min_ms': float(np.min(tempos) * 1000),
+            'primeira_previsao_max_ms': float(np.max(tempos) * 1000),
+            'previsao': previsao,
+        }
+    return resumo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Mede o tempo até a primeira previsão em um processo novo.')
+    parser.add_argument('--runs', type=int, default=5, help='Execuções (processos novos) por cenário.')
+    parser.add_argument('--scenarios', nargs='+', choices=list(CENARIOS), default=list(CENARIOS))
+    args = parser.parse_args()
+
+    print(json.dumps(executar_teste_inicializacao(args.runs, args.scenarios), indent=2, ensure_ascii=False))
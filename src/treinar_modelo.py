@@ -1,57 +1,401 @@
 import pandas as pd
+import numpy as np
 import joblib
 from sklearn.tree import DecisionTreeClassifier
-from sklearn.model_selection import train_test_split
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.model_selection import train_test_split, ParameterGrid
 from sklearn.metrics import classification_report
+from joblib import Parallel, delayed
 from pathlib import Path
 import traceback
-import io
+import sys
+import argparse
+import pickle
+import json
+import time
+
+# Permite rodar "python src/treinar_modelo.py" e ainda importar os módulos irmãos como "src.<modulo>"
+if str(Path(__file__).resolve().parent.parent) not in sys.path:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.armazenamento import carregar_dataset, iterar_dataset
+from src.arvore_histograma import ArvoreHistograma, codificar_classes
+from src.avaliacao import (QUANT_REAMOSTRAS_PADRAO, calcular_intervalos_bootstrap, calcular_matriz_confusao,
+                           iniciar_validacao_cruzada, resumir_validacao_cruzada)
+from src.esquema import CLASSES_SITUACAO, COLUNA_ALVO, COLUNAS_FEATURES
+from src.inferencia import NOME_ARQUIVO_MODELO_COMPILADO, get_hash_modelo, remover_arvore_compilada, salvar_arvore_compilada
+from src.cache_previsoes import NOME_ARQUIVO_TABELA, salvar_tabela_previsoes
+from src.instrumentacao import contar, medir, perfil_opcional
+from src.validacao_dados import exigir_dados_validos, get_tipos_perfil
+from src.versoes_modelo import publicar_versao
 
 # Montando os caminhos relevantes
 BASE_DIR = Path(__file__).resolve().parent
 
-URL_DADOS = BASE_DIR.parent / 'data' / 'desempenho_alunos.csv'
+URL_DADOS = BASE_DIR.parent / 'data' / 'desempenho_alunos.parquet'
+URL_DADOS_CSV = BASE_DIR.parent / 'data' / 'desempenho_alunos.csv'
 
 NOME_ARQUIVO_MODELO = BASE_DIR.parent / 'models' / 'modelo_desempenho.pkl'
-NOME_ARQUIVO_METRICAS = BASE_DIR.parent / 'models' / 'model_metrics.pkl'
+NOME_ARQUIVO_METRICAS = BASE_DIR.parent / 'models' / 'model_metrics.json'
+NOME_ARQUIVO_COMPARACAO = BASE_DIR.parent / 'models' / 'model_comparison.pkl'
+
+PROPORCAO_TESTE = 0.2
+TAMANHO_BLOCO_TREINO = 1_000_000
+
+def get_caminho_dados():
+    # Se a base Parquet ainda não foi gerada, usa a base em CSV (ex.: a exportação que vem no repositório)
+    return URL_DADOS if URL_DADOS.exists() or not URL_DADOS_CSV.exists() else URL_DADOS_CSV
+
+def salvar_modelo(modelo):
+    """Salva o modelo (.pkl) e, se ele for uma árvore, a versão compilada usada pelo preditor leve."""
+    # Grava em um temporário e renomeia: quem lê o .pkl nunca encontra um arquivo pela metade
+    caminho_tmp = NOME_ARQUIVO_MODELO.with_name(NOME_ARQUIVO_MODELO.name + '.tmp')
+    with medir('treinar_modelo.joblib_dump'):
+        joblib.dump(modelo, caminho_tmp)
+    caminho_tmp.replace(NOME_ARQUIVO_MODELO)
+    try:
+        with medir('treinar_modelo.compilar'):
+            salvar_arvore_compilada(modelo, NOME_ARQUIVO_MODELO_COMPILADO, get_hash_modelo(NOME_ARQUIVO_MODELO))
+        print(f"--- Modelo compilado salvo em '{NOME_ARQUIVO_MODELO_COMPILADO.name}' ---")
+    except TypeError as erro:
+        # Não deixa uma versão compilada de um modelo antigo para trás
+        remover_arvore_compilada(NOME_ARQUIVO_MODELO_COMPILADO)
+        print(f"--- Modelo não compilado: {erro} ---")
+
+def salvar_metricas(metricas):
+    """Salva as métricas (classification_report) em JSON: o app lê sem precisar de joblib/sklearn."""
+    caminho_tmp = NOME_ARQUIVO_METRICAS.with_name(NOME_ARQUIVO_METRICAS.name + '.tmp')
+    with open(caminho_tmp, 'w', encoding='utf-8') as arquivo:
+        json.dump(metricas, arquivo, indent=2, default=float)
+    caminho_tmp.replace(NOME_ARQUIVO_METRICAS)
+
+def publicar_modelo():
+    """Publica o modelo e as métricas recém-salvos como uma nova versão (o app troca os dois juntos)."""
+    versao = publicar_versao(NOME_ARQUIVO_MODELO, NOME_ARQUIVO_MODELO_COMPILADO, NOME_ARQUIVO_METRICAS)
+    print(f"--- Versão do modelo publicada: {versao} ---")
+
+def get_tipos_validados(caminho_dados):
+    """Valida a base antes de lê-la (src/validacao_dados.py) e devolve os tipos compactos sugeridos pelo perfil."""
+    # ValueError se alguma verificação falhar: o treino para antes de carregar a base
+    with medir('treinar_modelo.validar_dados'):
+        perfil = exigir_dados_validos(caminho_dados)
+    return get_tipos_perfil(perfil)
+
+def carregar_dados_treino():
+    caminho_dados = get_caminho_dados()
+    tipos = get_tipos_validados(caminho_dados)
+    # Lê a base já com os menores tipos que cabem os valores de cada coluna (ver o perfil)
+    with medir('treinar_modelo.ler_dados'):
+        data = carregar_dataset(caminho_dados, tipos=tipos)
+    with medir('treinar_modelo.dropna'):
+        data.dropna(inplace=True)
+    contar('treinar_modelo.linhas_lidas', len(data))
+
+    print("\n--- Dados Carregados ---")
+    print(data.head())
+
+    print("\n--- Preparando dados para o treino ---")
+    # Features e alvo vêm do esquema (mesma ordem de colunas do gerador e do app)
+    features = data[COLUNAS_FEATURES]
+    target = COLUNA_ALVO
+    X = features
+    y = data[target]
+    return X, y
+
+def preparar_dados():
+    X, y = carregar_dados_treino()
+    with medir('treinar_modelo.split'):
+        return train_test_split(X, y, test_size=PROPORCAO_TESTE, random_state=42)
+
+def calcular_intervalos_previsoes(classes, y_real, y_previsto, quant_reamostras=QUANT_REAMOSTRAS_PADRAO):
+    """Intervalos de confiança (bootstrap) da acurácia, F1 e precisão das previsões no conjunto de testes."""
+    matriz_confusao = calcular_matriz_confusao(codificar_classes(classes, y_real), codificar_classes(classes, y_previsto),
+                                               len(classes))
+    return calcular_intervalos_bootstrap(matriz_confusao, quant_reamostras)
+
+def treinar_modelo(k_folds=0, n_jobs=-1, quant_reamostras=QUANT_REAMOSTRAS_PADRAO):
+    """Treina a árvore no split 80/20 e salva o modelo e as métricas (com intervalos de confiança)
+
+    Com k_folds > 1, também roda a validação cruzada estratificada: os folds treinam em paralelo,
+    em outros processos, enquanto o modelo final treina aqui, e o resumo vai para as métricas
+    na chave 'validacao_cruzada'.
 
-def treinar_modelo():
+    Returns:
+        bool: True se o modelo foi treinado e salvo; False se algo falhou (ex.: a base não passou na validação).
+    """
     print(f"Importando dados da fonte...")
     
-    # LACUNA 5: Use 'pd.read_csv()' para ler a 'URL_DADOS'
     try:
-      data = pd.read_csv(URL_DADOS)
-      data.dropna(inplace=True)
-      
-      print("\n--- Dados Carregados ---")
-      print(data.head())
+      X, y = carregar_dados_treino()
 
-      print("\n--- Preparando dados para o treino ---")
-      features = data.drop(columns=['ID','situacao'], axis=1)
-      target = 'situacao'
-      X = features
-      y = data[target]
+      validacao = None
+      if k_folds > 1:
+        classes = np.asarray(CLASSES_SITUACAO, dtype=object)
+        codigos = codificar_classes(classes, y)
+        print(f"\n--- Validação cruzada: {k_folds} folds em paralelo (n_jobs={n_jobs}) ---")
+        validacao = iniciar_validacao_cruzada(X.to_numpy(dtype=np.float32), codigos, k_folds, n_jobs=n_jobs)
 
-      X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+      with medir('treinar_modelo.split'):
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=PROPORCAO_TESTE, random_state=42)
   
       modelo = DecisionTreeClassifier(random_state=42)
-      modelo.fit(X_train, y_train)
+      with medir('treinar_modelo.fit'):
+        modelo.fit(X_train, y_train)
+      contar('treinar_modelo.linhas_treino', len(X_train))
       print(f"\n--- Modelo Treinado! Classes: {modelo.classes_} ---")
       
-      joblib.dump(modelo, NOME_ARQUIVO_MODELO)
+      salvar_modelo(modelo)
       print(f"--- Modelo salvo com sucesso ---")
 
-      y_pred = modelo.predict(X_test)
-      metrics_data = classification_report(y_test, y_pred, target_names=modelo.classes_, output_dict=True)
-      joblib.dump(metrics_data, NOME_ARQUIVO_METRICAS) # Salvando as métricas para acesso no streamlit
+      with medir('treinar_modelo.predict'):
+        y_pred = modelo.predict(X_test)
+      with medir('treinar_modelo.classification_report'):
+        metrics_data = classification_report(y_test, y_pred, target_names=modelo.classes_, output_dict=True)
+      with medir('treinar_modelo.bootstrap'):
+        metrics_data['intervalos_confianca'] = calcular_intervalos_previsoes(modelo.classes_, y_test, y_pred,
+                                                                             quant_reamostras)
+
+      if validacao is not None:
+        with medir('treinar_modelo.validacao_cruzada'):
+          metrics_data['validacao_cruzada'] = resumir_validacao_cruzada(validacao, codigos, len(classes),
+                                                                        quant_reamostras)
+        media = metrics_data['validacao_cruzada']['media']
+        print(f"--- Validação cruzada: acurácia média {media['acuracia']:.4f}, F1 médio {media['f1_ponderado']:.4f} ---")
+
+      salvar_metricas(metrics_data) # Salvando as métricas para acesso no streamlit
+      publicar_modelo()
       print("--- Métricas calculadas e salvas. ---")
+      return True
     except FileNotFoundError:
-      print(f'Erro FileNotFoundError: \n Arquivo CSV não encontrado... Rode o script "gerar_csv.py" para criá-lo!')
+      print(f'Erro FileNotFoundError: \n Base de dados não encontrada... Rode o script "src/gerar_dados.py" para criá-la!')
       traceback.print_exc()
     except Exception as any: 
       print(f'Erro: {any}')
       traceback.print_exc()
+    return False
+
+# __________ Busca de hiperparâmetros e comparação de modelos __________
+
+# Candidatos da busca: (nome da família, classe, grade de parâmetros)
+CANDIDATOS_TUNING = [
+    ('arvore', DecisionTreeClassifier, {
+        'max_depth': [4, 6, 8, 10, 12, 16, None],
+        'min_samples_leaf': [1, 5, 20, 50],
+        'random_state': [42],
+    }),
+    ('hist_gradient_boosting', HistGradientBoostingClassifier, {
+        'max_iter': [50, 100],
+        'max_depth': [4, 8],
+        'random_state': [42],
+    }),
+]
+
+# Modelos com F1 até essa distância do melhor são considerados empatados; o mais rápido vence
+TOLERANCIA_F1 = 0.001
+
+def ajustar_candidato(familia, classe_modelo, parametros, X_train, y_train, X_test, y_test):
+    """Treina um candidato e calcula o classification_report dele no conjunto de testes."""
+    modelo = classe_modelo(**parametros)
+    inicio = time.perf_counter()
+    modelo.fit(X_train, y_train)
+    tempo_fit = time.perf_counter() - inicio
+
+    relatorio = classification_report(y_test, modelo.predict(X_test), target_names=modelo.classes_, output_dict=True)
+    return modelo, {'familia': familia, 'parametros': parametros, 'tempo_fit_s': tempo_fit, 'relatorio': relatorio}
+
+def medir_inferencia(modelo, X_test, repeticoes=200):
+    """Mede a latência de uma linha (como no app.py), a vazão em lote e o tamanho do pickle."""
+    linha = X_test.iloc[[0]]
+    latencias = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        modelo.predict_proba(linha)
+        latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    modelo.predict_proba(X_test)
+    tempo_lote = time.perf_counter() - inicio
+
+    return {
+        'latencia_p50_ms': float(np.percentile(latencias, 50) * 1000),
+        'latencia_p99_ms': float(np.percentile(latencias, 99) * 1000),
+        'vazao_linhas_s': len(X_test) / tempo_lote,
+        'tamanho_pickle_kb': len(pickle.dumps(modelo)) / 1024,
+    }
+
+def ajustar_hiperparametros(n_jobs=-1, quant_reamostras=QUANT_REAMOSTRAS_PADRAO):
+    """Compara famílias de modelos e hiperparâmetros em paralelo e salva o escolhido nos artefatos de sempre
+
+    Os treinos rodam em paralelo (joblib, n_jobs processos). As medições de latência e vazão rodam
+    depois, uma de cada vez, para que um candidato não atrapalhe a medição do outro.
+    A comparação completa fica em NOME_ARQUIVO_COMPARACAO.
+
+    Returns:
+        bool: True se o modelo escolhido foi salvo; False se algo falhou.
+    """
+    print(f"Importando dados da fonte...")
+
+    try:
+      X_train, X_test, y_train, y_test = preparar_dados()
+
+      tarefas = [
+          (familia, classe_modelo, parametros)
+          for familia, classe_modelo, grade in CANDIDATOS_TUNING
+          for parametros in ParameterGrid(grade)
+      ]
+      print(f"\n--- Treinando {len(tarefas)} candidatos (n_jobs={n_jobs}) ---")
+      with medir('treinar_modelo.tunar_candidatos'):
+        resultados = Parallel(n_jobs=n_jobs)(
+            delayed(ajustar_candidato)(familia, classe_modelo, parametros, X_train, y_train, X_test, y_test)
+            for familia, classe_modelo, parametros in tarefas
+        )
+      contar('treinar_modelo.candidatos', len(tarefas))
+
+      comparacao = []
+      for modelo, resultado in resultados:
+          resultado.update(medir_inferencia(modelo, X_test))
+          resultado['acuracia'] = resultado['relatorio']['accuracy']
+          resultado['f1_ponderado'] = resultado['relatorio']['weighted avg']['f1-score']
+          resultado['precisao_ponderada'] = resultado['relatorio']['weighted avg']['precision']
+          comparacao.append(resultado)
+
+      melhor_f1 = max(resultado['f1_ponderado'] for resultado in comparacao)
+      empatados = [i for i, resultado in enumerate(comparacao) if resultado['f1_ponderado'] >= melhor_f1 - TOLERANCIA_F1]
+      escolhido = min(empatados, key=lambda i: comparacao[i]['latencia_p50_ms'])
+      for i, resultado in enumerate(comparacao):
+          resultado['escolhido'] = i == escolhido
+
+      tabela = pd.DataFrame(comparacao).drop(columns=['relatorio'])
+      print(tabela.sort_values('f1_ponderado', ascending=False).to_string(index=False))
+
+      modelo = resultados[escolhido][0]
+      salvar_modelo(modelo)
+      comparacao[escolhido]['relatorio']['intervalos_confianca'] = calcular_intervalos_previsoes(
+          modelo.classes_, y_test, modelo.predict(X_test), quant_reamostras)
+      salvar_metricas(comparacao[escolhido]['relatorio'])
+      publicar_modelo()
+      joblib.dump(comparacao, NOME_ARQUIVO_COMPARACAO)
+      print(f"\n--- Modelo escolhido: {comparacao[escolhido]['familia']} {comparacao[escolhido]['parametros']} ---")
+      print(f"--- Modelo, métricas e comparação salvos com sucesso ---")
+      return True
+    except FileNotFoundError:
+      print(f'Erro FileNotFoundError: \n Base de dados não encontrada... Rode o script "src/gerar_dados.py" para criá-la!')
+      traceback.print_exc()
+    except Exception as any:
+      print(f'Erro: {any}')
+      traceback.print_exc()
+    return False
+
+# __________ Treino incremental (fora da memória) __________
+
+def eh_teste(ids, proporcao_teste=PROPORCAO_TESTE):
+    # Split de teste determinístico pelo ID (hash multiplicativo), sem precisar embaralhar a base inteira
+    hash_ids = (np.asarray(ids, dtype=np.uint64) * np.uint64(2654435761)) % np.uint64(2**32)
+    return hash_ids < np.uint64(proporcao_teste * 2**32)
+
+def iterar_blocos_treino(caminho_dados, tamanho_bloco, teste=False, tipos=None):
+    """Percorre a base em blocos e devolve (X, y) só das linhas de treino (ou só das de teste)."""
+    for data in iterar_dataset(caminho_dados, tamanho_bloco, tipos=tipos):
+        data = data.dropna()
+        data = data[eh_teste(data['ID']) == teste]
+        yield data[COLUNAS_FEATURES], data[COLUNA_ALVO]
+
+def gerar_relatorio_blocos(modelo, blocos_teste, quant_reamostras=QUANT_REAMOSTRAS_PADRAO):
+    """Monta o mesmo dict do classification_report (mais os intervalos de confiança) a partir de uma matriz de confusão acumulada bloco a bloco."""
+    classes = modelo.classes_
+    n_classes = len(classes)
+    matriz_confusao = np.zeros(n_classes * n_classes, dtype=np.int64)
+
+    for X, y in blocos_teste:
+        real = codificar_classes(classes, y)
+        previsto = np.searchsorted(classes, modelo.predict(X))
+        matriz_confusao += np.bincount(real * n_classes + previsto, minlength=n_classes * n_classes)
+
+    # Cada célula da matriz vira um único par (real, previsto) com peso igual à sua contagem
+    pares = np.arange(n_classes * n_classes)
+    relatorio = classification_report(classes[pares // n_classes], classes[pares % n_classes],
+                                      labels=classes, target_names=classes,
+                                      sample_weight=matriz_confusao, output_dict=True)
+    relatorio['intervalos_confianca'] = calcular_intervalos_bootstrap(matriz_confusao.reshape(n_classes, n_classes),
+                                                                     quant_reamostras)
+    return relatorio
+
+def treinar_modelo_incremental(tamanho_bloco=TAMANHO_BLOCO_TREINO, max_depth=12,
+                               quant_reamostras=QUANT_REAMOSTRAS_PADRAO):
+    """Treina uma ArvoreHistograma lendo a base em blocos, para bases maiores que a memória
+
+    Faz uma passada pela base para o treino e uma passada final pelas linhas de teste
+    (separadas pelo hash do ID) para calcular as métricas. Salva os mesmos artefatos de treinar_modelo.
+
+    Returns:
+        bool: True se o modelo foi treinado e salvo; False se algo falhou.
+    """
+    print(f"Treinando em blocos de {tamanho_bloco} linhas...")
+
+    try:
+      caminho_dados = get_caminho_dados()
+      tipos = get_tipos_validados(caminho_dados)
+
+      modelo = ArvoreHistograma(max_depth=max_depth)
+      with medir('treinar_modelo.fit'):
+        modelo.fit_blocos(iterar_blocos_treino(caminho_dados, tamanho_bloco, tipos=tipos))
+      print(f"\n--- Modelo Treinado! Classes: {modelo.classes_} | Nós: {len(modelo.feature)} ---")
+
+      salvar_modelo(modelo)
+      print(f"--- Modelo salvo com sucesso ---")
+
+      with medir('treinar_modelo.classification_report'):
+        metrics_data = gerar_relatorio_blocos(modelo, iterar_blocos_treino(caminho_dados, tamanho_bloco, teste=True, tipos=tipos),
+                                              quant_reamostras)
+      salvar_metricas(metrics_data)
+      publicar_modelo()
+      print(f"--- Métricas calculadas e salvas. Acurácia: {metrics_data['accuracy']:.4f} ---")
+      return True
+    except FileNotFoundError:
+      print(f'Erro FileNotFoundError: \n Base de dados não encontrada... Rode o script "src/gerar_dados.py" para criá-la!')
+      traceback.print_exc()
+    except Exception as any:
+      print(f'Erro: {any}')
+      traceback.print_exc()
+    return False
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description='Treina o modelo de desempenho dos alunos.')
+    parser.add_argument('comando', nargs='?', default='treinar', choices=['treinar', 'tunar'],
+                        help='"treinar" (padrão) treina o modelo; "tunar" compara hiperparâmetros e famílias de modelos.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Treina lendo a base em blocos (para bases maiores que a memória).')
+    parser.add_argument('--chunk-size', type=int, default=TAMANHO_BLOCO_TREINO,
+                        help='Linhas por bloco no treino incremental.')
+    parser.add_argument('--max-depth', type=int, default=12,
+                        help='Profundidade máxima da árvore no treino incremental.')
+    parser.add_argument('--n-jobs', type=int, default=-1,
+                        help='Processos usados em paralelo pelo "tunar" e pela validação cruzada (-1 = todos os núcleos).')
+    parser.add_argument('--cv', type=int, default=0,
+                        help='Roda também a validação cruzada estratificada com esse número de folds (0 = não roda).')
+    parser.add_argument('--bootstrap', type=int, default=QUANT_REAMOSTRAS_PADRAO,
+                        help='Reamostras do bootstrap usadas nos intervalos de confiança das métricas.')
+    parser.add_argument('--precompute-grid', action='store_true',
+                        help='Após o treino, pré-calcula a previsão de todas as entradas do formulário do app.')
+    parser.add_argument('--profile', type=Path, default=None,
+                        help='Roda sob cProfile/tracemalloc e grava <arquivo>.prof/.txt/.json com os tempos por etapa.')
+    return parser
 
-# (Bloco pronto)
 if __name__ == "__main__":
-    treinar_modelo()
\ No newline at end of file
+    args = criar_parser().parse_args()
+    with perfil_opcional(args.profile):
+        if args.comando == 'tunar':
+            treinou = ajustar_hiperparametros(args.n_jobs, args.bootstrap)
+        elif args.incremental:
+            treinou = treinar_modelo_incremental(args.chunk_size, args.max_depth, args.bootstrap)
+        else:
+            treinou = treinar_modelo(args.cv, args.n_jobs, args.bootstrap)
+
+        # Sem um modelo novo (ex.: base reprovada na validação), não recalcula a tabela com o modelo anterior
+        if not treinou:
+            sys.exit(1)
+
+        if args.precompute_grid:
+            with medir('treinar_modelo.tabela_previsoes'):
+                quant_linhas = salvar_tabela_previsoes(NOME_ARQUIVO_MODELO)
+            print(f'--- Tabela com {quant_linhas} previsões salva em "{NOME_ARQUIVO_TABELA}" ---')
\ No newline at end of file
@@ -0,0 +1,473 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Permite rodar "python src/validacao_dados.py" e ainda importar os módulos irmãos como "src.<modulo>"
+if str(Path(__file__).resolve().parent.parent) not in sys.path:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.armazenamento import FORMATO_PARQUET, get_arquivos_parquet, get_formato, iterar_dataset
+from src.esquema import CLASSES_SITUACAO, CODIGOS_SITUACAO, COLUNA_ALVO, COLUNA_ID, COLUNAS, TIPOS_NUMPY, get_tipos_colunas
+from src.gerar_dados import calcular_media_vetorizado, calcular_reprovado_vetorizado, config
+from src.instrumentacao import contar, medir, perfil_opcional
+
+"""
+  Validação e perfil da base de alunos, em uma única passada em blocos (memória limitada a um bloco).
+
+  Cada bloco vira um AcumuladorPerfil com:
+    - por coluna: contagem, nulos, valores não numéricos ou não inteiros, mínimo, máximo, média e
+      variância (combinadas pela fórmula de Chan) e um histograma de faixas fixas
+    - violações das regras de src/gerar_dados.py (notas entre 0 e 10.01, nota_p3 = -1 fora da
+      recuperação, aprovado com faltas acima de TOTAL_MAX_FALTAS, situação coerente com faltas/média...)
+    - quantidade de alunos por classe
+    - um mapa de bits dos IDs (1 bit por ID possível), para achar IDs duplicados. O mapa de um bloco
+      só cobre o trecho dos IDs do bloco (byte inicial + bits), então o acumulador de um bloco
+      continua do tamanho do bloco, qualquer que seja a posição dele na base
+  Os acumuladores dos blocos são combinados (combinar()) na ordem em que chegam, então os blocos
+  podem ser processados em paralelo (--workers) com o mesmo resultado.
+
+  O perfil é gravado em JSON ao lado da base ('<base>.perfil.json'), com a assinatura dos arquivos
+  (tamanho e data de modificação). O treino (src/treinar_modelo.py) reaproveita o perfil se a base
+  não mudou (senão valida de novo), para antes de treinar se alguma verificação falhar e lê a base
+  com os tipos sugeridos pelo perfil (o menor tipo que cabe o intervalo de cada coluna).
+
+  A base é lida com os tipos do arquivo (sem converter para o esquema): um valor fora do intervalo
+  do tipo compacto vira uma violação no perfil, e não um erro no meio da leitura.
+"""
+
+TAMANHO_BLOCO_VALIDACAO = 1_000_000
+
+# Proporção máxima de nulos por coluna (as linhas com nulos são descartadas no treino)
+MAX_PROPORCAO_NULOS = 0.01
+# Proporção mínima da menor classe
+MIN_PROPORCAO_CLASSE = 0.01
+# Proporção de linhas com violação de cada regra aceita sem falhar (0 = nenhuma)
+TOLERANCIA_VIOLACOES = 0.0
+
+# Faixas fixas dos histogramas (início, fim, quantidade de faixas): iguais em todos os blocos, para
+# que os histogramas possam ser somados. Valores fora da faixa são contados em 'abaixo'/'acima'.
+FAIXAS_HISTOGRAMA = {
+    'tempo_desloc_minutos': (0, 200, 40),
+    'faltas': (0, 50, 50),
+    'cod_cor_favorita': (0, 8, 8),
+    'quant_irmaos': (0, 10, 10),
+    'horas_estudo': (0, 120, 24),
+    'fez_atividade_extra': (0, 2, 2),
+    'cod_letra_turma': (0, 4, 4),
+    'nota_p1': (0, 10, 20),
+    'nota_p2': (0, 10, 20),
+    'nota_p3': (-1, 10, 22),
+    'recuperacao': (0, 2, 2),
+}
+
+COLUNAS_NUMERICAS = [coluna for coluna in COLUNAS if coluna != COLUNA_ALVO]
+COLUNAS_INTEIRAS = [coluna for coluna in COLUNAS_NUMERICAS if not np.issubdtype(TIPOS_NUMPY[coluna], np.floating)]
+COLUNAS_NOTAS = ['nota_p1', 'nota_p2', 'nota_p3']
+
+# O gerador sorteia as notas em [início, fim + 0.01] (get_random_float), então 10.01 é uma nota válida
+NOTA_MINIMA, NOTA_MAXIMA = 0, 10.01
+
+
+def fora_do_intervalo(valores, minimo, maximo):
+    return (valores < minimo) | (valores > maximo)
+
+
+# Regras verificadas linha a linha: nome -> função (colunas numéricas, códigos da situacao) -> máscara
+# das linhas que violam a regra. Comparações com nulos (NaN) dão False: os nulos são contados à parte.
+REGRAS = {
+    'ID_negativo': lambda v, s: v['ID'] < 0,
+    'tempo_desloc_negativo': lambda v, s: v['tempo_desloc_minutos'] < 0,
+    'faltas_negativas': lambda v, s: v['faltas'] < 0,
+    'horas_estudo_negativas': lambda v, s: v['horas_estudo'] < 0,
+    'quant_irmaos_negativa': lambda v, s: v['quant_irmaos'] < 0,
+    'cod_cor_favorita_fora_0_7': lambda v, s: fora_do_intervalo(v['cod_cor_favorita'], 0, 7),
+    'cod_letra_turma_fora_0_3': lambda v, s: fora_do_intervalo(v['cod_letra_turma'], 0, 3),
+    'fez_atividade_extra_fora_0_1': lambda v, s: fora_do_intervalo(v['fez_atividade_extra'], 0, 1),
+    'recuperacao_fora_0_1': lambda v, s: fora_do_intervalo(v['recuperacao'], 0, 1),
+    'nota_p1_fora_do_intervalo': lambda v, s: fora_do_intervalo(v['nota_p1'], NOTA_MINIMA, NOTA_MAXIMA),
+    'nota_p2_fora_do_intervalo': lambda v, s: fora_do_intervalo(v['nota_p2'], NOTA_MINIMA, NOTA_MAXIMA),
+    # nota_p3 = -1 é o valor de quem não fez recuperação
+    'nota_p3_fora_do_intervalo': lambda v, s: (v['nota_p3'] != -1) & fora_do_intervalo(v['nota_p3'], NOTA_MINIMA, NOTA_MAXIMA),
+    'nota_p3_incoerente_com_recuperacao': lambda v, s: ((v['recuperacao'] == 0) & (v['nota_p3'] != -1))
+                                                       | ((v['recuperacao'] == 1) & (v['nota_p3'] == -1)),
+    'situacao_desconhecida': lambda v, s: s == -2,
+    'aprovado_acima_max_faltas': lambda v, s: (s == CODIGOS_SITUACAO['aprovado'])
+                                              & (v['faltas'] > config['TOTAL_MAX_FALTAS']),
+    'situacao_incoerente': lambda v, s: (s >= 0) & (calcular_situacao_esperada(v) != s),
+}
+
+
+def calcular_situacao_esperada(valores):
+    """Código da situação pelas regras do gerador (faltas e média das duas maiores notas)."""
+    media = calcular_media_vetorizado(*(valores[coluna] for coluna in COLUNAS_NOTAS))
+    reprovado = calcular_reprovado_vetorizado(valores['faltas'], media)
+    esperada = np.where(reprovado, CODIGOS_SITUACAO['reprovado'], CODIGOS_SITUACAO['aprovado'])
+    # Sem faltas ou sem média não há situação esperada (-1 nunca é igual a um código válido)
+    esperada[np.isnan(valores['faltas']) | np.isnan(media)] = -1
+    return esperada
+
+
+def get_codigos_situacao(serie):
+    """Código de cada situação (-1 = nula, -2 = fora de CLASSES_SITUACAO)."""
+    codigos = pd.Index(CLASSES_SITUACAO).get_indexer(serie).astype(np.int64)
+    codigos[(codigos == -1) & serie.notna().to_numpy()] = -2
+    return codigos
+
+
+class AcumuladorPerfil:
+    """Estatísticas de um ou mais blocos da base, que podem ser combinadas com as de outros blocos."""
+
+    def __init__(self):
+        self.linhas = 0
+        self.colunas_ausentes = set()
+        self.colunas = {
+            coluna: {
+                'contagem': 0, 'nulos': 0, 'nao_numericos': 0, 'nao_inteiros': 0,
+                'minimo': np.inf, 'maximo': -np.inf, 'media': 0.0, 'm2': 0.0,
+                'histograma': np.zeros(FAIXAS_HISTOGRAMA[coluna][2], dtype=np.int64) if coluna in FAIXAS_HISTOGRAMA else None,
+                'abaixo': 0, 'acima': 0,
+            }
+            for coluna in COLUNAS_NUMERICAS
+        }
+        self.nulos_situacao = 0
+        self.classes = np.zeros(len(CLASSES_SITUACAO), dtype=np.int64)
+        self.violacoes = dict.fromkeys(REGRAS, 0)
+        self.ids_validos = 0
+        # Mapa de bits dos IDs a partir do byte byte_inicial_ids (o bit i do byte b é o ID 8 * b + i)
+        self.byte_inicial_ids = 0
+        self.mapa_ids = np.zeros(0, dtype=np.uint8)
+
+    # __________ Um bloco __________
+
+    def adicionar_bloco(self, df):
+        self.linhas += len(df)
+        self.colunas_ausentes.update(coluna for coluna in COLUNAS if coluna not in df.columns)
+
+        valores = {}
+        for coluna, estatisticas in self.colunas.items():
+            if coluna not in df.columns:
+                valores[coluna] = np.full(len(df), np.nan)
+                continue
+            nulos = df[coluna].isna().to_numpy()
+            valores[coluna] = pd.to_numeric(df[coluna], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+            self.adicionar_valores(estatisticas, valores[coluna], nulos, coluna)
+
+        # As notas têm 2 casas decimais: arredondar antes das regras desfaz a diferença de representação
+        # (ex.: 10.01 gravado em float32 no Parquet fica um pouco acima de 10.01)
+        for coluna in COLUNAS_NOTAS:
+            valores[coluna] = np.round(valores[coluna], 2)
+
+        if COLUNA_ALVO in df.columns:
+            codigos = get_codigos_situacao(df[COLUNA_ALVO])
+            self.nulos_situacao += int((codigos == -1).sum())
+            self.classes += np.bincount(codigos[codigos >= 0], minlength=len(CLASSES_SITUACAO))
+        else:
+            codigos = np.full(len(df), -1, dtype=np.int64)
+
+        for nome, regra in REGRAS.items():
+            self.violacoes[nome] += int(np.count_nonzero(regra(valores, codigos)))
+
+        self.adicionar_ids(valores[COLUNA_ID])
+
+    def adicionar_valores(self, estatisticas, valores, nulos, coluna):
+        validos = valores[~np.isnan(valores)]
+        estatisticas['nulos'] += int(nulos.sum())
+        estatisticas['nao_numericos'] += int(np.count_nonzero(~nulos) - len(validos))
+        if not len(validos):
+            return
+        estatisticas['nao_inteiros'] += int(np.count_nonzero(validos != np.floor(validos)))
+        estatisticas['minimo'] = min(estatisticas['minimo'], float(validos.min()))
+        estatisticas['maximo'] = max(estatisticas['maximo'], float(validos.max()))
+        combinar_momentos(estatisticas, len(validos), float(validos.mean()), float(((validos - validos.mean()) ** 2).sum()))
+
+        if estatisticas['histograma'] is not None:
+            inicio, fim, quant_faixas = FAIXAS_HISTOGRAMA[coluna]
+            estatisticas['histograma'] += np.histogram(validos, bins=quant_faixas, range=(inicio, fim))[0]
+            estatisticas['abaixo'] += int(np.count_nonzero(validos < inicio))
+            estatisticas['acima'] += int(np.count_nonzero(validos > fim))
+
+    def adicionar_ids(self, ids):
+        ids = ids[~np.isnan(ids) & (ids >= 0) & (ids == np.floor(ids))].astype(np.int64)
+        if not len(ids):
+            return
+        # Mapa de bits do trecho [primeiro byte, maior ID] do bloco (os IDs de um bloco costumam ser contíguos)
+        inicio = int(ids.min()) // 8 * 8
+        presentes = np.zeros(int(ids.max()) - inicio + 1, dtype=bool)
+        presentes[ids - inicio] = True
+        self.ids_validos += len(ids)
+        self.juntar_mapa_ids(inicio // 8, np.packbits(presentes, bitorder='little'))
+
+    def juntar_mapa_ids(self, byte_inicial, bits):
+        """Liga no mapa os bits de 'bits', cujo primeiro byte é o byte_inicial (o mapa cresce para os dois lados)."""
+        if not len(bits):
+            return
+        if not len(self.mapa_ids):
+            self.byte_inicial_ids, self.mapa_ids = byte_inicial, bits.copy()
+            return
+        inicio = min(self.byte_inicial_ids, byte_inicial)
+        fim = max(self.byte_inicial_ids + len(self.mapa_ids), byte_inicial + len(bits))
+        if inicio < self.byte_inicial_ids or fim > self.byte_inicial_ids + len(self.mapa_ids):
+            # Cresce com folga (ao menos dobra), para a combinação de muitos blocos em sequência não copiar o mapa a cada bloco
+            mapa = np.zeros(max(fim - inicio, 2 * len(self.mapa_ids)), dtype=np.uint8)
+            deslocamento = self.byte_inicial_ids - inicio
+            mapa[deslocamento:deslocamento + len(self.mapa_ids)] = self.mapa_ids
+            self.byte_inicial_ids, self.mapa_ids = inicio, mapa
+        deslocamento = byte_inicial - self.byte_inicial_ids
+        self.mapa_ids[deslocamento:deslocamento + len(bits)] |= bits
+
+    # __________ Combinação __________
+
+    def combinar(self, outro):
+        """Soma as estatísticas de outro acumulador a este (o resultado não depende da ordem dos blocos)."""
+        self.linhas += outro.linhas
+        self.colunas_ausentes |= outro.colunas_ausentes
+        for coluna, estatisticas in self.colunas.items():
+            outras = outro.colunas[coluna]
+            for chave in ('nulos', 'nao_numericos', 'nao_inteiros', 'abaixo', 'acima'):
+                estatisticas[chave] += outras[chave]
+            estatisticas['minimo'] = min(estatisticas['minimo'], outras['minimo'])
+            estatisticas['maximo'] = max(estatisticas['maximo'], outras['maximo'])
+            if outras['contagem']:
+                combinar_momentos(estatisticas, outras['contagem'], outras['media'], outras['m2'])
+            if estatisticas['histograma'] is not None:
+                estatisticas['histograma'] += outras['histograma']
+        self.nulos_situacao += outro.nulos_situacao
+        self.classes += outro.classes
+        for nome in self.violacoes:
+            self.violacoes[nome] += outro.violacoes[nome]
+        self.ids_validos += outro.ids_validos
+        self.juntar_mapa_ids(outro.byte_inicial_ids, outro.mapa_ids)
+        return self
+
+    def get_ids_duplicados(self):
+        # Quantidade de bits ligados em cada valor de byte
+        bits_por_byte = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+        return self.ids_validos - int(bits_por_byte[self.mapa_ids].sum(dtype=np.int64))
+
+
+def combinar_momentos(estatisticas, contagem, media, m2):
+    """Junta (contagem, média, soma dos quadrados dos desvios) de outro grupo de valores (Chan et al.)."""
+    total = estatisticas['contagem'] + contagem
+    delta = media - estatisticas['media']
+    estatisticas['m2'] += m2 + delta ** 2 * estatisticas['contagem'] * contagem / total
+    estatisticas['media'] += delta * contagem / total
+    estatisticas['contagem'] = total
+
+
+def perfilar_bloco(df):
+    acumulador = AcumuladorPerfil()
+    with medir('validacao_dados.bloco'):
+        acumulador.adicionar_bloco(df)
+    return acumulador
+
+
+def iterar_acumuladores(caminho, tamanho_bloco, workers=1):
+    """Acumulador de cada bloco da base (blocos processados em um pool de processos se workers > 1)."""
+    # Tipos do arquivo, sem converter para o esquema
+    blocos = iterar_dataset(caminho, tamanho_bloco, tipos={})
+
+    if workers <= 1:
+        for df in blocos:
+            yield perfilar_bloco(df)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pendentes = deque()
+        for df in blocos:
+            pendentes.append(executor.submit(perfilar_bloco, df))
+            if len(pendentes) >= 2 * workers:
+                yield pendentes.popleft().result()
+        while pendentes:
+            yield pendentes.popleft().result()
+
+
+# __________ Perfil (JSON) __________
+
+def get_caminho_perfil(caminho_dados):
+    caminho_dados = Path(caminho_dados)
+    return caminho_dados.with_name(caminho_dados.name + '.perfil.json')
+
+
+def get_assinatura_dados(caminho_dados):
+    """Tamanho e data de modificação de cada arquivo da base (muda se a base for regravada)."""
+    arquivos = get_arquivos_parquet(caminho_dados) if get_formato(caminho_dados) == FORMATO_PARQUET else [Path(caminho_dados)]
+    return [[arquivo.name, arquivo.stat().st_size, arquivo.stat().st_mtime_ns] for arquivo in arquivos]
+
+
+def sugerir_tipo(coluna, estatisticas):
+    """Menor tipo numpy que guarda todos os valores da coluna (float32 para notas e colunas com nulos)."""
+    tipo_esquema = np.dtype(TIPOS_NUMPY[coluna])
+    if estatisticas['contagem'] == 0:
+        return tipo_esquema.name
+    if estatisticas['nulos'] or estatisticas['nao_inteiros'] or np.issubdtype(tipo_esquema, np.floating):
+        return 'float32' if np.issubdtype(tipo_esquema, np.floating) or estatisticas['nulos'] else 'float64'
+    minimo, maximo = int(estatisticas['minimo']), int(estatisticas['maximo'])
+    if tipo_esquema == np.bool_ and minimo >= 0 and maximo <= 1:
+        return 'bool'
+    for tipo in (np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32):
+        if np.iinfo(tipo).min <= minimo and maximo <= np.iinfo(tipo).max:
+            return np.dtype(tipo).name
+    return 'int64'
+
+
+def montar_perfil(acumulador, caminho_dados, tolerancia=TOLERANCIA_VIOLACOES):
+    """Resumo do acumulador (estatísticas, verificações e tipos sugeridos), pronto para virar JSON."""
+    linhas = acumulador.linhas
+    colunas = {}
+    for coluna, estatisticas in acumulador.colunas.items():
+        contagem = estatisticas['contagem']
+        resumo_coluna = {
+            'contagem': contagem,
+            'nulos': estatisticas['nulos'],
+            'nao_numericos': estatisticas['nao_numericos'],
+            'nao_inteiros': estatisticas['nao_inteiros'],
+            'minimo': estatisticas['minimo'] if contagem else None,
+            'maximo': estatisticas['maximo'] if contagem else None,
+            'media': estatisticas['media'] if contagem else None,
+            'desvio': float(np.sqrt(estatisticas['m2'] / (contagem - 1))) if contagem > 1 else 0.0,
+        }
+        if estatisticas['histograma'] is not None:
+            inicio, fim, quant_faixas = FAIXAS_HISTOGRAMA[coluna]
+            resumo_coluna['histograma'] = {
+                'inicio': inicio, 'fim': fim, 'contagens': estatisticas['histograma'].tolist(),
+                'abaixo': estatisticas['abaixo'], 'acima': estatisticas['acima'],
+            }
+        colunas[coluna] = resumo_coluna
+    classes = dict(zip(CLASSES_SITUACAO, acumulador.classes.tolist()))
+    ids_duplicados = acumulador.get_ids_duplicados()
+
+    # __________ Verificações __________
+    verificacoes = []
+
+    def verificar(nome, ok, detalhe):
+        verificacoes.append({'nome': nome, 'ok': bool(ok), 'detalhe': detalhe})
+
+    verificar('linhas', linhas > 0, f'{linhas} linhas')
+    verificar('colunas', not acumulador.colunas_ausentes, f'ausentes: {sorted(acumulador.colunas_ausentes)}')
+    nulos = {coluna: resumo['nulos'] for coluna, resumo in colunas.items() if resumo['nulos']}
+    if acumulador.nulos_situacao:
+        nulos[COLUNA_ALVO] = acumulador.nulos_situacao
+    verificar('nulos', all(quantidade <= MAX_PROPORCAO_NULOS * linhas for quantidade in nulos.values()),
+              f'nulos por coluna: {nulos} (máximo {MAX_PROPORCAO_NULOS:.0%} das linhas)')
+    nao_numericos = {coluna: resumo['nao_numericos'] for coluna, resumo in colunas.items() if resumo['nao_numericos']}
+    verificar('valores_numericos', not nao_numericos, f'valores não numéricos: {nao_numericos}')
+    nao_inteiros = {coluna: colunas[coluna]['nao_inteiros'] for coluna in COLUNAS_INTEIRAS if colunas[coluna]['nao_inteiros']}
+    verificar('valores_inteiros', not nao_inteiros, f'valores não inteiros em colunas inteiras: {nao_inteiros}')
+    violacoes = {nome: quantidade for nome, quantidade in acumulador.violacoes.items() if quantidade}
+    verificar('regras', all(quantidade <= tolerancia * linhas for quantidade in violacoes.values()),
+              f'linhas com violação: {violacoes} (tolerância {tolerancia:.2%})')
+    menor_classe = min(classes.values()) / max(sum(classes.values()), 1)
+    verificar('classes', menor_classe >= MIN_PROPORCAO_CLASSE,
+              f'alunos por classe: {classes} (menor classe com {menor_classe:.2%}, mínimo {MIN_PROPORCAO_CLASSE:.0%})')
+    verificar('ids_unicos', ids_duplicados == 0, f'{ids_duplicados} IDs duplicados')
+
+    tipos_sugeridos = {coluna: sugerir_tipo(coluna, acumulador.colunas[coluna]) for coluna in COLUNAS_NUMERICAS}
+    tipos_sugeridos[COLUNA_ALVO] = 'category'
+
+    return {
+        'caminho': str(caminho_dados),
+        'assinatura': get_assinatura_dados(caminho_dados),
+        'aprovado': all(verificacao['ok'] for verificacao in verificacoes),
+        'verificacoes': verificacoes,
+        'linhas': linhas,
+        'colunas': colunas,
+        'classes': classes,
+        'ids_duplicados': ids_duplicados,
+        'violacoes': acumulador.violacoes,
+        'tipos_sugeridos': tipos_sugeridos,
+    }
+
+
+def salvar_perfil(perfil, caminho_perfil):
+    caminho_perfil = Path(caminho_perfil)
+    caminho_tmp = caminho_perfil.with_name(caminho_perfil.name + '.tmp')
+    with open(caminho_tmp, 'w', encoding='utf-8') as arquivo:
+        json.dump(perfil, arquivo, indent=2, ensure_ascii=False)
+    os.replace(caminho_tmp, caminho_perfil)
+
+
+def validar_dataset(caminho_dados, tamanho_bloco=TAMANHO_BLOCO_VALIDACAO, workers=1, tolerancia=TOLERANCIA_VIOLACOES):
+    """Percorre a base uma vez, monta o perfil e grava '<base>.perfil.json'
+
+    Returns:
+        dict: O perfil (ver montar_perfil); 'aprovado' diz se todas as verificações passaram.
+    """
+    inicio = time.perf_counter()
+    acumulador = AcumuladorPerfil()
+    with medir('validacao_dados.validar'):
+        for acumulador_bloco in iterar_acumuladores(caminho_dados, tamanho_bloco, workers):
+            acumulador.combinar(acumulador_bloco)
+    contar('validacao_dados.linhas', acumulador.linhas)
+
+    perfil = montar_perfil(acumulador, caminho_dados, tolerancia)
+    perfil['tempo_s'] = time.perf_counter() - inicio
+    salvar_perfil(perfil, get_caminho_perfil(caminho_dados))
+    return perfil
+
+
+def carregar_perfil(caminho_dados):
+    """Perfil salvo da base, ou None se não existir ou se a base mudou desde a validação."""
+    caminho_perfil = get_caminho_perfil(caminho_dados)
+    if not caminho_perfil.exists():
+        return None
+    with open(caminho_perfil, encoding='utf-8') as arquivo:
+        perfil = json.load(arquivo)
+    return perfil if perfil.get('assinatura') == get_assinatura_dados(caminho_dados) else None
+
+
+def get_falhas(perfil):
+    return [f"{verificacao['nome']}: {verificacao['detalhe']}" for verificacao in perfil['verificacoes'] if not verificacao['ok']]
+
+
+def exigir_dados_validos(caminho_dados, tamanho_bloco=TAMANHO_BLOCO_VALIDACAO, workers=1):
+    """Perfil da base (reaproveitado se ela não mudou, senão validado agora)
+
+    Raises:
+        ValueError: Se alguma verificação falhar (lista as verificações que falharam).
+    """
+    perfil = carregar_perfil(caminho_dados)
+    if perfil is None:
+        print(f'--- Validando "{caminho_dados}" ---')
+        perfil = validar_dataset(caminho_dados, tamanho_bloco, workers)
+    if not perfil['aprovado']:
+        raise ValueError(f'A base "{caminho_dados}" não passou na validação '
+                         f'(perfil em "{get_caminho_perfil(caminho_dados)}"):\n  - ' + '\n  - '.join(get_falhas(perfil)))
+    return perfil
+
+
+def get_tipos_perfil(perfil):
+    """Tipos sugeridos pelo perfil, no formato aceito por carregar_dataset/iterar_dataset."""
+    tipos = dict(perfil['tipos_sugeridos'])
+    tipos[COLUNA_ALVO] = get_tipos_colunas()[COLUNA_ALVO]
+    return tipos
+
+
+if __name__ == "__main__":
+    from src.gerar_dados import URL_SAIDA_DADOS
+
+    parser = argparse.ArgumentParser(description='Valida a base de alunos e grava o perfil (JSON) ao lado dela.')
+    parser.add_argument('entrada', type=Path, nargs='?', default=URL_SAIDA_DADOS, help='Base (.parquet ou .csv).')
+    parser.add_argument('--chunk-size', type=int, default=TAMANHO_BLOCO_VALIDACAO, help='Linhas por bloco.')
+    parser.add_argument('--workers', type=int, default=1, help='Processos validando blocos em paralelo.')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCIA_VIOLACOES,
+                        help='Proporção de linhas com violação aceita em cada regra.')
+    parser.add_argument('--profile', type=Path, default=None,
+                        help='Roda sob cProfile/tracemalloc e grava <arquivo>.prof/.txt/.json.')
+    args = parser.parse_args()
+
+    with perfil_opcional(args.profile):
+        perfil = validar_dataset(args.entrada, args.chunk_size, args.workers, args.tolerance)
+
+    for verificacao in perfil['verificacoes']:
+        print(f"{'✅' if verificacao['ok'] else '❌'} {verificacao['nome']:<18} {verificacao['detalhe']}")
+    print(f'\n--- {perfil["linhas"]} linhas validadas em {perfil["tempo_s"]:.2f}s ---\n'
+          f'--- Perfil salvo em "{get_caminho_perfil(args.entrada)}" ---')
+    sys.exit(0 if perfil['aprovado'] else 1)
@@ -0,0 +1,241 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+# Permite rodar "python src/versoes_modelo.py" e ainda importar os módulos irmãos como "src.<modulo>"
+if str(Path(__file__).resolve().parent.parent) not in sys.path:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.inferencia import NOME_ARQUIVO_MODELO, NOME_ARQUIVO_MODELO_COMPILADO, carregar_preditor, get_hash_modelo
+
+"""
+  Versões do modelo: cada treino publica o .pkl, a árvore compilada e as métricas juntos em
+  models/versoes/<versao>/ (a versão é o hash do conteúdo) e só então troca o ponteiro
+  models/versao_atual.json, com uma escrita atômica (arquivo temporário + os.replace).
+
+  RecarregadorModelo (usado pelo app.py) observa o ponteiro com um os.stat por consulta. Quando ele
+  muda, a nova versão é carregada em uma thread em segundo plano e trocada de uma vez só (modelo e
+  métricas juntos). Até a troca, as previsões continuam usando a versão anterior, sem esperar.
+  Se o carregamento falhar (ex.: arquivo gravado pela metade), a versão anterior continua no ar e
+  uma nova tentativa é feita depois de uma espera que dobra a cada falha.
+
+  Sem o ponteiro (modelos salvos antes do versionamento), usa os arquivos de sempre em models/ e
+  observa o próprio .pkl.
+"""
+
+PASTA_MODELOS = NOME_ARQUIVO_MODELO.parent
+PASTA_VERSOES = PASTA_MODELOS / 'versoes'
+ARQUIVO_VERSAO_ATUAL = PASTA_MODELOS / 'versao_atual.json'
+NOME_ARQUIVO_METRICAS = PASTA_MODELOS / 'model_metrics.json'
+
+# Versões mantidas no disco (a atual nunca é removida)
+MAX_VERSOES = 5
+
+VERSAO_LEGADA = 'legado'
+
+# Espera (s) antes de tentar de novo um carregamento que falhou: dobra a cada falha, até o máximo
+ESPERA_INICIAL_NOVA_TENTATIVA = 1.0
+ESPERA_MAXIMA_NOVA_TENTATIVA = 60.0
+
+
+def get_caminhos_versao(pasta_versao):
+    """Caminhos do .pkl, da árvore compilada e das métricas dentro da pasta de uma versão."""
+    pasta_versao = Path(pasta_versao)
+    return {
+        'modelo': pasta_versao / NOME_ARQUIVO_MODELO.name,
+        'modelo_compilado': pasta_versao / NOME_ARQUIVO_MODELO_COMPILADO.name,
+        'metricas': pasta_versao / NOME_ARQUIVO_METRICAS.name,
+    }
+
+
+def ler_versao_atual(arquivo_atual=ARQUIVO_VERSAO_ATUAL):
+    """Conteúdo do ponteiro ({'versao', 'hash_modelo', 'publicada_em'}) ou None se ainda não houver versões."""
+    try:
+        with open(arquivo_atual, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except FileNotFoundError:
+        return None
+
+
+def escrever_versao_atual(ponteiro, arquivo_atual=ARQUIVO_VERSAO_ATUAL):
+    arquivo_atual = Path(arquivo_atual)
+    caminho_tmp = arquivo_atual.with_name(arquivo_atual.name + '.tmp')
+    with open(caminho_tmp, 'w', encoding='utf-8') as arquivo:
+        json.dump(ponteiro, arquivo, indent=2)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(caminho_tmp, arquivo_atual)
+
+
+def remover_versoes_antigas(pasta_versoes=PASTA_VERSOES, versao_atual=None, max_versoes=MAX_VERSOES):
+    """Mantém só as max_versoes pastas mais recentes (e sempre a versão atual)."""
+    versoes = sorted((pasta for pasta in Path(pasta_versoes).iterdir() if pasta.is_dir() and '.' not in pasta.name),
+                     key=lambda pasta: pasta.stat().st_mtime, reverse=True)
+    for pasta in versoes[max_versoes:]:
+        if pasta.name != versao_atual:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+
+def publicar_versao(caminho_modelo=NOME_ARQUIVO_MODELO, caminho_modelo_compilado=NOME_ARQUIVO_MODELO_COMPILADO,
+                    caminho_metricas=NOME_ARQUIVO_METRICAS, pasta_versoes=PASTA_VERSOES,
+                    arquivo_atual=ARQUIVO_VERSAO_ATUAL, max_versoes=MAX_VERSOES):
+    """Copia o modelo, a árvore compilada (se houver) e as métricas para uma nova versão e aponta para ela
+
+    A pasta da versão é montada ao lado (.tmp) e renomeada, e o ponteiro só é trocado depois disso,
+    então quem lê o ponteiro sempre encontra uma versão completa.
+
+    Returns:
+        str: Identificador da versão (hash do modelo + métricas).
+    """
+    hash_modelo = get_hash_modelo(caminho_modelo)
+    with open(caminho_metricas, 'rb') as arquivo:
+        hash_metricas = hashlib.sha256(arquivo.read()).hexdigest()
+    versao = hashlib.sha256((hash_modelo + hash_metricas).encode('utf-8')).hexdigest()[:16]
+
+    pasta_versoes = Path(pasta_versoes)
+    pasta_versao = pasta_versoes / versao
+    if not pasta_versao.exists():
+        pasta_tmp = pasta_versoes / f'{versao}.tmp'
+        shutil.rmtree(pasta_tmp, ignore_errors=True)
+        pasta_tmp.mkdir(parents=True)
+        caminhos = get_caminhos_versao(pasta_tmp)
+        shutil.copy2(caminho_modelo, caminhos['modelo'])
+        shutil.copy2(caminho_metricas, caminhos['metricas'])
+        # A árvore compilada só vale se tiver sido gerada a partir deste .pkl
+        if Path(caminho_modelo_compilado).is_dir():
+            shutil.copytree(caminho_modelo_compilado, caminhos['modelo_compilado'])
+        os.replace(pasta_tmp, pasta_versao)
+
+    escrever_versao_atual({
+        'versao': versao,
+        'hash_modelo': hash_modelo,
+        'publicada_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }, arquivo_atual)
+    remover_versoes_antigas(pasta_versoes, versao, max_versoes)
+    return versao
+
+
+def carregar_versao(ponteiro, pasta_versoes=PASTA_VERSOES):
+    """Carrega o modelo e as métricas de uma versão (ou dos arquivos de sempre, se ponteiro for None)
+
+    Returns:
+        dict: 'versao', 'modelo', 'metricas' (None se não houver), 'caminho_modelo' e 'indices_classes'
+            (posição de cada classe nas probabilidades).
+    """
+    if ponteiro is None:
+        versao = VERSAO_LEGADA
+        caminhos = {'modelo': NOME_ARQUIVO_MODELO, 'modelo_compilado': NOME_ARQUIVO_MODELO_COMPILADO,
+                    'metricas': NOME_ARQUIVO_METRICAS}
+    else:
+        versao = ponteiro['versao']
+        caminhos = get_caminhos_versao(Path(pasta_versoes) / versao)
+
+    if not caminhos['modelo'].exists() and not caminhos['modelo_compilado'].is_dir():
+        raise FileNotFoundError(f"Arquivo do modelo ('{caminhos['modelo']}') não encontrado.")
+    modelo = carregar_preditor(caminhos['modelo'], caminhos['modelo_compilado'])
+
+    metricas = None
+    if caminhos['metricas'].exists():
+        with open(caminhos['metricas'], encoding='utf-8') as arquivo:
+            metricas = json.load(arquivo)
+
+    return {
+        'versao': versao,
+        'modelo': modelo,
+        'metricas': metricas,
+        'caminho_modelo': caminhos['modelo'],
+        'indices_classes': {str(classe): indice for indice, classe in enumerate(modelo.classes_)},
+    }
+
+
+class RecarregadorModelo:
+    """Versão atual do modelo + métricas, recarregada em segundo plano quando o ponteiro muda."""
+
+    def __init__(self, arquivo_atual=ARQUIVO_VERSAO_ATUAL, pasta_versoes=PASTA_VERSOES):
+        self.arquivo_atual = Path(arquivo_atual)
+        self.pasta_versoes = Path(pasta_versoes)
+        self.lock = threading.Lock()
+        self.atual = None
+        self.assinatura = ()  # nunca igual a uma assinatura real, nem ao None de "sem ponteiro"
+        self.thread_carregamento = None
+        self.recarregamentos = 0
+        self.erro = None
+        self.espera_nova_tentativa = 0.0
+        self.proxima_tentativa = 0.0
+
+    def get_assinatura(self):
+        """os.stat do ponteiro ou, sem ele (modo legado), do .pkl de models/; None se nenhum dos dois existir."""
+        for caminho in (self.arquivo_atual, NOME_ARQUIVO_MODELO):
+            try:
+                estado = os.stat(caminho)
+            except FileNotFoundError:
+                continue
+            return (caminho.name, estado.st_mtime_ns, estado.st_size)
+        return None
+
+    def recarregar(self, ponteiro, assinatura):
+        try:
+            nova = carregar_versao(ponteiro, self.pasta_versoes)
+        except Exception as erro:
+            # Mantém a versão anterior no ar e tenta de novo depois da espera (mesmo sem o ponteiro mudar)
+            self.erro = erro
+            self.espera_nova_tentativa = min(max(2 * self.espera_nova_tentativa, ESPERA_INICIAL_NOVA_TENTATIVA),
+                                             ESPERA_MAXIMA_NOVA_TENTATIVA)
+            self.proxima_tentativa = time.monotonic() + self.espera_nova_tentativa
+            traceback.print_exc()
+        else:
+            # Uma única atribuição: quem já pegou a versão anterior termina com ela.
+            # A assinatura só avança depois do carregamento dar certo
+            self.atual = nova
+            self.assinatura = assinatura
+            self.erro = None
+            self.espera_nova_tentativa = 0.0
+            self.recarregamentos += 1
+        finally:
+            self.thread_carregamento = None
+
+    def obter(self):
+        """Versão em uso ({'versao', 'modelo', 'metricas', ...}) ou None se nenhum modelo pôde ser carregado
+
+        Só a primeira chamada espera o carregamento. Depois disso, uma mudança no ponteiro (ou no .pkl,
+        no modo legado) dispara o carregamento em segundo plano e esta função continua devolvendo a
+        versão anterior até a troca.
+        """
+        assinatura = self.get_assinatura()
+        if assinatura == self.assinatura:
+            return self.atual
+
+        with self.lock:
+            if (assinatura == self.assinatura or self.thread_carregamento is not None
+                    or time.monotonic() < self.proxima_tentativa):
+                return self.atual
+            ponteiro = ler_versao_atual(self.arquivo_atual)
+            if ponteiro is not None and self.atual is not None and self.atual['versao'] == ponteiro['versao']:
+                # Ponteiro regravado para a mesma versão: não há o que carregar
+                self.assinatura = assinatura
+                return self.atual
+
+            if self.atual is None:
+                self.recarregar(ponteiro, assinatura)
+            else:
+                self.thread_carregamento = threading.Thread(target=self.recarregar, args=(ponteiro, assinatura),
+                                                            daemon=True)
+                self.thread_carregamento.start()
+        return self.atual
+
+
+if __name__ == "__main__":
+    # Publica como nova versão os artefatos que já estão em models/ (ex.: treinados antes do versionamento)
+    parser = argparse.ArgumentParser(description='Publica o modelo e as métricas atuais como uma nova versão.')
+    parser.add_argument('--max-versions', type=int, default=MAX_VERSOES, help='Versões mantidas no disco.')
+    args = parser.parse_args()
+
+    versao = publicar_versao(max_versoes=args.max_versions)
+    print(f'--- Versão "{versao}" publicada em "{PASTA_VERSOES / versao}" ---')
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Permite rodar "pytest" de qualquer pasta e ainda importar os módulos do projeto como "src.<modulo>"
+if str(Path(__file__).resolve().parent.parent) not in sys.path:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
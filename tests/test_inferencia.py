@@ -0,0 +1,41 @@
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+
+from src.arvore_histograma import ArvoreHistograma
+from src.esquema import COLUNAS_FEATURES
+from src.gerar_dados import gerar_registros_vetorizado
+from src.inferencia import PreditorArvore, compilar_arvore
+
+"""
+  A árvore compilada (só numpy) prevê exatamente o mesmo que o modelo de origem, em lote e linha a linha.
+"""
+
+
+def get_bases():
+    treino = gerar_registros_vetorizado(30_000, rng=1)
+    teste = gerar_registros_vetorizado(5_000, rng=2)
+    return treino[COLUNAS_FEATURES], treino['situacao'], teste[COLUNAS_FEATURES]
+
+
+def verificar_paridade(modelo, X_teste):
+    preditor = PreditorArvore(compilar_arvore(modelo))
+    proba_modelo = modelo.predict_proba(X_teste)
+
+    np.testing.assert_array_equal(preditor.classes_, modelo.classes_)
+    np.testing.assert_array_equal(preditor.predict_proba(X_teste), proba_modelo)
+    np.testing.assert_array_equal(preditor.predict(X_teste), modelo.predict(X_teste))
+    for linha, proba in zip(X_teste.iloc[:300].to_dict('records'), proba_modelo[:300]):
+        assert preditor.prever_um(linha)[1] == tuple(proba)
+
+
+def test_arvore_compilada_igual_ao_decision_tree_classifier():
+    X_treino, y_treino, X_teste = get_bases()
+    modelo = DecisionTreeClassifier(max_depth=10, min_samples_leaf=5, random_state=0).fit(X_treino, y_treino)
+    verificar_paridade(modelo, X_teste)
+
+
+def test_arvore_compilada_igual_a_arvore_histograma():
+    X_treino, y_treino, X_teste = get_bases()
+    blocos = ((X_treino.iloc[inicio:inicio + 7_000], y_treino.iloc[inicio:inicio + 7_000])
+              for inicio in range(0, len(X_treino), 7_000))
+    verificar_paridade(ArvoreHistograma(max_depth=10).fit_blocos(blocos), X_teste)
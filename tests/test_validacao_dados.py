@@ -0,0 +1,77 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.gerar_dados import gerar_registros_vetorizado
+from src.validacao_dados import AcumuladorPerfil, perfilar_bloco
+
+"""
+  Acumuladores do perfil da base: combinar blocos em qualquer ordem dá o mesmo resultado, e o mapa
+  de bits dos IDs acha os duplicados dentro de um bloco e entre blocos.
+"""
+
+
+def get_blocos(quant_registros=12_000, tamanho_bloco=2_500):
+    df = gerar_registros_vetorizado(quant_registros, rng=3)
+    return [df.iloc[inicio:inicio + tamanho_bloco] for inicio in range(0, quant_registros, tamanho_bloco)]
+
+
+def combinar_todos(acumuladores):
+    total = AcumuladorPerfil()
+    for acumulador in acumuladores:
+        # Ida e volta pelo pickle, como quando o bloco é perfilado em outro processo (--workers)
+        total.combinar(pickle.loads(pickle.dumps(acumulador)))
+    return total
+
+
+def resumir(acumulador):
+    """Resultado do acumulador em tipos comparáveis (média e variância com tolerância de arredondamento)."""
+    return {
+        'linhas': acumulador.linhas,
+        'classes': acumulador.classes.tolist(),
+        'violacoes': acumulador.violacoes,
+        'ids_duplicados': acumulador.get_ids_duplicados(),
+        'colunas': {
+            coluna: (estatisticas['contagem'], estatisticas['minimo'], estatisticas['maximo'],
+                     pytest.approx(estatisticas['media']), pytest.approx(estatisticas['m2'], rel=1e-9),
+                     None if estatisticas['histograma'] is None else estatisticas['histograma'].tolist())
+            for coluna, estatisticas in acumulador.colunas.items()
+        },
+    }
+
+
+def test_combinacao_nao_depende_da_ordem_dos_blocos():
+    acumuladores = [perfilar_bloco(bloco) for bloco in get_blocos()]
+    em_ordem = resumir(combinar_todos(acumuladores))
+
+    rng = np.random.default_rng(0)
+    for _ in range(3):
+        embaralhados = [acumuladores[indice] for indice in rng.permutation(len(acumuladores))]
+        assert resumir(combinar_todos(embaralhados)) == em_ordem
+
+
+def test_combinacao_igual_a_um_bloco_unico():
+    blocos = get_blocos()
+    inteiro = perfilar_bloco(pd.concat(blocos))
+    assert resumir(combinar_todos(perfilar_bloco(bloco) for bloco in blocos)) == resumir(inteiro)
+    assert inteiro.get_ids_duplicados() == 0
+
+
+def test_ids_duplicados_dentro_e_entre_blocos():
+    blocos = [bloco.copy() for bloco in get_blocos()]
+    # Dois IDs repetidos dentro do último bloco e três IDs do primeiro bloco repetidos no último
+    blocos[-1].iloc[:2, blocos[-1].columns.get_loc('ID')] = blocos[-1]['ID'].iloc[2:4].to_numpy()
+    blocos[-1].iloc[5:8, blocos[-1].columns.get_loc('ID')] = blocos[0]['ID'].iloc[:3].to_numpy()
+
+    acumuladores = [perfilar_bloco(bloco) for bloco in blocos]
+    assert combinar_todos(acumuladores).get_ids_duplicados() == 5
+    assert combinar_todos(reversed(acumuladores)).get_ids_duplicados() == 5
+
+
+def test_mapa_de_ids_do_bloco_cobre_so_os_ids_do_bloco():
+    acumulador = AcumuladorPerfil()
+    acumulador.adicionar_ids(np.arange(50_000_000, 50_010_000, dtype=np.float64))
+    assert acumulador.byte_inicial_ids == 50_000_000 // 8
+    assert len(acumulador.mapa_ids) == 10_000 // 8